@@ -1,18 +1,25 @@
 import asyncio
 import functools
-import glob
 import json
 import pathlib
+import re
+import time
 import traceback
+from contextlib import aclosing
+from typing import TYPE_CHECKING, Awaitable, Callable, Iterable, Iterator
 
-from rich.progress import Progress, TaskID
-from tenacity import retry, stop_after_attempt, wait_random_exponential
-from tree_sitter import Parser, Query
-from tree_sitter_languages import get_language, get_parser
+from tenacity import (
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 
 from dibench import RepoInstance
 from dibench.prompt import (
+    dependencies_instruction,
     file_template,
+    import_summary_template,
     instruction,
     lazy_prompt,
     merge_build_files_instruction,
@@ -20,35 +27,171 @@ from dibench.prompt import (
     task_information_template,
 )
 from dibench.utils import cprint, progress
-from dibench.utils.provider import BaseProvider, get_llm
-from dibench.utils.repo import fake_git_diff, lang2suffix, show_project_structure
+from dibench.utils.diff import git_diff
+from dibench.utils.imports import ImportExtractor, ImportIndex, extract_imports
+from dibench.utils.provider import (
+    BaseProvider,
+    CachedProvider,
+    DeadlineProvider,
+    RateLimitedProvider,
+    ResponseCache,
+    TelemetryProvider,
+    get_llm,
+    is_context_overflow,
+    is_retryable,
+    model_price,
+    record_prompt_strategy,
+    shared_limiter,
+    track_instance,
+)
+from dibench.utils.repo import lang2suffix
+from dibench.utils.results import ResultSink
+from dibench.utils.walk import ProjectTree
+
+if TYPE_CHECKING:
+    from rich.progress import Progress, TaskID
 
 languages = ["python", "rust", "csharp", "javascript"]
 
-tree_sitter_parsers = {
-    "python": get_parser("python"),
-    "rust": get_parser("rust"),
-    "csharp": get_parser("c_sharp"),
-    "javascript": get_parser("javascript"),
-}
 
-tree_sitter_languages = {
-    "python": get_language("python"),
-    "rust": get_language("rust"),
-    "csharp": get_language("c_sharp"),
-    "javascript": get_language("javascript"),
-}
+class FileListingParser:
+    """
+    Incremental parser of the *file listings* in a response, fed as the
+    response streams in. A listing is complete as soon as its closing fence
+    arrives; `done` turns true once every expected build file has a listing
+    that no later text can override, so generation can stop early.
 
-tree_sitter_queries = {
-    "python": tree_sitter_languages["python"].query(
-        "[(import_statement) (import_from_statement)] @import",
-    ),
-    "rust": tree_sitter_languages["rust"].query("(use_declaration) @use"),
-    "csharp": tree_sitter_languages["csharp"].query("(using_directive) @use"),
-    "javascript": tree_sitter_languages["javascript"].query(
-        "(import_statement) @import"
-    ),
-}
+    Args:
+        build_files (list[str]): The build files of the instance.
+        expected (list[str], optional): The build files to wait for,
+                                        defaults to all of `build_files`.
+    """
+
+    def __init__(self, build_files: list[str], expected: list[str] | None = None):
+        self.build_files = build_files
+        self.expected = set(build_files if expected is None else expected)
+        self.edits = []
+        self.buffer = ""
+        self.prev_line = None
+        self.saw_fname = None
+        self.fname = None
+        self.fname_source = None
+        self.new_lines = []
+        # build files already matched by a listing with an explicit filename
+        self.received = set()
+
+    @property
+    def done(self) -> bool:
+        return self.expected <= self.received
+
+    def feed(self, text: str):
+        """Consume the next chunk of the response."""
+        self.buffer += text
+        end = self.buffer.rfind("\n") + 1
+        if end:
+            lines, self.buffer = self.buffer[:end], self.buffer[end:]
+            for line in lines.splitlines(keepends=True):
+                self.feed_line(line)
+
+    def feed_line(self, line: str):
+        if line.startswith("```"):
+            self._fence()
+        elif self.fname is not None:
+            self.new_lines.append(line)
+        else:
+            for word in line.strip().split():
+                word = word.rstrip(".:,;!")
+                for build_file in self.build_files:
+                    quoted_chat_file = f"`{build_file}`"
+                    if word == quoted_chat_file:
+                        self.saw_fname = build_file
+        self.prev_line = line
+
+    def _fence(self):
+        if self.fname is not None:
+            # ending an existing block
+            self.saw_fname = None
+            self._add_edit(self.fname, self.fname_source, self.new_lines)
+            self.fname = None
+            self.fname_source = None
+            self.new_lines = []
+            return
+
+        # fname==None ... starting a new block
+        if self.prev_line is not None:
+            self.fname_source = "block"
+            fname = self.prev_line.strip()
+            fname = fname.strip("*")  # handle **filename.py**
+            fname = fname.rstrip(":")
+            fname = fname.strip("`")
+            fname = fname.lstrip("#")
+            fname = fname.strip()
+            if len(fname) > 250:
+                fname = ""
+
+            # Did gpt prepend a bogus dir? It especially likes to
+            # include the path/to prefix from the one-shot example in
+            # the prompt.
+            if (
+                fname
+                and fname not in self.build_files
+                and pathlib.Path(fname).name in self.build_files
+            ):
+                fname = pathlib.Path(fname).name
+            self.fname = fname
+        if not self.fname:  # blank line? or ``` was on first line i==0
+            if self.saw_fname:
+                self.fname = self.saw_fname
+                self.fname_source = "saw"
+            elif len(self.build_files) == 1:
+                self.fname = self.build_files[0]
+                self.fname_source = "chat"
+            else:
+                cprint("No filename provided before ``` in file listing", "red")
+
+    def _add_edit(self, fname: str, fname_source: str, new_lines: list[str]):
+        self.edits.append((fname, fname_source, new_lines))
+        if fname_source == "block":
+            # listings with explicit filenames take precedence over all
+            # others, and the first one matching a build file wins
+            self.received.update(
+                build_file
+                for build_file in self.build_files
+                if build_file in fname or pathlib.Path(fname).name == build_file
+            )
+
+    def close(self) -> dict[str, str]:
+        """Finish parsing, returning the content of each edited build file."""
+        if self.buffer:
+            for line in self.buffer.splitlines(keepends=True):
+                self.feed_line(line)
+            self.buffer = ""
+        if self.fname:
+            self._add_edit(self.fname, self.fname_source, self.new_lines)
+            self.fname = None
+
+        seen = set()
+        refined_edits = []
+        # process from most reliable filename, to least reliable
+        for source in ("block", "saw", "chat"):
+            for fname, fname_source, new_lines in self.edits:
+                if fname_source != source:
+                    continue
+                # if a higher priority source already edited the file, skip
+                if fname in seen:
+                    continue
+
+                seen.add(fname)
+                refined_edits.append((fname, fname_source, new_lines))
+
+        build_files = {}
+        for build_file in self.build_files:
+            # find the build file with the highest probability
+            for fname, fname_source, new_lines in refined_edits:
+                if build_file in fname or pathlib.Path(fname).name == build_file:
+                    build_files[build_file] = "".join(new_lines)
+                    break
+        return build_files
 
 
 def sanitize(response: str, instance: RepoInstance):
@@ -69,89 +212,50 @@ def sanitize(response: str, instance: RepoInstance):
         dict: A dictionary mapping each build file name to its corresponding
               edited content.
     """
-    output = []
-    lines = response.splitlines(keepends=True)
-    edits = []
-    saw_fname = None
-    fname = None
-    fname_source = None
-    new_lines = []
-    for i, line in enumerate(lines):
-        if line.startswith("```") or line.startswith("```"):
-            if fname is not None:
-                # ending an existing block
-                saw_fname = None
-                edits.append((fname, fname_source, new_lines))
-                fname = None
-                fname_source = None
-                new_lines = []
-                continue
+    parser = FileListingParser(instance.build_files)
+    for line in response.splitlines(keepends=True):
+        parser.feed_line(line)
+    return parser.close()
 
-            # fname==None ... starting a new block
-            if i > 0:
-                fname_source = "block"
-                fname = lines[i - 1].strip()
-                fname = fname.strip("*")  # handle **filename.py**
-                fname = fname.rstrip(":")
-                fname = fname.strip("`")
-                fname = fname.lstrip("#")
-                fname = fname.strip()
-                if len(fname) > 250:
-                    fname = ""
-
-                # Did gpt prepend a bogus dir? It especially likes to
-                # include the path/to prefix from the one-shot example in
-                # the prompt.
-                if (
-                    fname
-                    and fname not in instance.build_files
-                    and pathlib.Path(fname).name in instance.build_files
-                ):
-                    fname = pathlib.Path(fname).name
-            if not fname:  # blank line? or ``` was on first line i==0
-                if saw_fname:
-                    fname = saw_fname
-                    fname_source = "saw"
-                elif len(instance.build_files) == 1:
-                    fname = instance.build_files[0]
-                    fname_source = "chat"
-                else:
-                    cprint("No filename provided before ``` in file listing", "red")
-        elif fname is not None:
-            new_lines.append(line)
-        else:
-            for word in line.strip().split():
-                word = word.rstrip(".:,;!")
-                for build_file in instance.build_files:
-                    quoted_chat_file = f"`{build_file}`"
-                    if word == quoted_chat_file:
-                        saw_fname = build_file
-            output.append(line)
-    if fname:
-        edits.append((fname, fname_source, new_lines))
-
-    seen = set()
-    refined_edits = []
-    # process from most reliable filename, to least reliable
-    for source in ("block", "saw", "chat"):
-        for fname, fname_source, new_lines in edits:
-            if fname_source != source:
-                continue
-            # if a higher priority source already edited the file, skip
-            if fname in seen:
-                continue
 
-            seen.add(fname)
-            refined_edits.append((fname, fname_source, new_lines))
+def sanitize_dependencies(response: str, instance: RepoInstance) -> dict:
+    """
+    Extract the JSON dependency list of a dependency-only response: the last
+    ```json block, or else the outermost braces. Keys that are not build
+    files of the instance are dropped.
+    """
+    blocks = re.findall(r"```(?:json)?[ \t]*\n(.*?)```", response, re.DOTALL)
+    candidates = blocks[::-1]
+    start, end = response.find("{"), response.rfind("}")
+    if start != -1 and end > start:
+        candidates.append(response[start : end + 1])
+    for candidate in candidates:
+        try:
+            dependencies = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(dependencies, dict):
+            return {
+                file: deps
+                for file, deps in dependencies.items()
+                if file in instance.build_files
+            }
+    return {}
+
 
-    build_files = {}
-    for build_file in instance.build_files:
-        # find the build file with the highest probability
-        for fname, fname_source, new_lines in refined_edits:
-            if build_file in fname or pathlib.Path(fname).name == build_file:
-                build_files[build_file] = "".join(new_lines)
-                break
-    return build_files
+def render_dependencies(
+    dependencies: dict, instance: RepoInstance, project_root: pathlib.Path
+) -> dict[str, str]:
+    """Render a dependency list into the content of the listed build files."""
+    from dibench.utils.buildfile import make_buildfile
+
+    build_file = make_buildfile(
+        instance.language.lower(), project_root, instance.build_files
+    )
+    loaded = build_file.loads_dependencies(dependencies)
+    if not loaded:
+        return {}
+    return build_file.dumps_dependencies(loaded)
 
 
 def original_build_files(instance: RepoInstance, project_root: pathlib.Path | None):
@@ -179,48 +283,85 @@ def make_patch(
         for file in new_build_files.keys()
     }
 
-    patch = fake_git_diff("playground", diff_pair)
+    patch = git_diff(diff_pair)
     return patch
 
 
+def iter_bigbuild_dataset(dataset_name_or_path: str) -> Iterator[RepoInstance]:
+    """Lazily yield instances from a jsonl dataset, one line at a time."""
+    with open(dataset_name_or_path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            yield RepoInstance(**json.loads(line))
+
+
 def load_bigbuild_dataset(dataset_name_or_path: str) -> list[RepoInstance]:
-    dataset = [
-        json.loads(line)
-        for line in pathlib.Path(dataset_name_or_path).read_text().splitlines()
-    ]
-    return [RepoInstance(**instance) for instance in dataset]
+    return list(iter_bigbuild_dataset(dataset_name_or_path))
 
 
-def import_statements(
-    existing_src_content: str, content: str, ts_parser: Parser, query: Query
-) -> str:
-    dep_related_statements = []
-    content: bytes = content.encode()
-    tree = ts_parser.parse(content)
-    for node, _ in query.captures(tree.root_node):
-        dep_related_statements.append(content[node.start_byte : node.end_byte].decode())
-    if len(dep_related_statements) == 0:
+def count_instances(dataset_name_or_path: str) -> int:
+    """Count instances without parsing them, for progress reporting."""
+    with open(dataset_name_or_path, "r") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def import_statements(seen: ImportIndex, statements: list[str]) -> str | None:
+    """Elided listing of the statements not already in `seen`, which is updated."""
+    statements = seen.add(statements)
+    if len(statements) == 0:
         return None
     ret = "..."
-    for s in dep_related_statements:
-        # if statement is already existing
-        if s in existing_src_content:
-            continue
+    for s in statements:
         ret += f"\n{s}"
         ret += "\n..."
     return ret
 
 
-def all_src_files(root: pathlib.Path, lang_suffix: list[str]) -> list[str]:
-    files_to_include = []
-    for suffix in lang_suffix:
-        for file in glob.glob(f"{root}/**/*{suffix}", recursive=True):
-            file = str(pathlib.Path(file).relative_to(root))
-            # exclude setup.py
-            if file == "setup.py":
-                continue
-            files_to_include.append(file)
-    return files_to_include
+def all_src_files(
+    root: pathlib.Path | ProjectTree, lang_suffix: list[str], **kwargs
+) -> list[str]:
+    """
+    Source files of the project with one of `lang_suffix`, see
+    `ProjectTree.source_files` for the filters applied (`kwargs`).
+    """
+    tree = root if isinstance(root, ProjectTree) else ProjectTree(root)
+    return [
+        file
+        # exclude setup.py
+        for file in tree.source_files(lang_suffix, **kwargs)
+        if file != "setup.py"
+    ]
+
+
+def pack_src_files(
+    src_files: list[str],
+    project_root: pathlib.Path,
+    llm: BaseProvider,
+    token_budget: int,
+) -> list[list[str]]:
+    """
+    Group source files into batches whose source section fits `token_budget`.
+
+    Files are ordered by directory so that each batch holds neighbouring
+    files, then packed greedily. A file larger than the budget gets a batch
+    of its own.
+    """
+    ordered = sorted(src_files, key=lambda f: (pathlib.PurePath(f).parent.parts, f))
+    batches = []
+    batch, batch_tokens = [], 0
+    for file in ordered:
+        tokens = llm.count_tokens(
+            file_template.format(path=file, content=(project_root / file).read_text())
+        )
+        if batch and batch_tokens + tokens > token_budget:
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(file)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
 
 
 def md_dumps_messages(messages: list[dict]) -> str:
@@ -231,7 +372,25 @@ def md_dumps_messages(messages: list[dict]) -> str:
     return md_history
 
 
-@retry(wait=wait_random_exponential(max=100), stop=stop_after_attempt(10))
+def save_partial(workspace: pathlib.Path, messages: list[dict]):
+    """
+    Save the conversations completed before an instance was cancelled (e.g.
+    by its deadline), next to where `build.md` and `trajs.json` would be.
+    """
+    with (workspace / "partial.md").open("w") as f:
+        f.write(md_dumps_messages(messages))
+    with (workspace / "partial.json").open("w") as f:
+        f.write(json.dumps(messages))
+
+
+@retry(
+    wait=wait_random_exponential(max=100),
+    stop=stop_after_attempt(10),
+    # only transient failures (timeouts, rate limits, server errors) are
+    # retried, client errors and cache misses in replay mode never succeed
+    retry=retry_if_exception(is_retryable),
+    reraise=True,
+)
 async def query_llm(
     llm: BaseProvider,
     messages: list[str],
@@ -245,27 +404,83 @@ async def query_llm(
         raise e
 
 
+@retry(
+    wait=wait_random_exponential(max=100),
+    stop=stop_after_attempt(10),
+    retry=retry_if_exception(is_retryable),
+    reraise=True,
+)
+async def query_llm_stream(
+    llm: BaseProvider,
+    messages: list[str],
+    build_files: list[str],
+    expected: list[str] | None = None,
+    max_new_tokens: int = 1024,
+    temperature: float = 0.0,
+) -> str:
+    """
+    Stream a reply holding build file listings, stopping the generation as
+    soon as the listings of all `expected` build files are complete. The
+    returned (possibly truncated) reply sanitizes to the same edits as the
+    full one would.
+    """
+    parser = FileListingParser(build_files, expected)
+    chunks = []
+    async with aclosing(
+        llm.stream_reply(messages, max_new_tokens, temperature)
+    ) as stream:
+        async for chunk in stream:
+            chunks.append(chunk)
+            parser.feed(chunk)
+            if parser.done:
+                break
+    return "".join(chunks)
+
+
 def make_prompt(
     instance: RepoInstance,
     project_root: pathlib.Path | None,
     src_files: list[str] | None = None,
     import_only: bool = False,
+    imports: dict[str, list[str]] | None = None,
+    import_summary: bool = False,
+    project_structure: str | None = None,
+    dependencies_only: bool = False,
 ) -> list[dict]:
-    project_structure = show_project_structure(
-        project_root, exclude_dirs=[".git", ".github"]
-    )
+    """
+    Build the inference prompt. With `import_only`, only the import
+    statements of `src_files` are included; pass `imports` (as returned by
+    `ImportExtractor.extract`) to reuse statements extracted ahead of time.
+    With `import_summary`, the unique statements of all files are listed in
+    a single section with their file counts instead of per file.
+    With `dependencies_only`, the model is asked for a JSON list of
+    dependencies per build file instead of full build file listings.
+    `project_structure` defaults to `ProjectTree(project_root).render()`.
+    """
+    if project_structure is None:
+        project_structure = ProjectTree(project_root).render()
     # src_files = src_files(project_root, lang2suffix[instance.language.lower()])
     if import_only:
-        ts_parser = tree_sitter_parsers[instance.language.lower()]
-        ts_query = tree_sitter_queries[instance.language.lower()]
-        src_section = ""
-        for file in src_files:
-            retrieved = import_statements(
-                src_section, (project_root / file).read_text(), ts_parser, ts_query
-            )
-            if not retrieved:
-                continue
-            src_section += "\n" + file_template.format(path=file, content=retrieved)
+        if imports is None:
+            imports = {
+                file: extract_imports(
+                    instance.language.lower(), (project_root / file).read_text()
+                )
+                for file in src_files
+            }
+        seen = ImportIndex()
+        if import_summary:
+            for file in src_files:
+                seen.add(imports[file])
+            src_section = import_summary_template.format(content=seen.summary())
+        else:
+            sections = []
+            for file in src_files:
+                retrieved = import_statements(seen, imports[file])
+                if not retrieved:
+                    continue
+                sections.append(file_template.format(path=file, content=retrieved))
+            src_section = "".join("\n" + section for section in sections)
     else:
         src_section = "\n".join(
             file_template.format(path=file, content=(project_root / file).read_text())
@@ -283,7 +498,20 @@ def make_prompt(
         src_section=src_section,
         build_section=build_section,
     )
-    prompt = instruction + "\n" + task + "\n" + instruction + "\n" + lazy_prompt
+    if dependencies_only:
+        # build systems pull in heavy parsing libraries, import them on use
+        from dibench.utils.buildfile import make_buildfile
+
+        build_file = make_buildfile(
+            instance.language.lower(), project_root, instance.build_files
+        )
+        example = json.dumps(
+            {build_file.example["file"]: build_file.dependency_example}, indent=2
+        )
+        deps_instruction = dependencies_instruction.format(example=example)
+        prompt = deps_instruction + "\n" + task + "\n" + deps_instruction
+    else:
+        prompt = instruction + "\n" + task + "\n" + instruction + "\n" + lazy_prompt
     return [
         {
             "role": "system",
@@ -293,6 +521,50 @@ def make_prompt(
     ]
 
 
+# prompt strategies from the largest to the smallest, see `query_downgrading`
+prompt_strategies = {
+    "source": dict(import_only=False),
+    "imports": dict(import_only=True),
+    "summary": dict(import_only=True, import_summary=True),
+}
+
+
+async def query_downgrading(
+    strategies: list[str],
+    build_prompt: Callable[..., list[dict]],
+    query: Callable[[list[dict]], Awaitable[str]],
+) -> tuple[list[dict], str]:
+    """
+    Query with the prompt of the first of `strategies`, moving on to the
+    next, smaller one whenever the prompt overflows the context window.
+
+    Args:
+        strategies (list[str]): Keys of `prompt_strategies`, largest first.
+        build_prompt (Callable): Builds the messages given the `make_prompt`
+                                 arguments of a strategy.
+        query (Callable): Sends the messages, returns the response.
+
+    Returns:
+        The messages that were answered and the response. The strategy
+        used is recorded in the telemetry of the instance, see
+        `record_prompt_strategy`.
+    """
+    for i, strategy in enumerate(strategies):
+        messages = build_prompt(**prompt_strategies[strategy])
+        try:
+            response = await query(messages)
+            record_prompt_strategy(strategy, downgrades=i)
+            return messages, response
+        except Exception as e:
+            if i == len(strategies) - 1 or not is_context_overflow(e):
+                raise
+            cprint(
+                f"Prompt with {strategy} overflows the context window, "
+                f"retrying with {strategies[i + 1]}",
+                "yellow",
+            )
+
+
 def async_exception_handler(coroutine):
     @functools.wraps(coroutine)
     async def wrapper(**kwargs):
@@ -322,8 +594,8 @@ async def all_in_one_infer(
     instance: RepoInstance,
     project_root: pathlib.Path,
     workspace: pathlib.Path,
-    progress: Progress,
-    task_id: TaskID,
+    progress: "Progress",
+    task_id: "TaskID",
 ):
     if not workspace.exists():
         workspace.mkdir(parents=True, exist_ok=True)
@@ -336,15 +608,26 @@ async def all_in_one_infer(
             "instance_id": instance.instance_id,
             "patch": (workspace / "patch.diff").read_text(),
         }
-    src_files = all_src_files(project_root, lang2suffix[instance.language.lower()])
-    messages = make_prompt(instance, project_root, src_files, import_only=False)
-    # sync query
-    response = await query_llm(
-        llm=llm,
-        messages=messages,
-        max_new_tokens=4096,
-        temperature=0.0,
-        n=1,
+    # walk the project once for both the source files and its structure
+    tree = ProjectTree(project_root)
+    src_files = all_src_files(tree, lang2suffix[instance.language.lower()])
+    project_structure = tree.render()
+    messages, response = await query_downgrading(
+        ["source", "imports", "summary"],
+        functools.partial(
+            make_prompt,
+            instance,
+            project_root,
+            src_files,
+            project_structure=project_structure,
+        ),
+        functools.partial(
+            query_llm_stream,
+            llm,
+            build_files=instance.build_files,
+            max_new_tokens=4096,
+            temperature=0.0,
+        ),
     )
     messages.append({"role": "assistant", "content": response})
     md_history = md_dumps_messages(messages)
@@ -371,8 +654,10 @@ async def import_only_infer(
     instance: RepoInstance,
     project_root: pathlib.Path,
     workspace: pathlib.Path,
-    progress: Progress,
-    task_id: TaskID,
+    progress: "Progress",
+    task_id: "TaskID",
+    import_extractor: ImportExtractor | None = None,
+    import_summary: bool = False,
 ):
     if not workspace.exists():
         workspace.mkdir(parents=True, exist_ok=True)
@@ -385,14 +670,33 @@ async def import_only_infer(
             "instance_id": instance.instance_id,
             "patch": (workspace / "patch.diff").read_text(),
         }
-    src_files = all_src_files(project_root, lang2suffix[instance.language.lower()])
-    messages = make_prompt(instance, project_root, src_files, import_only=True)
-    response = await query_llm(
-        llm=llm,
-        messages=messages,
-        max_new_tokens=4096,
-        temperature=0.0,
-        n=1,
+    # walk the project once for both the source files and its structure
+    tree = ProjectTree(project_root)
+    src_files = all_src_files(tree, lang2suffix[instance.language.lower()])
+    project_structure = tree.render()
+    imports = None
+    if import_extractor is not None:
+        # parse in worker processes instead of blocking the event loop
+        imports = await import_extractor.extract(
+            instance.language, project_root, src_files
+        )
+    messages, response = await query_downgrading(
+        ["summary"] if import_summary else ["imports", "summary"],
+        functools.partial(
+            make_prompt,
+            instance,
+            project_root,
+            src_files,
+            imports=imports,
+            project_structure=project_structure,
+        ),
+        functools.partial(
+            query_llm_stream,
+            llm,
+            build_files=instance.build_files,
+            max_new_tokens=4096,
+            temperature=0.0,
+        ),
     )
     messages.append({"role": "assistant", "content": response})
     md_history = md_dumps_messages(messages)
@@ -412,64 +716,82 @@ async def import_only_infer(
     return {"instance_id": instance.instance_id, "patch": patch}
 
 
-@async_exception_handler
-async def file_iter_infer(
-    *,
+async def propose_build_file_edits(
     llm: BaseProvider,
     instance: RepoInstance,
     project_root: pathlib.Path,
-    workspace: pathlib.Path,
-    progress: Progress,
-    task_id: TaskID,
-):
-    # for efficiency
-    instruction_ = instruction.replace(
-        "1. The project may include multiple build files. Ensure you update all of them with the necessary dependency configurations.",
-        "1. The project may include multiple build files. You can only edit some of them with the necessary dependency configurations.",
-    )
+    src_groups: list[list[str]],
+    semaphore: asyncio.Semaphore,
+    project_structure: str,
+    completed: list[dict] | None = None,
+) -> tuple[list[dict[str, str]], list[dict]]:
+    """
+    Ask the LLM for build file edits given each group of source files.
 
-    instruction_ = instruction_.replace(
-        "3. **Source Code**: The full source code of the project.",
-        "3. **Source Code**: One source code file of the project.",
-    )
-    if not workspace.exists():
-        workspace.mkdir(parents=True, exist_ok=True)
-    else:
-        assert workspace.is_dir(), f"{workspace} is not a directory"
-    if (workspace / "patch.diff").exists():
-        cprint(f"Patch for {instance.instance_id} is already generated", "yellow")
-        progress.update(task_id, advance=1)
-        return {
-            "instance_id": instance.instance_id,
-            "patch": (workspace / "patch.diff").read_text(),
-        }
-    src_files = all_src_files(project_root, lang2suffix[instance.language.lower()])
-    all_messages = []
-    responses = []
-    for file in src_files:
-        messages = make_prompt(instance, project_root, [file], import_only=False)
-        try:
-            response = await query_llm(
-                llm=llm,
-                messages=messages,
-                max_new_tokens=4096,
-                temperature=0.0,
-                n=1,
-            )
-            messages.append({"role": "assistant", "content": response})
-            all_messages.extend(messages)
-            responses.append(response)
-        except Exception as e:
-            cprint(e, "red")
+    Groups are queried concurrently, bounded by `semaphore`. Prompts are only
+    built once a slot is acquired so that pending groups don't hold them in
+    memory. Proposed edits and messages are returned in the order of
+    `src_groups`; failed queries are skipped. The messages of each proposal
+    are also appended to `completed` as soon as it finishes, so they
+    survive a cancellation.
+    """
+
+    async def propose(files: list[str]) -> list[dict] | None:
+        async with semaphore:
+            try:
+                messages, response = await query_downgrading(
+                    ["source", "imports"],
+                    functools.partial(
+                        make_prompt,
+                        instance,
+                        project_root,
+                        files,
+                        project_structure=project_structure,
+                    ),
+                    functools.partial(
+                        query_llm_stream,
+                        llm,
+                        build_files=instance.build_files,
+                        max_new_tokens=4096,
+                        temperature=0.0,
+                    ),
+                )
+            except Exception as e:
+                cprint(e, "red")
+                return None
+        messages.append({"role": "assistant", "content": response})
+        if completed is not None:
+            completed.extend(messages)
+        return messages
+
+    proposals = await asyncio.gather(*(propose(files) for files in src_groups))
     proposed_edits = []
-    for response in responses:
-        proposed_edits.append(sanitize(response, instance))
+    all_messages = []
+    for messages in proposals:
+        if messages is None:
+            continue
+        all_messages.extend(messages)
+        proposed_edits.append(sanitize(messages[-1]["content"], instance))
+    return proposed_edits, all_messages
 
-    project_structure = show_project_structure(
-        project_root, exclude_dirs=[".git", ".github"]
-    )
-    final_edits = {}
-    for file in instance.build_files:
+
+async def merge_build_file_edits(
+    llm: BaseProvider,
+    instance: RepoInstance,
+    project_root: pathlib.Path,
+    proposed_edits: list[dict[str, str]],
+    semaphore: asyncio.Semaphore,
+    project_structure: str,
+) -> tuple[dict[str, str], list[dict]]:
+    """
+    Merge the proposed edits of every build file into its final content.
+
+    Build files are merged concurrently, bounded by `semaphore`. Returns the
+    merged build files and the merge conversations in `instance.build_files`
+    order.
+    """
+
+    async def merge(file: str) -> tuple[str | None, list[dict]]:
         origin_content = (project_root / file).read_text()
         build_section_for_current_file = file_template.format(
             path=file, content=origin_content
@@ -505,27 +827,162 @@ async def file_iter_infer(
             {"role": "user", "content": prompt},
         ]
         try:
-            response = await query_llm(
-                llm=llm,
-                messages=messages,
-                max_new_tokens=4096,
-                temperature=0.0,
-                n=1,
-            )
-            messages.append({"role": "assistant", "content": response})
-            all_messages.extend(messages)
-            new_build_content = sanitize(response, instance)
-            if file not in new_build_content:
-                cprint("No new content for the build file", "yellow")
-            else:
-                final_edits[file] = new_build_content[file]
+            async with semaphore:
+                response = await query_llm_stream(
+                    llm=llm,
+                    messages=messages,
+                    build_files=instance.build_files,
+                    expected=[file],
+                    max_new_tokens=4096,
+                    temperature=0.0,
+                )
         except Exception as e:
             cprint(e, "red")
+            return None, []
+        messages.append({"role": "assistant", "content": response})
+        new_build_content = sanitize(response, instance)
+        if file not in new_build_content:
+            cprint("No new content for the build file", "yellow")
+            return None, messages
+        return new_build_content[file], messages
+
+    merged = await asyncio.gather(*(merge(file) for file in instance.build_files))
+    final_edits = {}
+    all_messages = []
+    for file, (content, messages) in zip(instance.build_files, merged):
+        all_messages.extend(messages)
+        if content is not None:
+            final_edits[file] = content
+    return final_edits, all_messages
+
+
+@async_exception_handler
+async def file_iter_infer(
+    *,
+    llm: BaseProvider,
+    instance: RepoInstance,
+    project_root: pathlib.Path,
+    workspace: pathlib.Path,
+    progress: "Progress",
+    task_id: "TaskID",
+    concurrency: int = 8,
+):
+    # for efficiency
+    instruction_ = instruction.replace(
+        "1. The project may include multiple build files. Ensure you update all of them with the necessary dependency configurations.",
+        "1. The project may include multiple build files. You can only edit some of them with the necessary dependency configurations.",
+    )
+
+    instruction_ = instruction_.replace(
+        "3. **Source Code**: The full source code of the project.",
+        "3. **Source Code**: One source code file of the project.",
+    )
+    if not workspace.exists():
+        workspace.mkdir(parents=True, exist_ok=True)
+    else:
+        assert workspace.is_dir(), f"{workspace} is not a directory"
+    if (workspace / "patch.diff").exists():
+        cprint(f"Patch for {instance.instance_id} is already generated", "yellow")
+        progress.update(task_id, advance=1)
+        return {
+            "instance_id": instance.instance_id,
+            "patch": (workspace / "patch.diff").read_text(),
+        }
+    # walk the project once for both the source files and its structure
+    tree = ProjectTree(project_root)
+    src_files = all_src_files(tree, lang2suffix[instance.language.lower()])
+    project_structure = tree.render()
+    # per-instance bound on concurrent queries, on top of the global one
+    semaphore = asyncio.Semaphore(concurrency)
+    completed = []
+    try:
+        proposed_edits, all_messages = await propose_build_file_edits(
+            llm,
+            instance,
+            project_root,
+            [[file] for file in src_files],
+            semaphore,
+            project_structure,
+            completed,
+        )
+        final_edits, merge_messages = await merge_build_file_edits(
+            llm, instance, project_root, proposed_edits, semaphore, project_structure
+        )
+    except asyncio.CancelledError:
+        save_partial(workspace, completed)
+        raise
+    all_messages.extend(merge_messages)
 
     md_history = md_dumps_messages(all_messages)
     with (workspace / "build.md").open("w") as f:
         f.write(md_history)
-    trajs = json.dumps(messages)
+    trajs = json.dumps(all_messages)
+    with (workspace / "trajs.json").open("w") as f:
+        f.write(trajs)
+    patch = make_patch(final_edits, instance, project_root)
+    with (workspace / "patch.diff").open("w") as f:
+        f.write(patch)
+    progress.update(task_id, advance=1)
+    cprint(
+        f"Patch for {instance.instance_id} is saved at {workspace / 'patch.diff'}",
+        "green",
+    )
+    return {"instance_id": instance.instance_id, "patch": patch}
+
+
+@async_exception_handler
+async def file_pack_infer(
+    *,
+    llm: BaseProvider,
+    instance: RepoInstance,
+    project_root: pathlib.Path,
+    workspace: pathlib.Path,
+    progress: "Progress",
+    task_id: "TaskID",
+    concurrency: int = 8,
+    token_budget: int = 8192,
+):
+    """Like `file_iter_infer`, but query token-budgeted batches of source files."""
+    if not workspace.exists():
+        workspace.mkdir(parents=True, exist_ok=True)
+    else:
+        assert workspace.is_dir(), f"{workspace} is not a directory"
+    if (workspace / "patch.diff").exists():
+        cprint(f"Patch for {instance.instance_id} is already generated", "yellow")
+        progress.update(task_id, advance=1)
+        return {
+            "instance_id": instance.instance_id,
+            "patch": (workspace / "patch.diff").read_text(),
+        }
+    # walk the project once for both the source files and its structure
+    tree = ProjectTree(project_root)
+    src_files = all_src_files(tree, lang2suffix[instance.language.lower()])
+    project_structure = tree.render()
+    src_groups = pack_src_files(src_files, project_root, llm, token_budget)
+    semaphore = asyncio.Semaphore(concurrency)
+    completed = []
+    try:
+        proposed_edits, all_messages = await propose_build_file_edits(
+            llm,
+            instance,
+            project_root,
+            src_groups,
+            semaphore,
+            project_structure,
+            completed,
+        )
+        final_edits, merge_messages = await merge_build_file_edits(
+            llm, instance, project_root, proposed_edits, semaphore, project_structure
+        )
+    except asyncio.CancelledError:
+        save_partial(workspace, completed)
+        raise
+    all_messages.extend(merge_messages)
+
+    md_history = md_dumps_messages(all_messages)
+    with (workspace / "build.md").open("w") as f:
+        f.write(md_history)
+    trajs = json.dumps(all_messages)
     with (workspace / "trajs.json").open("w") as f:
         f.write(trajs)
     patch = make_patch(final_edits, instance, project_root)
@@ -539,61 +996,339 @@ async def file_iter_infer(
     return {"instance_id": instance.instance_id, "patch": patch}
 
 
+@async_exception_handler
+async def deps_only_infer(
+    *,
+    llm: BaseProvider,
+    instance: RepoInstance,
+    project_root: pathlib.Path,
+    workspace: pathlib.Path,
+    progress: "Progress",
+    task_id: "TaskID",
+):
+    """
+    Like `all_in_one_infer`, but the model only lists the dependencies of
+    each build file and the build files are rendered by the build system's
+    `dumps_dependencies`, so the reply is tens of tokens instead of whole
+    build files.
+    """
+    if not workspace.exists():
+        workspace.mkdir(parents=True, exist_ok=True)
+    else:
+        assert workspace.is_dir(), f"{workspace} is not a directory"
+    if (workspace / "patch.diff").exists():
+        cprint(f"Patch for {instance.instance_id} is already generated", "yellow")
+        progress.update(task_id, advance=1)
+        return {
+            "instance_id": instance.instance_id,
+            "patch": (workspace / "patch.diff").read_text(),
+        }
+    tree = ProjectTree(project_root)
+    src_files = all_src_files(tree, lang2suffix[instance.language.lower()])
+    messages, response = await query_downgrading(
+        ["source", "imports", "summary"],
+        functools.partial(
+            make_prompt,
+            instance,
+            project_root,
+            src_files,
+            project_structure=tree.render(),
+            dependencies_only=True,
+        ),
+        functools.partial(query_llm, llm, max_new_tokens=1024, temperature=0.0),
+    )
+    messages.append({"role": "assistant", "content": response})
+    with (workspace / "build.md").open("w") as f:
+        f.write(md_dumps_messages(messages))
+    with (workspace / "trajs.json").open("w") as f:
+        f.write(json.dumps(messages))
+    dependencies = sanitize_dependencies(response, instance)
+    with (workspace / "dependencies.json").open("w") as f:
+        f.write(json.dumps(dependencies, indent=2))
+    new_build_files = render_dependencies(dependencies, instance, project_root)
+    patch = make_patch(new_build_files, instance, project_root)
+    with (workspace / "patch.diff").open("w") as f:
+        f.write(patch)
+    progress.update(task_id, advance=1)
+    cprint(
+        f"Patch for {instance.instance_id} is saved at {workspace / 'patch.diff'}",
+        "green",
+    )
+    return {"instance_id": instance.instance_id, "patch": patch}
+
+
 infer_method = {
     "all-in-one": all_in_one_infer,
     "import-only": import_only_infer,
     "file-iter": file_iter_infer,
+    "file-pack": file_pack_infer,
+    "deps-only": deps_only_infer,
 }
 
 
+async def run_pipeline(
+    instances: Iterable[RepoInstance],
+    worker: Callable[[RepoInstance], Awaitable[None]],
+    max_pending: int,
+):
+    """
+    Bounded producer/consumer loop over the dataset.
+
+    Instances are pulled lazily from `instances` into a bounded queue and
+    processed by `max_pending` workers, so at most `max_pending` instances
+    (and therefore prompts) are held in memory at once. Nothing is kept
+    once an instance is done: `worker` hands its result over, e.g. to a
+    `ResultSink`.
+    """
+    assert max_pending > 0, "max_pending must be positive"
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+
+    async def produce():
+        for instance in instances:
+            await queue.put(instance)
+        for _ in range(max_pending):
+            await queue.put(None)
+
+    async def consume():
+        while (instance := await queue.get()) is not None:
+            await worker(instance)
+
+    await asyncio.gather(produce(), *(consume() for _ in range(max_pending)))
+
+
 def main(
     model: str = "gpt-4",
     method: str = "all-in-one",
+    model_backend: str = "openai",
+    backend_kwargs: dict | None = None,
     results_dir: str = "results/",
     workspace: str = "workspace/",
     dataset_name_or_path: str = "repo-regular.jsonl",
     repo_instances_dir: str | None = None,
+    max_concurrency: int = 16,
+    rpm: int | None = None,
+    tpm: int | None = None,
+    max_pending: int = 32,
+    request_timeout: float | None = 600.0,
+    instance_timeout: float | None = None,
+    cache_dir: str | None = ".cache/llm-responses",
+    replay: bool = False,
+    cache_max_mb: int | None = None,
+    cache_max_days: float | None = None,
+    file_concurrency: int = 8,
+    pack_token_budget: int = 8192,
+    import_workers: int | None = None,
+    import_cache_dir: str | None = ".cache/imports",
+    import_summary: bool = False,
+    price: tuple[float, float] | None = None,
 ):
-    dataset = load_bigbuild_dataset(dataset_name_or_path)
+    """
+    Infer dependencies for every instance in the dataset.
+
+    Along with the results, the LLM usage of each instance (tokens, latency,
+    retries, estimated cost) is appended to
+    `{results_dir}/{method}-{model}.metrics.jsonl`, see `dibench.telemetry`.
+
+    Args:
+        model_backend (str): `openai`, or one of the offline backends
+                             `replay` (completions recorded by a previous
+                             run) and `synthetic` (simulated completions).
+        backend_kwargs (dict, optional): Options of the backend, e.g.
+                                         `{"keepalive_expiry": 120}` for
+                                         `openai` (the pool defaults to
+                                         `max_concurrency` connections) or
+                                         `{"recordings": "workspace/"}` for
+                                         `replay`.
+        max_concurrency (int): Maximum number of in-flight LLM requests.
+                               Lowered automatically while the deployment
+                               throttles requests.
+        rpm (int, optional): Requests per minute allowed by the deployment.
+        tpm (int, optional): Tokens per minute allowed by the deployment,
+                             counted with the model's tokenizer.
+        max_pending (int): Maximum number of instances (and their prompts)
+                           being processed at the same time.
+        request_timeout (float, optional): Seconds before an LLM request
+                                           (a whole stream, for streamed
+                                           replies) is cancelled and
+                                           retried.
+        instance_timeout (float, optional): Seconds before an instance is
+                                            cancelled. It is left out of
+                                            the results so that a rerun
+                                            retries it; the proposals of
+                                            `file-iter` and `file-pack`
+                                            completed so far are saved in
+                                            its workspace.
+        cache_dir (str, optional): On-disk LLM response cache shared across
+                                   runs. Set to None to disable caching.
+        replay (bool): Only serve responses from the cache, never call the
+                       LLM. Uncached requests fail the instance.
+        cache_max_mb (int, optional): Evict the oldest cache entries beyond
+                                      this size.
+        cache_max_days (float, optional): Evict cache entries older than this.
+        file_concurrency (int): Maximum number of concurrent queries per
+                                instance for the `file-iter` and
+                                `file-pack` methods.
+        pack_token_budget (int): Source tokens per request for the
+                                 `file-pack` method.
+        import_workers (int, optional): Worker processes parsing source files
+                                        for the `import-only` method,
+                                        defaults to the CPU count.
+        import_cache_dir (str, optional): On-disk memo of extracted import
+                                          statements, keyed by file content.
+                                          Set to None to disable it.
+        import_summary (bool): For `import-only`, list each unique import
+                               statement once with the number of files
+                               using it, instead of per file.
+        price (tuple, optional): USD per million prompt and completion
+                                 tokens, to estimate costs of models missing
+                                 from (or priced differently than in)
+                                 `telemetry.PRICES`.
+    """
     result_path = pathlib.Path(results_dir) / f"{method}-{model}.jsonl"
+    metrics_path = pathlib.Path(results_dir) / f"{method}-{model}.metrics.jsonl"
+    price = tuple(price) if price is not None else model_price(model)
     workspace_path = pathlib.Path(workspace) / f"{method}-{model}"
     if not result_path.parent.exists():
         result_path.parent.mkdir(parents=True)
     if not workspace_path.exists():
         workspace_path.mkdir(parents=True)
-    llm = get_llm(model, use_async=True)
-    results = []
-    tasks = []
+    backend_kwargs = dict(backend_kwargs or {})
+    if model_backend == "openai":
+        # keep a warm connection for every request slot
+        backend_kwargs.setdefault("max_connections", max_concurrency)
+        backend_kwargs.setdefault("max_keepalive_connections", max_concurrency)
+    # one limiter per deployment paces all requests, honoring Retry-After
+    limiter = shared_limiter(
+        f"{model_backend}:{model}", max_concurrency=max_concurrency, rpm=rpm, tpm=tpm
+    )
+    llm = get_llm(model, model_backend, use_async=True, **backend_kwargs)
+    base_url = getattr(llm, "base_url", None)
+    if request_timeout is not None:
+        # the deadline covers the request only, not its wait for admission
+        llm = DeadlineProvider(llm, request_timeout)
+    # measures the requests themselves: neither cache hits nor the wait for
+    # admission are recorded, timeouts and other failures are
+    llm = RateLimitedProvider(TelemetryProvider(llm), limiter)
+    if cache_dir is not None:
+        cache = ResponseCache(
+            cache_dir,
+            max_size=cache_max_mb * 1024 * 1024 if cache_max_mb else None,
+            max_age=cache_max_days * 24 * 3600 if cache_max_days else None,
+            readonly=replay,
+        )
+        # cache hits must not take a concurrency slot, so it wraps the limiter
+        llm = CachedProvider(llm, cache, backend=model_backend, base_url=base_url)
+    else:
+        assert not replay, "replay requires a cache_dir"
+    import_extractor = ImportExtractor(import_workers, import_cache_dir)
+    method_kwargs = {
+        "import-only": dict(
+            import_extractor=import_extractor, import_summary=import_summary
+        ),
+        "file-iter": dict(concurrency=file_concurrency),
+        "file-pack": dict(concurrency=file_concurrency, token_budget=pack_token_budget),
+    }.get(method, {})
+    # results are appended as instances finish, instances already in the
+    # store are skipped
+    sink = ResultSink(result_path)
+    metrics_sink = ResultSink(metrics_path)
     with progress("DepInfer") as p:
-        tasks = []
-        task_id = p.add_task("DepInfer", total=len(dataset))
-        for instance in dataset:
-            workspace = (
+        task_id = p.add_task("DepInfer", total=count_instances(dataset_name_or_path))
+
+        def pending_instances() -> Iterator[RepoInstance]:
+            for instance in iter_bigbuild_dataset(dataset_name_or_path):
+                if instance.instance_id in sink:
+                    p.update(task_id, advance=1)
+                    continue
+                yield instance
+
+        async def infer(instance: RepoInstance):
+            instance_workspace = (
                 workspace_path / instance.language.lower() / instance.instance_id
             )
-            project_root = (
-                pathlib.Path(repo_instances_dir)
-                / instance.language.lower()
-                / instance.instance_id
+            start = time.perf_counter()
+            result = None
+            with track_instance() as metrics:
+                try:
+                    result = await asyncio.wait_for(
+                        infer_method[method](
+                            llm=llm,
+                            instance=instance,
+                            project_root=pathlib.Path(repo_instances_dir)
+                            / instance.language.lower()
+                            / instance.instance_id,
+                            workspace=instance_workspace,
+                            progress=p,
+                            task_id=task_id,
+                            **method_kwargs,
+                        ),
+                        instance_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    cprint(
+                        f"{instance.instance_id} timed out after "
+                        f"{instance_timeout}s, partial results are kept at "
+                        f"{instance_workspace}",
+                        "red",
+                    )
+                    instance_workspace.mkdir(parents=True, exist_ok=True)
+                    with open(instance_workspace / "error.log", "w") as f:
+                        f.write(f"Timed out after {instance_timeout}s\n")
+                    p.update(task_id, advance=1)
+            if result is None:
+                status = "timeout"
+            else:
+                status = "ok" if result["patch"] is not None else "failed"
+            await metrics_sink.put(
+                {
+                    "instance_id": instance.instance_id,
+                    "language": instance.language.lower(),
+                    "method": method,
+                    "model": model,
+                    "status": status,
+                    "latency": time.perf_counter() - start,
+                    **metrics.dump(price),
+                }
             )
-            tasks.append(
-                infer_method[method](
-                    llm=llm,
-                    instance=instance,
-                    project_root=project_root,
-                    workspace=workspace,
-                    progress=p,
-                    task_id=task_id,
-                )
+            # failed instances are left out so that a rerun retries them
+            if status == "ok":
+                # the prompt strategies actually used, smaller than the
+                # method's when the prompt overflowed the context window
+                await sink.put(result | {"strategies": metrics.strategies})
+
+        async def run():
+            sink.start()
+            metrics_sink.start()
+            try:
+                await run_pipeline(pending_instances(), infer, max_pending)
+            finally:
+                # also runs when Ctrl-C cancels the pipeline
+                await sink.close()
+                await metrics_sink.close()
+
+        try:
+            asyncio.run(run())
+        except KeyboardInterrupt:
+            cprint(
+                f"Interrupted, {len(sink)} results are saved at {result_path}",
+                "yellow",
             )
-        loop = asyncio.get_event_loop()
-        coros = asyncio.gather(*tasks)
-        results = loop.run_until_complete(coros)
-    with result_path.open("w") as f:
-        json.dump(results, f, indent=2)
+            raise
+        finally:
+            import_extractor.shutdown()
 
 
 if __name__ == "__main__":
+    import sys
+
     from fire import Fire
 
+    if "--help" in sys.argv or "-h" in sys.argv:
+        # Fire describes components with IPython when it is installed, whose
+        # import alone outweighs the rest of the startup. `fire.inspectutils`
+        # imports `IPython.core.oinspect` and falls back to its built-in
+        # inspector on ImportError, which a None entry in `sys.modules`
+        # raises. If Fire stops falling back, IPython is imported again:
+        # `tests/test_startup.py` checks it is not.
+        sys.modules.setdefault("IPython.core", None)
     Fire(main)
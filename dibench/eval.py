@@ -1,5 +1,8 @@
 import json
+import multiprocessing
+import os
 import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from typing import List
 
@@ -7,6 +10,25 @@ from dibench import RepoInstance
 from dibench.evaluate.evaluator import BuildEvaluator
 from dibench.evaluate.utils import CacheLevel, EvalArgs
 from dibench.utils import cprint, progress
+from dibench.utils.workspace import CloneMode
+
+# slots shared by the worker processes, see `_init_worker`
+_text_slots = None
+_exec_slots = None
+
+
+def _init_worker(text_slots, exec_slots):
+    global _text_slots, _exec_slots
+    _text_slots, _exec_slots = text_slots, exec_slots
+
+
+def evaluate(args: EvalArgs, eval_result_path: Path) -> dict:
+    """Evaluate one prediction in a worker process and save its result."""
+    evaluator = BuildEvaluator(args, text_slot=_text_slots, exec_slot=_exec_slots)
+    evaluator.run()
+    with open(eval_result_path, "w") as f:
+        json.dump(evaluator.result, f, indent=2)
+    return evaluator.result
 
 
 def main(
@@ -19,60 +41,114 @@ def main(
     timeout: int = 1200,
     resume: bool = True,
     id_range: List[int] = None,
+    workers: int | None = None,
+    exec_workers: int = 4,
+    clone_mode: CloneMode = "auto",
+    oracle_cache_dir: str | None = ".cache/oracle",
 ) -> None:
+    """
+    Evaluate the predictions in `result_dir` in parallel.
+
+    Instances are pulled from a shared queue by worker processes, so a slow
+    instance only holds up its own worker. Setting up the testbeds and
+    computing the text metrics (CPU and disk bound) and running the tests
+    in containers are limited separately.
+
+    Args:
+        workers (int, optional): Instances set up and scored at the same
+                                 time, defaults to the CPU count.
+        exec_workers (int): Test runs (containers) at the same time, for
+                            `exec_eval`.
+        clone_mode (str): How testbeds share files with the project:
+                          `reflink`, `hardlink`, `copy`, or `auto` for the
+                          cheapest the filesystem supports. Hardlinks are
+                          only used for testbeds never run, even with
+                          `hardlink`, see `dibench.utils.workspace`.
+        oracle_cache_dir (str, optional): On-disk cache of the oracle build
+                                          files and dependencies of each
+                                          instance, shared by all models and
+                                          runs. Set to None to disable it.
+    """
+    if exec_eval and clone_mode == "hardlink":
+        cprint(
+            "Hardlinks can't isolate testbeds that are run, model testbeds are "
+            "reflinked or copied instead",
+            "yellow",
+        )
     with open(dataset_name_or_path, "r") as f:
         dataset = [json.loads(line.strip()) for line in f.readlines()]
         dataset = [RepoInstance(**instance) for instance in dataset]
     if id_range is not None:
         dataset = dataset[id_range[0] : id_range[1]]
     result_dir: Path = Path(result_dir)
-    with progress("Evaluating") as p:
-        for instance in p.track(dataset):
-            cprint(f"Evaluating {instance.language}/{instance.instance_id}", "green")
-            instance_id = instance.instance_id
-            prediction_path: Path = (
-                result_dir / instance.language.lower() / instance_id / "patch.diff"
-            )
-            if prediction_path.exists():
-                prediction = prediction_path.read_text()
-            else:
-                cprint("Prediction file not found, skipping evaluation", "yellow")
-                continue
-            eval_result_path = (
-                result_dir
-                / instance.language.lower()
-                / instance_id
-                / "eval-result.json"
-            )
-            project_root = (
-                Path(repo_instances_dir)
-                / instance.language.lower()
-                / instance.instance_id
+    workers = workers or os.cpu_count() or 1
+    jobs = []
+    for instance in dataset:
+        instance_id = instance.instance_id
+        prediction_path: Path = (
+            result_dir / instance.language.lower() / instance_id / "patch.diff"
+        )
+        if not prediction_path.exists():
+            cprint(
+                f"Prediction file not found for {instance.language}/{instance_id}, "
+                "skipping evaluation",
+                "yellow",
             )
-            workspace = (
-                result_dir / instance.language.lower() / instance_id / "eval-workspace"
-            )
-            if not resume:
-                # remove workspace and eval result if exists
-                if workspace.exists():
-                    shutil.rmtree(workspace)
-                if eval_result_path.exists():
-                    eval_result_path.unlink()
-            args = EvalArgs(
-                instance=instance,
-                project_root=project_root,
-                prediction=prediction,
-                workspace=workspace,
-                text_eval=text_eval,
-                exec_eval=exec_eval,
-                cache_level=cache_level,
-                timeout=timeout,
-                resume=resume,
-            )
-            evaluator = BuildEvaluator(args)
-            evaluator.run()
-            with open(eval_result_path, "w") as f:
-                json.dump(evaluator.result, f, indent=2)
+            continue
+        eval_result_path = (
+            result_dir / instance.language.lower() / instance_id / "eval-result.json"
+        )
+        project_root = (
+            Path(repo_instances_dir) / instance.language.lower() / instance.instance_id
+        )
+        workspace = (
+            result_dir / instance.language.lower() / instance_id / "eval-workspace"
+        )
+        if not resume:
+            # remove workspace and eval result if exists
+            if workspace.exists():
+                shutil.rmtree(workspace)
+            if eval_result_path.exists():
+                eval_result_path.unlink()
+        args = EvalArgs(
+            instance=instance,
+            project_root=project_root,
+            prediction=prediction_path.read_text(),
+            workspace=workspace,
+            text_eval=text_eval,
+            exec_eval=exec_eval,
+            cache_level=cache_level,
+            timeout=timeout,
+            resume=resume,
+            clone_mode=clone_mode,
+            oracle_cache_dir=oracle_cache_dir,
+        )
+        jobs.append((args, eval_result_path))
+
+    # a worker waiting for a container slot does not hold a text slot, so
+    # there are enough processes to keep both kinds of work busy
+    text_slots = multiprocessing.Semaphore(workers)
+    exec_slots = multiprocessing.Semaphore(exec_workers)
+    processes = workers + exec_workers if exec_eval else workers
+    with progress("Evaluating") as p, ProcessPoolExecutor(
+        max_workers=min(processes, len(jobs)) or 1,
+        initializer=_init_worker,
+        initargs=(text_slots, exec_slots),
+    ) as pool:
+        task_id = p.add_task("Evaluating", total=len(jobs))
+        futures = {pool.submit(evaluate, *job): job[0].instance for job in jobs}
+        for future in as_completed(futures):
+            instance = futures[future]
+            try:
+                future.result()
+                cprint(f"Evaluated {instance.language}/{instance.instance_id}", "green")
+            except Exception as e:
+                cprint(
+                    f"Failed to evaluate {instance.language}/{instance.instance_id}: "
+                    f"{e}",
+                    "red",
+                )
+            p.update(task_id, advance=1)
 
 
 if __name__ == "__main__":
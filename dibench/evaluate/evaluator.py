@@ -1,3 +1,4 @@
+import functools
 import json
 import shlex
 import shutil
@@ -5,6 +6,7 @@ import subprocess
 import traceback
 import uuid
 from collections import defaultdict
+from contextlib import AbstractContextManager, nullcontext
 from pathlib import Path
 
 from dibench.evaluate.constants import (
@@ -17,17 +19,45 @@ from dibench.evaluate.constants import (
     GIT_COMMIT_FAIL,
     GIT_COMMIT_PASS,
 )
+from dibench.evaluate.oracle import OracleCache
 from dibench.evaluate.utils import EvalArgs, EvaluationError
-from dibench.utils.buildfile import Dependency, make_buildfile
+from dibench.utils.buildfile import (
+    BuildFile,
+    Dependency,
+    RegistryError,
+    make_buildfile,
+)
 from dibench.utils.ci import run_test_ci
+from dibench.utils.diff import PatchApplyError, apply_patch_with_fallback, parse_patch
 from dibench.utils.log import close_logger, setup_logger
+from dibench.utils.workspace import clone_tree, detach
+
+
+@functools.lru_cache(maxsize=65536)
+def _is_fake_lib(build_system: type[BuildFile], dependency: Dependency, **kwargs):
+    # registries give the same answer for the whole run, and the predictions
+    # of different models (and instances) share most of their dependencies;
+    # lookups without a definite answer raise `RegistryError`, which is not
+    # cached
+    return build_system.is_fake_lib(dependency, **kwargs)
 
 
 class BuildEvaluator:
     def __init__(
         self,
         args: EvalArgs,
+        text_slot: AbstractContextManager | None = None,
+        exec_slot: AbstractContextManager | None = None,
     ):
+        """
+        :param args: The instance, prediction and options to evaluate.
+        :param text_slot: Held while setting up the testbeds and computing
+                          the text metrics (CPU and disk bound), e.g. a
+                          semaphore shared by parallel evaluations.
+        :param exec_slot: Held while running the tests in containers.
+        """
+        self.text_slot = text_slot or nullcontext()
+        self.exec_slot = exec_slot or nullcontext()
         self.resume = args.resume
         self.instance_id = args.instance.instance_id
         self.instance = args.instance
@@ -44,6 +74,15 @@ class BuildEvaluator:
         self.text_eval = args.text_eval
         self.cache_level = args.cache_level
         self.timeout = args.timeout
+        self.clone_mode = args.clone_mode
+        self.oracle_cache = (
+            OracleCache(args.oracle_cache_dir) if args.oracle_cache_dir else None
+        )
+        # text only: patch and parse the build files in memory, see
+        # `_patch_in_memory`
+        self.in_memory = not args.exec_eval
+        self.oracle_contents = None
+        self.model_contents = None
         self.text_result = None
         self.exec_result = None
         self.patch_exec_result = None
@@ -51,7 +90,52 @@ class BuildEvaluator:
         self.detail = None
         self.patch_exec_result = None
 
-    def _apply_patch(self, testbed: Path, patch_file: Path):
+    def _apply_patch(self, testbed: Path, patch: str):
+        """
+        Apply `patch` to `testbed`, in-process when possible. Predicted
+        patches only touch a handful of build files, so they are applied to
+        those files directly; anything the in-process applier rejects goes
+        through `git apply` / `patch` as before.
+        """
+        try:
+            self._apply_patch_in_process(testbed, patch)
+            return
+        except (PatchApplyError, UnicodeDecodeError, OSError) as e:
+            self.logger.info(f"In-process apply failed ({e}), using git apply")
+        # the files git apply / patch will touch are unknown
+        detach(testbed)
+        patch_file = testbed / f"patch-{str(uuid.uuid4())[:4]}.diff"
+        patch_file.write_text(patch)
+        self._apply_patch_file(testbed, patch_file)
+
+    def _apply_patch_in_process(self, testbed: Path, patch: str):
+        paths = set()
+        for file_patch in parse_patch(patch):
+            paths.update(
+                p for p in (file_patch.old_path, file_patch.new_path) if p is not None
+            )
+        # testbeds may share files with the project, see `clone_tree`
+        detach(testbed, paths)
+        root = testbed.resolve()
+        files = {}
+        for path in paths:
+            file = (testbed / path).resolve()
+            if not file.is_relative_to(root):
+                raise PatchApplyError(f"{path} is outside the testbed")
+            if file.exists():
+                with open(file, encoding="utf-8", newline="") as f:
+                    files[path] = f.read()
+        patched = apply_patch_with_fallback(files, patch)
+        for path in files.keys() - patched.keys():
+            (testbed / path).unlink()
+        for path, content in patched.items():
+            if files.get(path) != content:
+                (testbed / path).parent.mkdir(parents=True, exist_ok=True)
+                with open(testbed / path, "w", encoding="utf-8", newline="") as f:
+                    f.write(content)
+        self.logger.info(f"{APPLY_PATCH_PASS}\n{', '.join(sorted(paths))}")
+
+    def _apply_patch_file(self, testbed: Path, patch_file: Path):
         result = subprocess.run(
             shlex.split(
                 f"git apply --allow-empty -v --ignore-whitespace --ignore-space-change {str(patch_file.relative_to(testbed))}"
@@ -131,14 +215,17 @@ class BuildEvaluator:
     # ci based execution evaluation
     def _exec_eval(self):
         try:
-            self._ci_test(self.model_root, "exec-output.log")
+            with self.exec_slot:
+                self._ci_test(self.model_root, "exec-output.log")
             return "pass"
         except Exception as e:
             self.logger.error(e)
             self.logger.error(traceback.format_exc())
             return "fail"
 
-    def __parse_dependencies(self, testbed: Path) -> dict:
+    def __parse_dependencies(
+        self, testbed: Path, contents: dict[str, str | None] | None = None
+    ) -> dict:
         """
         Parse dependencies from a given patch.
 
@@ -148,12 +235,15 @@ class BuildEvaluator:
         utilizes the build system to parse and return the dependencies.
 
         :param testbed: The path to the testbed directory.
-        :param patch: The patch string containing dependency changes.
+        :param contents: In-memory files overriding those of `testbed`.
         :return: A dictionary where keys are build files and values are lists
                  of dependencies.
         """
         build_system = make_buildfile(
-            self.instance.language.lower(), testbed, self.instance.build_files
+            self.instance.language.lower(),
+            testbed,
+            self.instance.build_files,
+            contents,
         )
         return build_system.parse_dependencies()
 
@@ -202,12 +292,19 @@ class BuildEvaluator:
         )
         return dict(exact=exact, name_only=name_only)
 
-    def _text_eval(self, oracle_dependencies: dict, model_dependencies: dict) -> dict:
+    def _text_eval(
+        self,
+        oracle_dependencies: dict,
+        model_dependencies: dict,
+        check_fake_libs: bool = True,
+    ) -> dict:
         """
         Evaluate the textual metrics by comparing the model's predictions with the oracle's predictions.
 
         :param oracle_dependencies: The oracle's dependencies for each build file.
         :param model_dependencies: The model's dependencies for each build file.
+        :param check_fake_libs: Whether to look the predicted dependencies up in
+                                their registry, `fake_libs` is None otherwise.
         :return: A dictionary containing the textual metrics: exact and name_only.
         """
         assert (
@@ -217,10 +314,11 @@ class BuildEvaluator:
             self.instance.language.lower(),
             self.oracle_root,
             self.instance.build_files,
+            self.oracle_contents,
         )
         # Initialize the counters for the textual metrics
         exact_result, name_only_result = defaultdict(int), defaultdict(int)
-        fake_libs = 0
+        fake_libs = 0 if check_fake_libs else None
         for file in oracle_dependencies.keys():
             # Compute the textual metrics for each build file
             result = self.__compute_textual_metric(
@@ -235,10 +333,13 @@ class BuildEvaluator:
                 )
             else:
                 kwargs = dict()
-            fake_libs += sum(
-                build_system.is_fake_lib(dep, **kwargs)
-                for dep in model_dependencies[file]
-            )
+            if check_fake_libs:
+                for dep in model_dependencies[file]:
+                    try:
+                        fake_libs += _is_fake_lib(type(build_system), dep, **kwargs)
+                    except RegistryError as e:
+                        # unknown, counted as real rather than guessed
+                        self.logger.warning(f"Failed to look up {dep.name}: {e}")
             # Update the counters for the textual metrics
             exact_result["TP"] += result["exact"]["TP"]
             exact_result["FP"] += result["exact"]["FP"]
@@ -251,49 +352,115 @@ class BuildEvaluator:
             exact=exact_result, name_only=name_only_result, fake_libs=fake_libs
         )
 
-    def run(self) -> dict:
+    def _patch_in_memory(self, patch: str) -> dict[str, str | None]:
         """
-        Executes the evaluation process by setting up the oracle and model workspaces,
-        applying patches, performing text and execution evaluations, and saving the results.
+        Apply `patch` to the project without writing anything.
 
-        This function performs the following steps:
-        1. Creates an oracle workspace by copying the project root and applies the oracle patch.
-        2. Creates a model workspace by copying the project root and applies the prediction patch.
-        3. Conducts a text evaluation to compare the model's prediction against the oracle.
-        4. If enabled, performs an execution evaluation.
-        5. If patch evaluation is enabled and the language is Python, performs a patch execution evaluation.
-        6. Writes the evaluation results to a result file.
-        7. Cleans up the workspace by removing temporary files and directories.
+        :return: The content of the build files and of the files `patch`
+                 touches once patched, None for deleted files. Parsers read
+                 them instead of the project's files, see `BuildFile`.
+        """
+        paths = set(self.instance.build_files)
+        for file_patch in parse_patch(patch):
+            paths.update(
+                p for p in (file_patch.old_path, file_patch.new_path) if p is not None
+            )
+        root = self.project_root.resolve()
+        files = {}
+        for path in paths:
+            file = (self.project_root / path).resolve()
+            if not file.is_relative_to(root):
+                raise PatchApplyError(f"{path} is outside the project")
+            if file.is_file():
+                with open(file, encoding="utf-8", newline="") as f:
+                    files[path] = f.read()
+        patched = apply_patch_with_fallback(files, patch)
+        self.logger.info(f"{APPLY_PATCH_PASS} (in memory)\n{', '.join(sorted(paths))}")
+        return {path: patched.get(path) for path in paths | patched.keys()}
 
-        Returns:
-            A dictionary containing the evaluation results.
+    def _setup_oracle(self):
+        """
+        Build the oracle testbed and parse its dependencies, or load them
+        from the oracle cache. Without execution evaluation, or on a cache
+        hit, nothing is materialized: the oracle build files are kept in
+        `oracle_contents`, over the project root.
         """
         self.oracle_root = self.workspace / "oracle"
         if self.oracle_root.exists():
             shutil.rmtree(self.oracle_root)
-        shutil.copytree(self.project_root, self.oracle_root, symlinks=True)
-        patch_file = self.oracle_root / f"patch-{str(uuid.uuid4())[:4]}.diff"
-        patch_file.write_text(self.instance.patch)
-        self._apply_patch(self.oracle_root, patch_file)
+        oracle = self.oracle_cache.get(self.instance) if self.oracle_cache else None
+        if oracle is not None:
+            self.logger.info("Oracle loaded from the oracle cache")
+            self.oracle_root = self.project_root
+            self.oracle_contents = oracle["build_files"]
+            self.oracle_dependencies = oracle["dependencies"]
+            return
+        if self.in_memory:
+            try:
+                self.oracle_contents = self._patch_in_memory(self.instance.patch)
+            except (PatchApplyError, UnicodeDecodeError, OSError) as e:
+                self.logger.info(f"In-memory apply failed ({e}), cloning the oracle")
+        if self.oracle_contents is not None:
+            self.oracle_root = self.project_root
+            self.oracle_dependencies = self.__parse_dependencies(
+                self.oracle_root, self.oracle_contents
+            )
+            if self.oracle_cache is not None:
+                self.oracle_cache.put(
+                    self.instance,
+                    {
+                        file: self.oracle_contents.get(file)
+                        for file in self.instance.build_files
+                    },
+                    self.oracle_dependencies,
+                )
+            return
+        mode = clone_tree(self.project_root, self.oracle_root, self.clone_mode)
+        self.logger.info(f"Oracle testbed cloned with {mode}")
+        self._apply_patch(self.oracle_root, self.instance.patch)
         self.oracle_dependencies = self.__parse_dependencies(self.oracle_root)
-        self.detail = dict()
-        self.detail["oracle"] = {
-            file: [dep.name for dep in deps]
-            for file, deps in self.oracle_dependencies.items()
-        }
-        assert self.instance.build_files == list(
-            self.oracle_dependencies.keys()
-        ), "Build files mismatch"
+        if self.oracle_cache is not None:
+            build_files = {}
+            for file in self.instance.build_files:
+                try:
+                    with open(
+                        self.oracle_root / file, encoding="utf-8", newline=""
+                    ) as f:
+                        build_files[file] = f.read()
+                except FileNotFoundError:
+                    build_files[file] = None
+            self.oracle_cache.put(self.instance, build_files, self.oracle_dependencies)
 
+    def _setup_model(self, prediction: str):
+        """
+        Build the model testbed of `prediction`, or patch it in memory
+        without execution evaluation, and parse its dependencies. They are
+        empty when the prediction does not apply or parse.
+        """
         self.model_root = self.workspace / "model"
+        self.model_contents = None
         try:
-            if self.model_root.exists():
-                shutil.rmtree(self.model_root)
-            shutil.copytree(self.project_root, self.model_root, symlinks=True)
-            patch_file = self.model_root / f"patch-{str(uuid.uuid4())[:4]}.diff"
-            patch_file.write_text(self.prediction)
-            self._apply_patch(self.model_root, patch_file)
-            self.model_dependencies = self.__parse_dependencies(self.model_root)
+            if self.in_memory:
+                try:
+                    self.model_contents = self._patch_in_memory(prediction)
+                    self.model_root = self.project_root
+                except (PatchApplyError, UnicodeDecodeError, OSError) as e:
+                    self.logger.info(f"In-memory apply failed ({e}), cloning the model")
+            if self.model_contents is None:
+                if self.model_root.exists():
+                    shutil.rmtree(self.model_root)
+                # tests modify files in place, which hardlinks can't isolate
+                mode = clone_tree(
+                    self.project_root,
+                    self.model_root,
+                    self.clone_mode,
+                    hardlinks=not self.exec_eval,
+                )
+                self.logger.info(f"Model testbed cloned with {mode}")
+                self._apply_patch(self.model_root, prediction)
+            self.model_dependencies = self.__parse_dependencies(
+                self.model_root, self.model_contents
+            )
             for file in self.instance.build_files:
                 if file not in self.model_dependencies:
                     self.model_dependencies[file] = []
@@ -303,14 +470,45 @@ class BuildEvaluator:
             )
             self.model_dependencies = {file: [] for file in self.instance.build_files}
 
-        self.detail["predicted"] = {
-            file: [dep.name for dep in deps]
-            for file, deps in self.model_dependencies.items()
-        }
-        self._text_eval(
-            oracle_dependencies=self.oracle_dependencies,
-            model_dependencies=self.model_dependencies,
-        )
+    def run(self) -> dict:
+        """
+        Executes the evaluation process by setting up the oracle and model workspaces,
+        applying patches, performing text and execution evaluations, and saving the results.
+
+        This function performs the following steps:
+        1. Creates an oracle workspace by cloning the project root and applies the oracle patch,
+           unless the oracle is cached.
+        2. Creates a model workspace by cloning the project root and applies the prediction patch.
+           Without execution evaluation, both patches are applied to the build files in memory instead.
+        3. Conducts a text evaluation to compare the model's prediction against the oracle.
+        4. If enabled, performs an execution evaluation.
+        5. If patch evaluation is enabled and the language is Python, performs a patch execution evaluation.
+        6. Writes the evaluation results to a result file.
+        7. Cleans up the workspace by removing temporary files and directories.
+
+        Returns:
+            A dictionary containing the evaluation results.
+        """
+        with self.text_slot:
+            self._setup_oracle()
+            self.detail = dict()
+            self.detail["oracle"] = {
+                file: [dep.name for dep in deps]
+                for file, deps in self.oracle_dependencies.items()
+            }
+            assert self.instance.build_files == list(
+                self.oracle_dependencies.keys()
+            ), "Build files mismatch"
+
+            self._setup_model(self.prediction)
+            self.detail["predicted"] = {
+                file: [dep.name for dep in deps]
+                for file, deps in self.model_dependencies.items()
+            }
+            self._text_eval(
+                oracle_dependencies=self.oracle_dependencies,
+                model_dependencies=self.model_dependencies,
+            )
         results = {}
         if self.result_file.exists():
             results = json.loads(self.result_file.read_text())
@@ -334,6 +532,29 @@ class BuildEvaluator:
             f.write(json.dumps(self.result, indent=2))
         self._clean_workspace()
 
+    def score(
+        self, predictions: dict[str, str], check_fake_libs: bool = True
+    ) -> dict[str, dict]:
+        """
+        Text metrics of several predictions for the instance, e.g. of
+        different models, against an oracle set up and parsed once. Nothing
+        is run and no result file is written.
+
+        :param predictions: Predicted patches by name.
+        :param check_fake_libs: See `_text_eval`.
+        :return: The text metrics of each prediction, by name.
+        """
+        scores = {}
+        with self.text_slot:
+            self._setup_oracle()
+            for name, prediction in predictions.items():
+                self._setup_model(prediction)
+                self._text_eval(
+                    self.oracle_dependencies, self.model_dependencies, check_fake_libs
+                )
+                scores[name] = self.text_result
+        return scores
+
     @property
     def result(self) -> dict:
         return {
@@ -0,0 +1,78 @@
+"""
+On-disk cache of the oracle side of evaluations, shared across models and
+runs: the oracle patch of an instance yields the same build files and
+dependencies whichever prediction it is compared with.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import uuid
+from pathlib import Path
+from typing import Any
+
+from dibench import RepoInstance
+
+__all__ = ["OracleCache"]
+
+# bump when parsing changes, so that stale entries are ignored
+VERSION = 1
+
+
+class OracleCache:
+    """
+    Oracle build files and parsed dependencies of each instance, in
+    `{cache_dir}/{language}/{instance_id}-{key}.pkl` where the key hashes
+    the oracle patch and build file list. Entries are pickled since
+    dependencies are language specific objects.
+
+    :param cache_dir: Directory holding the cache entries.
+    """
+
+    def __init__(self, cache_dir: str | Path):
+        self.cache_dir = Path(cache_dir)
+
+    @staticmethod
+    def key(instance: RepoInstance) -> str:
+        payload = json.dumps(
+            [VERSION, instance.instance_id, instance.build_files, instance.patch]
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def _path(self, instance: RepoInstance) -> Path:
+        return (
+            self.cache_dir
+            / instance.language.lower()
+            / f"{instance.instance_id}-{self.key(instance)}.pkl"
+        )
+
+    def get(self, instance: RepoInstance) -> dict[str, Any] | None:
+        """
+        The cached oracle of `instance`, as `{"build_files": {path: content},
+        "dependencies": {path: [Dependency]}}`, or None.
+        """
+        try:
+            with open(self._path(instance), "rb") as f:
+                return pickle.load(f)
+        except (FileNotFoundError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+
+    def put(
+        self,
+        instance: RepoInstance,
+        build_files: dict[str, str | None],
+        dependencies: dict[str, list],
+    ):
+        """
+        :param build_files: Content of each oracle build file, None if the
+                            oracle patch deletes it.
+        :param dependencies: Parsed dependencies of each build file.
+        """
+        path = self._path(instance)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so that concurrent readers never see partial entries
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"build_files": build_files, "dependencies": dependencies}, f)
+        os.replace(tmp_path, path)
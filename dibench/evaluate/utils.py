@@ -5,6 +5,7 @@ from typing import List, Literal
 import tabulate
 
 from dibench import RepoInstance
+from dibench.utils.workspace import CloneMode
 
 
 class EvaluationError(Exception):
@@ -37,6 +38,8 @@ class EvalArgs:
     cache_level: CacheLevel
     timeout: int
     resume: bool
+    clone_mode: CloneMode = "auto"
+    oracle_cache_dir: str | None = None
 
 
 def get_gold_predictions(dataset_name_or_path: str) -> list[dict]:
@@ -39,6 +39,29 @@ To suggest changes to a file you MUST return a *file listing* that contains the
 Create a new file you MUST return a *file listing* which includes an appropriate filename, including any appropriate path.
 """
 
+dependencies_instruction = """\
+List the dependencies each build file needs to ensure the project builds and runs \
+successfully. Do NOT output the build files, they are generated from your list.
+
+You will receive four sections of information to configure dependencies in build files:
+1. **Project Structure**: A tree structure representing the project's layout.
+2. **Environment Specifications**: Details about the operating system and language SDK where the project will run.
+3. **Source Code**: The full source code of the project.
+4. **Build Files**: Build files missing dependency configurations, which you will need to list dependencies for.
+
+!Important Notes:
+1. The project may include multiple build files. List the dependencies of every build file that needs any.
+2. Only use the files listed in the "Build Files" section as keys.
+3. List the complete dependencies of each build file, including those it already declares.
+
+You MUST answer with a single JSON object mapping each build file path to its dependencies, \
+in a ```json block, for example:
+
+```json
+{example}
+```
+"""
+
 task_information_template = """\
 --- Begin of Project Structure ---
 {project_structure}
@@ -62,6 +85,12 @@ file_template = """\
 {content}
 ```"""
 
+import_summary_template = """\
+Unique import statements across the project, with the number of files using each:
+```
+{content}
+```"""
+
 
 merge_build_files_instruction = """\
 Here is a list of edits to a project's build files, which is generated by change \
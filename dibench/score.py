@@ -0,0 +1,263 @@
+"""
+Score the text metrics of many models at once, without running anything.
+
+    python -m dibench.score results/ [more results dirs or files] \
+        --dataset_name_or_path repo-regular.jsonl \
+        --repo_instances_dir repo-regular
+
+Instances are streamed through worker processes. The oracle of each
+instance is parsed once and the predictions of every model are compared
+with it in the same pass, see `BuildEvaluator.score`. Every model is scored
+on every instance predicted by any of them: a missing prediction counts as
+an empty patch, all the oracle dependencies missed.
+"""
+
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator
+
+import tabulate
+
+from dibench import RepoInstance
+from dibench.evaluate.evaluator import BuildEvaluator
+from dibench.evaluate.utils import EvalArgs
+from dibench.telemetry import METRICS_SUFFIX
+from dibench.utils import cprint, progress
+
+
+def _prediction_sources(path: Path) -> list[tuple[str, Path]]:
+    """The (model, file or directory) pairs holding predictions in `path`."""
+    if not path.is_dir():
+        return [(path.stem, path)]
+    sources = [
+        (file.stem, file)
+        for file in sorted(path.glob("*.jsonl"))
+        if not file.name.endswith(METRICS_SUFFIX)
+    ]
+    if any(path.glob("*/*/patch.diff")):
+        sources.append((path.name, path))
+    return sources
+
+
+def load_predictions(paths: list[str | Path]) -> dict[str, dict[str, str | None]]:
+    """
+    The predicted patches in `paths`, as `{instance_id: {model: patch}}`.
+
+    A `*.jsonl` file written by `dibench.depinfer` holds the predictions of
+    the model it is named after (`{method}-{model}`), the last record of an
+    instance with a patch wins. The patch is None if the model failed on
+    the instance. A directory holds such files and/or predictions laid out
+    for `dibench.eval` (`{language}/{instance_id}/patch.diff`), named after
+    the directory.
+    """
+    predictions = defaultdict(dict)
+    sources = {}
+    for path in map(Path, paths):
+        for model, source in _prediction_sources(path):
+            if model in sources:
+                raise ValueError(
+                    f"Predictions of {sources[model]} and {source} are both "
+                    f"named {model}"
+                )
+            sources[model] = source
+            if source.is_dir():
+                for patch in sorted(source.glob("*/*/patch.diff")):
+                    predictions[patch.parent.name][model] = patch.read_text()
+                continue
+            with source.open() as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # torn by a crash, depinfer drops it on its next run
+                        continue
+                    patch = record.get("patch")
+                    instance = predictions[record["instance_id"]]
+                    if patch is not None or model not in instance:
+                        instance[model] = patch
+    return dict(predictions)
+
+
+def _iter_dataset(dataset_name_or_path: str) -> Iterator[RepoInstance]:
+    with open(dataset_name_or_path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield RepoInstance(**json.loads(line))
+
+
+def score_instance(
+    instance: RepoInstance,
+    predictions: dict[str, str | None],
+    project_root: Path,
+    workspace: Path,
+    oracle_cache_dir: str | None,
+    check_fake_libs: bool,
+) -> list[dict]:
+    """
+    One row of text metrics per model, for one instance. A missing (None)
+    prediction is scored as an empty patch.
+    """
+    evaluator = BuildEvaluator(
+        EvalArgs(
+            instance=instance,
+            project_root=project_root,
+            prediction="",
+            workspace=workspace,
+            text_eval=True,
+            exec_eval=False,
+            cache_level="all",
+            timeout=0,
+            resume=False,
+            oracle_cache_dir=oracle_cache_dir,
+        )
+    )
+    scores = evaluator.score(
+        {model: patch or "" for model, patch in predictions.items()},
+        check_fake_libs,
+    )
+    rows = []
+    for model, text in scores.items():
+        row = {
+            "model": model,
+            "language": instance.language.lower(),
+            "instance_id": instance.instance_id,
+            "missing": predictions[model] is None,
+        }
+        for metric in ("exact", "name_only"):
+            for key in ("TP", "FP", "FN"):
+                row[f"{metric}_{key.lower()}"] = text[metric][key]
+        row["fake_libs"] = text["fake_libs"]
+        rows.append(row)
+    return rows
+
+
+def summarize(rows: list[dict]) -> list[dict]:
+    """
+    Precision, recall and F1 of each model per language and over all
+    languages, micro-averaged over the dependencies of its instances, and
+    the number of instances it has no prediction for.
+    """
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row["model"], row["language"]].append(row)
+        groups[row["model"], "all"].append(row)
+    summary = []
+    for (model, language), group in sorted(groups.items()):
+        entry = {
+            "model": model,
+            "language": language,
+            "instances": len(group),
+            "missing": sum(row["missing"] for row in group),
+        }
+        for metric in ("exact", "name_only"):
+            tp, fp, fn = (
+                sum(row[f"{metric}_{key}"] for row in group)
+                for key in ("tp", "fp", "fn")
+            )
+            precision = tp / (tp + fp) if tp + fp else 0.0
+            recall = tp / (tp + fn) if tp + fn else 0.0
+            f1 = (
+                2 * precision * recall / (precision + recall)
+                if precision + recall
+                else 0.0
+            )
+            entry[f"{metric} P"] = precision
+            entry[f"{metric} R"] = recall
+            entry[f"{metric} F1"] = f1
+        fake_libs = [row["fake_libs"] for row in group if row["fake_libs"] is not None]
+        entry["fake libs"] = sum(fake_libs) if fake_libs else None
+        summary.append(entry)
+    return summary
+
+
+def main(
+    *paths: str,
+    dataset_name_or_path: str = "repo-regular.jsonl",
+    repo_instances_dir: str = "repo-regular",
+    workspace: str = "workspace/score",
+    workers: int | None = None,
+    oracle_cache_dir: str | None = ".cache/oracle",
+    fake_libs: bool = True,
+    output: str | None = None,
+):
+    """
+    Print a table of the text metrics of each model, per language.
+
+    Args:
+        paths (str): `dibench.depinfer` results (`*.jsonl` files, or the
+                     directories holding them) and `dibench.eval` results
+                     directories, defaults to `results/`.
+        workspace (str): Logs of each instance, and the testbeds of the
+                         predictions that can't be patched in memory.
+        workers (int, optional): Instances scored at the same time, defaults
+                                 to the CPU count.
+        oracle_cache_dir (str, optional): Oracle cache shared with
+                                          `dibench.eval`. Set to None to
+                                          disable it.
+        fake_libs (bool): Count the predicted dependencies missing from
+                          their registry, which needs network access.
+        output (str, optional): Also write one row per model and instance to
+                                this JSON-lines file.
+    """
+    predictions = load_predictions(list(paths) or ["results/"])
+    models = sorted({model for models in predictions.values() for model in models})
+    workers = workers or os.cpu_count() or 1
+    rows = []
+    scored = set()
+    with progress("Scoring") as p, ProcessPoolExecutor(max_workers=workers) as pool:
+        task_id = p.add_task("Scoring", total=len(predictions))
+
+        def collect(futures: dict, done: set):
+            for future in done:
+                instance = futures.pop(future)
+                scored.add(instance.instance_id)
+                try:
+                    rows.extend(future.result())
+                except Exception as e:
+                    cprint(
+                        f"Failed to score {instance.language}/{instance.instance_id}: "
+                        f"{e}",
+                        "red",
+                    )
+                p.update(task_id, advance=1)
+
+        futures = {}
+        for instance in _iter_dataset(dataset_name_or_path):
+            if instance.instance_id not in predictions:
+                continue
+            # keep a few instances per worker in flight, not the whole dataset
+            if len(futures) >= 2 * workers:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                collect(futures, done)
+            language = instance.language.lower()
+            future = pool.submit(
+                score_instance,
+                instance,
+                {
+                    model: predictions[instance.instance_id].get(model)
+                    for model in models
+                },
+                Path(repo_instances_dir) / language / instance.instance_id,
+                Path(workspace) / language / instance.instance_id,
+                oracle_cache_dir,
+                fake_libs,
+            )
+            futures[future] = instance
+        collect(futures, wait(futures).done)
+    unknown = predictions.keys() - scored
+    if unknown:
+        cprint(f"Predictions of instances not in the dataset: {unknown}", "yellow")
+    rows.sort(key=lambda row: (row["model"], row["language"], row["instance_id"]))
+    if output is not None:
+        with open(output, "w") as f:
+            f.writelines(json.dumps(row) + "\n" for row in rows)
+    print(tabulate.tabulate(summarize(rows), headers="keys", floatfmt=".3f"))
+
+
+if __name__ == "__main__":
+    from fire import Fire
+
+    Fire(main)
@@ -0,0 +1,116 @@
+"""
+Summarize the LLM usage recorded by `dibench.depinfer`, per model, method
+and language.
+
+    python -m dibench.telemetry results/ [more results dirs or files]
+"""
+
+import json
+import math
+from collections import defaultdict
+from pathlib import Path
+
+import tabulate
+
+METRICS_SUFFIX = ".metrics.jsonl"
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """The `q`-th percentile of `values`, interpolated linearly."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = (len(values) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def load_metrics(paths: list[str | Path]) -> list[dict]:
+    """
+    Read the metrics files in `paths` (files, or directories searched for
+    `*.metrics.jsonl`). A rerun appends the instances it retried, only the
+    last record of each instance is kept.
+    """
+    files = []
+    for path in map(Path, paths):
+        files.extend(
+            sorted(path.rglob(f"*{METRICS_SUFFIX}")) if path.is_dir() else [path]
+        )
+    records = []
+    for file in files:
+        latest = {}
+        with file.open() as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # torn by a crash, depinfer drops it on its next run
+                    continue
+                latest[record["instance_id"]] = record
+        records.extend(latest.values())
+    return records
+
+
+def summarize(records: list[dict]) -> list[dict]:
+    """One row of percentiles and totals per model, method and language."""
+    groups = defaultdict(list)
+    for record in records:
+        groups[record["model"], record["method"], record["language"]].append(record)
+    rows = []
+    for (model, method, language), group in sorted(groups.items()):
+
+        def values(key: str) -> list[float]:
+            return [r[key] for r in group if r.get(key) is not None]
+
+        latency, ttft = values("latency"), values("ttft")
+        tokens = [r["prompt_tokens"] + r["completion_tokens"] for r in group]
+        costs = values("cost")
+        rows.append(
+            {
+                "model": model,
+                "method": method,
+                "language": language,
+                "instances": len(group),
+                "ok": sum(r["status"] == "ok" for r in group),
+                "timeouts": sum(r["status"] == "timeout" for r in group),
+                "requests": sum(values("requests")),
+                "errors": sum(values("errors")),
+                "retries": sum(values("retries")),
+                # instances (not) answered with the method's largest prompt
+                "downgraded": sum(bool(r.get("downgrades")) for r in group),
+                "latency p50": percentile(latency, 50),
+                "latency p90": percentile(latency, 90),
+                "latency p99": percentile(latency, 99),
+                "ttft p50": percentile(ttft, 50),
+                "ttft p90": percentile(ttft, 90),
+                "tokens p50": round(percentile(tokens, 50)),
+                "tokens p90": round(percentile(tokens, 90)),
+                "cost": sum(costs) if costs else None,
+                "cost / instance": sum(costs) / len(group) if costs else None,
+            }
+        )
+    return rows
+
+
+def main(*paths: str, output: str | None = None):
+    """
+    Print a table of the telemetry of each model, method and language:
+    latency (whole instance) and time to first token percentiles in
+    seconds, tokens (prompt and completion) per instance, and costs in USD.
+
+    Args:
+        paths (str): Results directories or `*.metrics.jsonl` files,
+                     defaults to `results/`.
+        output (str, optional): Also write the rows to this JSON-lines file.
+    """
+    rows = summarize(load_metrics(list(paths) or ["results/"]))
+    if output is not None:
+        with open(output, "w") as f:
+            f.writelines(json.dumps(row) + "\n" for row in rows)
+    print(tabulate.tabulate(rows, headers="keys", floatfmt=".3g"))
+
+
+if __name__ == "__main__":
+    from fire import Fire
+
+    Fire(main)
@@ -1,14 +1,16 @@
-from rich.progress import (
-    BarColumn,
-    MofNCompleteColumn,
-    Progress,
-    TextColumn,
-    TimeElapsedColumn,
-)
 from termcolor import colored
 
 
 def progress(note: str = "processing"):
+    # imported on use to keep CLI startup (e.g. `--help`) fast
+    from rich.progress import (
+        BarColumn,
+        MofNCompleteColumn,
+        Progress,
+        TextColumn,
+        TimeElapsedColumn,
+    )
+
     return Progress(
         TextColumn(f"{note} •" + "[progress.percentage]{task.percentage:>3.0f}%"),
         BarColumn(),
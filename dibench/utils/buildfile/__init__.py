@@ -2,7 +2,7 @@ from pathlib import Path
 
 import toml
 
-from .base import BuildFile, Dependency
+from .base import BuildFile, Dependency, RegistryError, read_build_file
 from .csharp import CSharpBuildFile
 from .javascript import JavaScriptBuildFile
 from .python import PEP621Compliant, Pip, Poetry, SetupTools
@@ -12,6 +12,7 @@ __all__ = [
     "make_buildfile",
     "BuildFile",
     "Dependency",
+    "RegistryError",
     "PEP621Compliant",
     "Pip",
     "Poetry",
@@ -22,26 +23,35 @@ __all__ = [
 ]
 
 
-def make_buildfile(language: str, root: Path, build_files: list[str]) -> BuildFile:
+def make_buildfile(
+    language: str,
+    root: Path,
+    build_files: list[str],
+    contents: dict[str, str | None] | None = None,
+) -> BuildFile:
+    """
+    The build system of a project. `contents` overrides files of `root`
+    with in-memory content, see `BuildFile`.
+    """
     if language == "python":
         build_file = root / build_files[0]
         if ".txt" in build_file.name or ".pip" in build_file.name:
-            return Pip(root, build_files)
+            return Pip(root, build_files, contents)
         elif build_file.name == "setup.cfg" or ".py" in build_file.name:
-            return SetupTools(root, build_files)
+            return SetupTools(root, build_files, contents)
         elif build_file.name == "pyproject.toml":
-            data = toml.load(build_file)
+            data = toml.loads(read_build_file(root, build_files[0], contents))
             if "tool" in data and "poetry" in data["tool"]:
-                return Poetry(root, build_files)
+                return Poetry(root, build_files, contents)
             elif "project" in data:
-                return PEP621Compliant(root, build_files)
+                return PEP621Compliant(root, build_files, contents)
             else:
                 raise ValueError(f"Unsupported file: {build_file}")
         else:
             raise ValueError(f"Unsupported file: {build_file}")
     elif language == "csharp":
-        return CSharpBuildFile(root, build_files)
+        return CSharpBuildFile(root, build_files, contents)
     elif language == "rust":
-        return RustBuildFile(root, build_files)
+        return RustBuildFile(root, build_files, contents)
     elif language == "typescript" or language == "javascript":
-        return JavaScriptBuildFile(root, build_files)
+        return JavaScriptBuildFile(root, build_files, contents)
@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import Any
+
+import requests
 
 
 class Dependency(ABC):
@@ -17,14 +20,64 @@ class Dependency(ABC):
         ...
 
 
+def read_build_file(
+    root: Path, file: str, contents: dict[str, str | None] | None = None
+) -> str:
+    """
+    Content of `file`: from `contents` (where None marks a deleted file)
+    when it holds the file, from disk under `root` otherwise.
+    """
+    if contents is not None and file in contents:
+        if contents[file] is None:
+            raise FileNotFoundError(f"{file} is deleted")
+        return contents[file]
+    return (Path(root) / file).read_text()
+
+
+class RegistryError(Exception):
+    """A registry lookup without a definite answer (timeout, 5xx, rate limit, ...)."""
+
+
+def missing_from_registry(url: str, timeout: float = 30) -> bool:
+    """
+    Whether the registry answers 404 (rather than 200) for `url`, the
+    metadata of a package; any other answer raises `RegistryError`.
+    """
+    try:
+        # only the status code is needed, not the (possibly large) body
+        with requests.get(url, timeout=timeout, stream=True) as response:
+            status = response.status_code
+    except requests.RequestException as e:
+        raise RegistryError(f"{url}: {e}") from e
+    if status not in (200, 404):
+        raise RegistryError(f"{url}: status {status}")
+    return status == 404
+
+
 class BuildFile(ABC):
     """
     Abstract class for Build system
+
+    :param root: The project root.
+    :param build_files: Build files, relative to `root`.
+    :param contents: In-memory content of some files relative to `root`,
+                     read instead of the files on disk, e.g. patched build
+                     files that were never written.
     """
 
-    def __init__(self, root: Path, build_files: str):
+    def __init__(
+        self,
+        root: Path,
+        build_files: str,
+        contents: dict[str, str | None] | None = None,
+    ):
         self.root = root
         self.build_files = build_files
+        self.contents = contents
+
+    def read(self, file: str) -> str:
+        """Content of `file`, see `read_build_file`."""
+        return read_build_file(self.root, file, self.contents)
 
     @abstractmethod
     def parse_dependencies(self) -> dict[str, list]:
@@ -38,6 +91,20 @@ class BuildFile(ABC):
     def dumps_dependencies(self, dependencies: dict[str, list]) -> dict[str, str]:
         ...
 
+    @abstractmethod
+    def loads_dependencies(self, dependencies: dict[str, Any]) -> dict[str, list]:
+        """
+        Build dependencies from their JSON form, one value per build file
+        shaped like `dependency_example`. Invalid entries are skipped.
+        """
+        ...
+
+    @property
+    @abstractmethod
+    def dependency_example(self) -> Any:
+        """The JSON form of the dependencies of `example`."""
+        ...
+
     @property
     @abstractmethod
     def language(self) -> str:
@@ -1,11 +1,11 @@
 import os
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
-import requests
 from lxml import etree
 
-from .base import BuildFile
+from .base import BuildFile, missing_from_registry
 
 
 @dataclass
@@ -26,13 +26,12 @@ class CSharpBuildFile(BuildFile):
 
         The dependency must be an external one, i.e. not a project reference.
         The check is done by requesting the package's metadata from the NuGet API.
-        If the package is not found, the status code is not 200, and the method returns True.
-        Otherwise, the package is not fake, and the method returns False.
+        If the package is not found (404), the method returns True; if it is
+        found, False; on any other answer it raises `RegistryError`.
         """
         if dependency.external:
             url = f"https://api.nuget.org/v3-flatcontainer/{dependency.name}/index.json"
-            response = requests.get(url)
-            return response.status_code != 200
+            return missing_from_registry(url)
         root: Path = kwargs.get("project_root", None)
         if root is None:
             raise ValueError("For CSharp, project root is required")
@@ -64,9 +63,7 @@ class CSharpBuildFile(BuildFile):
         dependencies = {}
         for build_file in self.build_files:
             packages = []
-            build_file = self.root / build_file
-            tree = etree.parse(build_file)
-            root = tree.getroot()
+            root = etree.fromstring(self.read(build_file).encode())
             nsmap = root.nsmap
             default_ns = nsmap.get(
                 None
@@ -99,7 +96,7 @@ class CSharpBuildFile(BuildFile):
                     if name is None:
                         continue
                     packages.append(CSharpDependency(name, "", external=False))
-            dependencies[str(build_file.relative_to(self.root))] = packages
+            dependencies[str(Path(build_file))] = packages
         return dependencies
 
     def dumps_dependencies(
@@ -168,6 +165,44 @@ class CSharpBuildFile(BuildFile):
 
         return result
 
+    def loads_dependencies(
+        self, dependencies: dict[str, Any]
+    ) -> dict[str, list[CSharpDependency]]:
+        """
+        Each build file maps to `{"PackageReference": {name: version},
+        "ProjectReference": [path]}`.
+        """
+        loaded = {}
+        for file, deps in dependencies.items():
+            loaded[file] = []
+            if not isinstance(deps, dict):
+                continue
+            packages = deps.get("PackageReference", {})
+            if isinstance(packages, dict):
+                loaded[file] += [
+                    CSharpDependency(name, version or "", external=True)
+                    for name, version in packages.items()
+                    if isinstance(name, str) and isinstance(version, (str, type(None)))
+                ]
+            projects = deps.get("ProjectReference", [])
+            if isinstance(projects, list):
+                loaded[file] += [
+                    CSharpDependency(path, "", external=False)
+                    for path in projects
+                    if isinstance(path, str)
+                ]
+        return loaded
+
+    @property
+    def dependency_example(self) -> dict:
+        return {
+            "PackageReference": {
+                "Newtonsoft.Json": "12.0.3",
+                "Microsoft.Extensions.Logging": "2.2.0",
+            },
+            "ProjectReference": ["../lib/lib.csproj"],
+        }
+
     @property
     def language(self) -> str:
         return "xml"
@@ -1,8 +1,8 @@
 import json
+from typing import Any
 
-import requests
 
-from .base import BuildFile, Dependency
+from .base import BuildFile, Dependency, missing_from_registry
 
 
 class JavaScriptDependency(Dependency, tuple[str, str]):
@@ -52,20 +52,17 @@ class JavaScriptDependency(Dependency, tuple[str, str]):
 class JavaScriptBuildFile(BuildFile):
     @classmethod
     def is_fake_lib(cls, dependency: Dependency, **kwargs) -> bool:
-        result = requests.get(f"https://registry.npmjs.org/{dependency.name}")
-        return result.status_code != 200
+        return missing_from_registry(f"https://registry.npmjs.org/{dependency.name}")
 
     def parse_dependencies(self) -> dict[str, list[JavaScriptDependency]]:
         dependencies = {}
         for file in self.build_files:
-            build_file = self.root / file
-            with build_file.open() as f:
-                json_obj = json.load(f)
-                deps = json_obj.get("dependencies", {})
-                dependencies[file] = []
-                for dep, specifier in deps.items():
-                    dependency = JavaScriptDependency((dep, specifier))
-                    dependencies[file].append(dependency)
+            json_obj = json.loads(self.read(file))
+            deps = json_obj.get("dependencies", {})
+            dependencies[file] = []
+            for dep, specifier in deps.items():
+                dependency = JavaScriptDependency((dep, specifier))
+                dependencies[file].append(dependency)
         return dependencies
 
     def dumps_dependencies(
@@ -80,6 +77,24 @@ class JavaScriptBuildFile(BuildFile):
                 ret[file] = json.dumps(json_obj, indent=2)
         return ret
 
+    def loads_dependencies(
+        self, dependencies: dict[str, Any]
+    ) -> dict[str, list[JavaScriptDependency]]:
+        # the `dependencies` object of each package.json
+        loaded = {}
+        for file, deps in dependencies.items():
+            loaded[file] = []
+            if not isinstance(deps, dict):
+                continue
+            for name, specifier in deps.items():
+                if isinstance(name, str) and isinstance(specifier, str):
+                    loaded[file].append(JavaScriptDependency((name, specifier)))
+        return loaded
+
+    @property
+    def dependency_example(self) -> dict:
+        return {"react": "^18.2.0", "react-dom": "^18.2.0", "zustand": "^4.5.2"}
+
     @property
     def language(self) -> str:
         return "json"
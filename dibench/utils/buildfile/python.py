@@ -1,20 +1,26 @@
 import ast
 import configparser
+import itertools
+import posixpath
 import re
 from pathlib import Path
+from typing import Any
 
 import packaging
 import packaging.requirements
 import packaging.specifiers
 import packaging.version
-import requests
 import toml
 from poetry.core.constraints.version import parse_constraint
 from poetry.core.packages.dependency import Dependency as PoetryDependency
 from termcolor import colored
 from tree_sitter_languages import get_language, get_parser
 
-from .base import BuildFile, Dependency
+from .base import BuildFile, Dependency, missing_from_registry
+
+# comments and includes of requirements files, as pip reads them
+_comment = re.compile(r"(^|\s+)#.*$")
+_include = re.compile(r"^(?:-r|-c|--requirement|--constraint)(?:\s*=\s*|\s*)(\S+)")
 
 
 class PythonDependency(Dependency, packaging.requirements.Requirement):
@@ -36,12 +42,31 @@ class PythonBuildSystem(BuildFile):
     def is_fake_lib(cls, dependency: PythonDependency) -> bool:
         if dependency.url:
             # check the url exists
-            response = requests.get(dependency.url)
-            return response.status_code != 200
+            return missing_from_registry(dependency.url)
         # check in pypi
-        url = f"https://pypi.org/pypi/{dependency.name}/json"
-        response = requests.get(url)
-        return response.status_code != 200
+        return missing_from_registry(f"https://pypi.org/pypi/{dependency.name}/json")
+
+    def loads_dependencies(
+        self, dependencies: dict[str, Any]
+    ) -> dict[str, list[PythonDependency]]:
+        # a list of PEP 508 requirement strings per build file
+        loaded = {}
+        for file, requirements in dependencies.items():
+            loaded[file] = []
+            if not isinstance(requirements, list):
+                continue
+            for req in requirements:
+                if not isinstance(req, str):
+                    continue
+                try:
+                    loaded[file].append(packaging.requirements.Requirement(req))
+                except Exception:
+                    continue
+        return loaded
+
+    @property
+    def dependency_example(self) -> list[str]:
+        return ["requests", "numpy>=1.24"]
 
 
 class VariableVisitor(ast.NodeVisitor):
@@ -63,10 +88,10 @@ class VariableVisitor(ast.NodeVisitor):
 class SetupTools(PythonBuildSystem):
     def _parse_from_setup_cfg(
         self,
-        file_path: Path,
+        file: str,
     ) -> list[PythonDependency]:
         config = configparser.ConfigParser()
-        config.read(file_path)
+        config.read_string(self.read(file))
         install_requires_str = config.get("options", "install_requires", fallback="")
         install_requires = list(
             filter(
@@ -84,13 +109,13 @@ class SetupTools(PythonBuildSystem):
 
     def _parse_from_setup_py(
         self,
-        file_path: Path,
+        file: str,
     ) -> list[PythonDependency]:
         """
         In our setting, the requirements is defined as a list of strings
         and will `directly` or `indirectly` be assigned to the `install_requires` argument of the `setup` function
         """
-        code = file_path.read_bytes()
+        code = self.read(file).encode()
         language = get_language("python")
         parser = get_parser("python")
         tree = parser.parse(code)
@@ -181,9 +206,11 @@ class SetupTools(PythonBuildSystem):
     def parse_dependencies(self) -> dict[str, list[PythonDependency]]:
         build_file = self.root / self.build_files[0]
         if ".cfg" in build_file.name:
-            return {self.build_files[0]: self._parse_from_setup_cfg(build_file)}
+            return {
+                self.build_files[0]: self._parse_from_setup_cfg(self.build_files[0])
+            }
         elif ".py" in build_file.name:
-            return {self.build_files[0]: self._parse_from_setup_py(build_file)}
+            return {self.build_files[0]: self._parse_from_setup_py(self.build_files[0])}
         else:
             raise ValueError(f"Unsupported file: {build_file}")
 
@@ -249,7 +276,44 @@ class Pip(PythonBuildSystem):
     # https://pip.pypa.io/en/stable/reference/requirements-file-format/
     # https://peps.python.org/pep-0508/
     # this should parse all relative simple requirements files
+    def _requirement_lines(self, file: str, seen: set[str]) -> list[str]:
+        """
+        The requirement lines of a requirements file read with `read`,
+        following `-r` / `-c` includes like pip: continuation lines are
+        joined, comments and other options dropped.
+        """
+        seen.add(file)
+        lines = []
+        for line in re.sub(r"\\\r?\n", "", self.read(file)).splitlines():
+            line = _comment.sub("", line).strip()
+            if not line:
+                continue
+            if not line.startswith("-"):
+                # requirement, up to its per-requirement options (--hash, ...)
+                args = itertools.takewhile(
+                    lambda token: not token.startswith("-"), line.split(" ")
+                )
+                lines.append(" ".join(args))
+                continue
+            include = _include.match(line)
+            if include:
+                path = posixpath.normpath(
+                    posixpath.join(posixpath.dirname(file), include.group(1))
+                )
+                if path not in seen:
+                    lines.extend(self._requirement_lines(path, seen))
+        return lines
+
     def parse_dependencies(self) -> dict[str, list[PythonDependency]]:
+        if self.contents is not None:
+            # in-memory files, which pip can't read
+            ret = []
+            for line in self._requirement_lines(self.build_files[0], set()):
+                try:
+                    ret.append(packaging.requirements.Requirement(line))
+                except Exception:
+                    continue
+            return {self.build_files[0]: ret}
         try:
             # pip >=20
             from pip._internal.network.session import PipSession  # type: ignore
@@ -302,8 +366,7 @@ numpy
 
 class Poetry(PythonBuildSystem):
     def parse_dependencies(self) -> list[PythonDependency]:
-        build_file = self.root / self.build_files[0]
-        config = toml.load(build_file)
+        config = toml.loads(self.read(self.build_files[0]))
         poetry_dependencies = (
             config.get("tool", {}).get("poetry", {}).get("dependencies", {})
         )
@@ -330,12 +393,17 @@ class Poetry(PythonBuildSystem):
         requirements = requirements[self.build_files[0]]
         build_file = self.root / self.build_files[0]
         config = toml.load(build_file)
-        poetry_dependencies = (
-            config.get("tool", {}).get("poetry", {}).get("dependencies", {})
-        )
+        poetry = config.setdefault("tool", {}).setdefault("poetry", {})
+        # the complete list replaces the declared dependencies, but for the
+        # python constraint which is not one
+        poetry_dependencies = {
+            name: constraint
+            for name, constraint in poetry.get("dependencies", {}).items()
+            if name.lower() == "python"
+        }
         for req in requirements:
-            poetry_dependencies[req.name] = str(req.specifier)
-        config["tool"]["poetry"]["dependencies"] = poetry_dependencies
+            poetry_dependencies[req.name] = str(req.specifier) or "*"
+        poetry["dependencies"] = poetry_dependencies
         content = toml.dumps(config)
         return {self.build_files[0]: content}
 
@@ -361,8 +429,7 @@ numpy = "*"
 
 class PEP621Compliant(PythonBuildSystem):
     def parse_dependencies(self) -> dict[str, list[PythonDependency]]:
-        build_file = self.root / self.build_files[0]
-        config = toml.load(build_file)
+        config = toml.loads(self.read(self.build_files[0]))
         requirements = config.get("project", {}).get("dependencies", [])
         packages = [packaging.requirements.Requirement(req) for req in requirements]
         return {self.build_files[0]: packages}
@@ -375,10 +442,10 @@ class PEP621Compliant(PythonBuildSystem):
             requirements = requirements[self.build_files[0]]
             build_file = self.root / self.build_files[0]
             config = toml.load(build_file)
-            dump_requirements = config.get("project", {}).get("dependencies", {})
-            for req in requirements:
-                dump_requirements.append(str(req))
-            config["project"]["dependencies"] = dump_requirements
+            # the complete list replaces the declared dependencies
+            config.setdefault("project", {})["dependencies"] = list(
+                dict.fromkeys(str(req) for req in requirements)
+            )
             content = toml.dumps(config)
             return {self.build_files[0]: content}
         except Exception as e:
@@ -1,9 +1,9 @@
 import json
+from typing import Any
 
-import requests
 import tomlkit
 
-from .base import BuildFile, Dependency
+from .base import BuildFile, Dependency, missing_from_registry
 
 
 class RustDependency(Dependency, tuple[str, dict]):
@@ -50,8 +50,7 @@ class RustBuildFile(BuildFile):
     @classmethod
     def is_fake_lib(cls, dependency: RustDependency, **kwargs) -> bool:
         url = f"https://crates.io/api/v1/crates/{dependency.name}/versions"
-        response = requests.get(url)
-        return response.status_code != 200
+        return missing_from_registry(url)
 
     def parse_dependencies(self) -> dict[str, list[RustDependency]]:
         """
@@ -60,21 +59,19 @@ class RustBuildFile(BuildFile):
         """
         dependencies = {}
         for file in self.build_files:
-            build_file = self.root / file
-            with build_file.open() as f:
-                toml = tomlkit.parse(f.read())
-                if "dependencies" not in toml:
-                    deps = {}
+            toml = tomlkit.parse(self.read(file))
+            if "dependencies" not in toml:
+                deps = {}
+            else:
+                deps = toml.item("dependencies").unwrap()
+            dependencies[file] = []
+            for name, value in deps.items():
+                if isinstance(value, dict):
+                    dependency = RustDependency((name, value))
                 else:
-                    deps = toml.item("dependencies").unwrap()
-                dependencies[file] = []
-                for name, value in deps.items():
-                    if isinstance(value, dict):
-                        dependency = RustDependency((name, value))
-                    else:
-                        value = {"version": value}
-                        dependency = RustDependency((name, value))
-                    dependencies[file].append(dependency)
+                    value = {"version": value}
+                    dependency = RustDependency((name, value))
+                dependencies[file].append(dependency)
         return dependencies
 
     def dumps_dependencies(
@@ -89,6 +86,31 @@ class RustBuildFile(BuildFile):
                 ret[file] = toml.as_string()
         return ret
 
+    def loads_dependencies(
+        self, dependencies: dict[str, Any]
+    ) -> dict[str, list[RustDependency]]:
+        # a `[dependencies]` table per build file
+        loaded = {}
+        for file, deps in dependencies.items():
+            loaded[file] = []
+            if not isinstance(deps, dict):
+                continue
+            for name, value in deps.items():
+                if not isinstance(name, str):
+                    continue
+                if isinstance(value, str):
+                    value = {"version": value}
+                if isinstance(value, dict):
+                    loaded[file].append(RustDependency((name, value)))
+        return loaded
+
+    @property
+    def dependency_example(self) -> dict:
+        return {
+            "serde": {"version": "1.0", "features": ["derive"]},
+            "serde_json": "1.0",
+        }
+
     @property
     def language(self) -> str:
         return "toml"
@@ -0,0 +1,1039 @@
+"""
+In-process generation and application of `git diff` patches.
+
+`git_diff` is a port of the parts of git's xdiff library used by a plain
+`git diff` (Myers diff with git's record pre-filtering and heuristics,
+change compaction with the indent heuristic, and unified output with
+function-name hunk headers). `apply_patch` applies unified diffs to an
+in-memory `{path: content}` map with the hunk location and fuzz rules of
+GNU patch. Neither spawns a process or touches the filesystem.
+"""
+
+import hashlib
+import re
+import sys
+from dataclasses import dataclass, field
+
+__all__ = [
+    "git_diff",
+    "git_blob_hash",
+    "apply_patch",
+    "apply_patch_with_fallback",
+    "parse_patch",
+    "PatchApplyError",
+]
+
+# constants from xdiff/xdiffi.c, xdiff/xprepare.c and xdiff/xutils.c
+XDL_MAX_COST_MIN = 256
+XDL_HEUR_MIN_COST = 256
+XDL_SNAKE_CNT = 20
+XDL_K_HEUR = 4
+XDL_MAX_EQLIMIT = 1024
+XDL_SIMSCAN_WINDOW = 100
+XDL_KPDIS_RUN = 4
+XDL_LINE_MAX = sys.maxsize
+
+# indent heuristic weights, see xdiff/xdiffi.c
+MAX_INDENT = 200
+MAX_BLANKS = 20
+START_OF_FILE_PENALTY = 1
+END_OF_FILE_PENALTY = 21
+TOTAL_BLANK_WEIGHT = -30
+POST_BLANK_WEIGHT = 6
+RELATIVE_INDENT_PENALTY = -4
+RELATIVE_INDENT_WITH_BLANK_PENALTY = 10
+RELATIVE_OUTDENT_PENALTY = 24
+RELATIVE_OUTDENT_WITH_BLANK_PENALTY = 17
+RELATIVE_DEDENT_PENALTY = 23
+RELATIVE_DEDENT_WITH_BLANK_PENALTY = 17
+INDENT_WEIGHT = 60
+INDENT_HEURISTIC_MAX_SLIDING = 100
+
+CONTEXT_LINES = 3
+FUNC_LINE_MAX = 80
+ABBREV = 7
+FIRST_FEW_BYTES = 8000
+SPACES = b" \t\n\v\f\r"
+
+
+def git_blob_hash(data: bytes) -> str:
+    """Object id git assigns to a blob with the given content."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _lines(text: str) -> list[str]:
+    """Like `_records`, for text."""
+    lines = text.split("\n")
+    records = [line + "\n" for line in lines[:-1]]
+    if lines[-1]:
+        records.append(lines[-1])
+    return records
+
+
+def _bogosqrt(n: int) -> int:
+    i = 1
+    while n > 0:
+        n >>= 2
+        i <<= 1
+    return i
+
+
+def _records(data: bytes) -> list[bytes]:
+    """Split into lines the way xdiff does: only on LF, keeping it."""
+    lines = data.split(b"\n")
+    records = [line + b"\n" for line in lines[:-1]]
+    if lines[-1]:
+        records.append(lines[-1])
+    return records
+
+
+class _XDFile:
+    """One side of the diff: records, their classes and the change map."""
+
+    def __init__(self, records: list[bytes], ha: list[int]):
+        self.recs = records
+        self.ha = ha
+        self.nrec = len(records)
+        # rchg[i + 1] flags record i as changed; both ends are sentinels
+        self.rchg = [0] * (self.nrec + 2)
+        self.rindex: list[int] = []
+        self.rha: list[int] = []
+        self.dstart = 0
+        self.dend = self.nrec - 1
+
+
+def _clean_mmatch(dis: list[int], i: int, s: int, e: int) -> bool:
+    if i - s > XDL_SIMSCAN_WINDOW:
+        s = i - XDL_SIMSCAN_WINDOW
+    if e - i > XDL_SIMSCAN_WINDOW:
+        e = i + XDL_SIMSCAN_WINDOW
+
+    r, rdis0, rpdis0 = 1, 0, 1
+    while i - r >= s:
+        if not dis[i - r]:
+            rdis0 += 1
+        elif dis[i - r] == 2:
+            rpdis0 += 1
+        else:
+            break
+        r += 1
+    if rdis0 == 0:
+        return False
+    r, rdis1, rpdis1 = 1, 0, 1
+    while i + r <= e:
+        if not dis[i + r]:
+            rdis1 += 1
+        elif dis[i + r] == 2:
+            rpdis1 += 1
+        else:
+            break
+        r += 1
+    if rdis1 == 0:
+        return False
+    rdis1 += rdis0
+    rpdis1 += rpdis0
+    return rpdis1 * XDL_KPDIS_RUN < rpdis1 + rdis1
+
+
+def _prepare(old: list[bytes], new: list[bytes]) -> tuple[_XDFile, _XDFile]:
+    classes: dict[bytes, int] = {}
+    counts: list[list[int]] = []
+
+    def classify(records: list[bytes], side: int) -> list[int]:
+        ha = []
+        for record in records:
+            idx = classes.get(record)
+            if idx is None:
+                idx = classes[record] = len(counts)
+                counts.append([0, 0])
+            counts[idx][side] += 1
+            ha.append(idx)
+        return ha
+
+    xdf1 = _XDFile(old, classify(old, 0))
+    xdf2 = _XDFile(new, classify(new, 1))
+
+    # xdl_trim_ends
+    lim = min(xdf1.nrec, xdf2.nrec)
+    i = 0
+    while i < lim and xdf1.ha[i] == xdf2.ha[i]:
+        i += 1
+    xdf1.dstart = xdf2.dstart = i
+    lim -= i
+    i = 0
+    while i < lim and xdf1.ha[xdf1.nrec - 1 - i] == xdf2.ha[xdf2.nrec - 1 - i]:
+        i += 1
+    xdf1.dend = xdf1.nrec - i - 1
+    xdf2.dend = xdf2.nrec - i - 1
+
+    # xdl_cleanup_records: lines without a match on the other side are
+    # changed for sure, and lines with too many matches inside runs of
+    # unmatched lines are discarded from the search as well
+    for xdf, other in ((xdf1, 1), (xdf2, 0)):
+        mlim = min(_bogosqrt(xdf.nrec), XDL_MAX_EQLIMIT)
+        dis = [0] * (xdf.nrec + 1)
+        for i in range(xdf.dstart, xdf.dend + 1):
+            nm = counts[xdf.ha[i]][other]
+            dis[i] = 0 if nm == 0 else (2 if nm >= mlim else 1)
+        for i in range(xdf.dstart, xdf.dend + 1):
+            if dis[i] == 1 or (
+                dis[i] == 2 and not _clean_mmatch(dis, i, xdf.dstart, xdf.dend)
+            ):
+                xdf.rindex.append(i)
+                xdf.rha.append(xdf.ha[i])
+            else:
+                xdf.rchg[i + 1] = 1
+    return xdf1, xdf2
+
+
+def _split(ha1, off1, lim1, ha2, off2, lim2, kvdf, kvdb, koff, need_min, mxcost):
+    """xdl_split: find the middle snake, returns (i1, i2, min_lo, min_hi)."""
+    dmin, dmax = off1 - lim2, lim1 - off2
+    fmid, bmid = off1 - off2, lim1 - lim2
+    odd = (fmid - bmid) & 1
+    fmin = fmax = fmid
+    bmin = bmax = bmid
+
+    kvdf[fmid + koff] = off1
+    kvdb[bmid + koff] = lim1
+
+    ec = 0
+    while True:
+        ec += 1
+        got_snake = False
+
+        if fmin > dmin:
+            fmin -= 1
+            kvdf[fmin - 1 + koff] = -1
+        else:
+            fmin += 1
+        if fmax < dmax:
+            fmax += 1
+            kvdf[fmax + 1 + koff] = -1
+        else:
+            fmax -= 1
+
+        for d in range(fmax, fmin - 1, -2):
+            if kvdf[d - 1 + koff] >= kvdf[d + 1 + koff]:
+                i1 = kvdf[d - 1 + koff] + 1
+            else:
+                i1 = kvdf[d + 1 + koff]
+            prev1 = i1
+            i2 = i1 - d
+            while i1 < lim1 and i2 < lim2 and ha1[i1] == ha2[i2]:
+                i1 += 1
+                i2 += 1
+            if i1 - prev1 > XDL_SNAKE_CNT:
+                got_snake = True
+            kvdf[d + koff] = i1
+            if odd and bmin <= d <= bmax and kvdb[d + koff] <= i1:
+                return i1, i2, True, True
+
+        if bmin > dmin:
+            bmin -= 1
+            kvdb[bmin - 1 + koff] = XDL_LINE_MAX
+        else:
+            bmin += 1
+        if bmax < dmax:
+            bmax += 1
+            kvdb[bmax + 1 + koff] = XDL_LINE_MAX
+        else:
+            bmax -= 1
+
+        for d in range(bmax, bmin - 1, -2):
+            if kvdb[d - 1 + koff] < kvdb[d + 1 + koff]:
+                i1 = kvdb[d - 1 + koff]
+            else:
+                i1 = kvdb[d + 1 + koff] - 1
+            prev1 = i1
+            i2 = i1 - d
+            while i1 > off1 and i2 > off2 and ha1[i1 - 1] == ha2[i2 - 1]:
+                i1 -= 1
+                i2 -= 1
+            if prev1 - i1 > XDL_SNAKE_CNT:
+                got_snake = True
+            kvdb[d + koff] = i1
+            if not odd and fmin <= d <= fmax and i1 <= kvdf[d + koff]:
+                return i1, i2, True, True
+
+        if need_min:
+            continue
+
+        if got_snake and ec > XDL_HEUR_MIN_COST:
+            best, spl = 0, None
+            for d in range(fmax, fmin - 1, -2):
+                dd = d - fmid if d > fmid else fmid - d
+                i1 = kvdf[d + koff]
+                i2 = i1 - d
+                v = (i1 - off1) + (i2 - off2) - dd
+                if (
+                    v > XDL_K_HEUR * ec
+                    and v > best
+                    and off1 + XDL_SNAKE_CNT <= i1 < lim1
+                    and off2 + XDL_SNAKE_CNT <= i2 < lim2
+                ):
+                    k = 1
+                    while ha1[i1 - k] == ha2[i2 - k]:
+                        if k == XDL_SNAKE_CNT:
+                            best, spl = v, (i1, i2)
+                            break
+                        k += 1
+            if best > 0:
+                return spl[0], spl[1], True, False
+
+            best, spl = 0, None
+            for d in range(bmax, bmin - 1, -2):
+                dd = d - bmid if d > bmid else bmid - d
+                i1 = kvdb[d + koff]
+                i2 = i1 - d
+                v = (lim1 - i1) + (lim2 - i2) - dd
+                if (
+                    v > XDL_K_HEUR * ec
+                    and v > best
+                    and off1 < i1 <= lim1 - XDL_SNAKE_CNT
+                    and off2 < i2 <= lim2 - XDL_SNAKE_CNT
+                ):
+                    k = 0
+                    while ha1[i1 + k] == ha2[i2 + k]:
+                        if k == XDL_SNAKE_CNT - 1:
+                            best, spl = v, (i1, i2)
+                            break
+                        k += 1
+            if best > 0:
+                return spl[0], spl[1], False, True
+
+        if ec >= mxcost:
+            fbest = fbest1 = -1
+            for d in range(fmax, fmin - 1, -2):
+                i1 = min(kvdf[d + koff], lim1)
+                i2 = i1 - d
+                if lim2 < i2:
+                    i1 = lim2 + d
+                    i2 = lim2
+                if fbest < i1 + i2:
+                    fbest = i1 + i2
+                    fbest1 = i1
+
+            bbest = bbest1 = XDL_LINE_MAX
+            for d in range(bmax, bmin - 1, -2):
+                i1 = max(off1, kvdb[d + koff])
+                i2 = i1 - d
+                if i2 < off2:
+                    i1 = off2 + d
+                    i2 = off2
+                if i1 + i2 < bbest:
+                    bbest = i1 + i2
+                    bbest1 = i1
+
+            if (lim1 + lim2) - bbest < fbest - (off1 + off2):
+                return fbest1, fbest - fbest1, True, False
+            return bbest1, bbest - bbest1, False, True
+
+
+def _do_diff(xdf1: _XDFile, xdf2: _XDFile):
+    """xdl_do_diff + xdl_recs_cmp, with an explicit stack instead of recursion."""
+    ha1, ha2 = xdf1.rha, xdf2.rha
+    n1, n2 = len(ha1), len(ha2)
+    ndiags = n1 + n2 + 3
+    kvdf = [0] * (ndiags + 1)
+    kvdb = [0] * (ndiags + 1)
+    koff = n2 + 1
+    mxcost = max(_bogosqrt(ndiags), XDL_MAX_COST_MIN)
+
+    stack = [(0, n1, 0, n2, False)]
+    while stack:
+        off1, lim1, off2, lim2, need_min = stack.pop()
+        while off1 < lim1 and off2 < lim2 and ha1[off1] == ha2[off2]:
+            off1 += 1
+            off2 += 1
+        while off1 < lim1 and off2 < lim2 and ha1[lim1 - 1] == ha2[lim2 - 1]:
+            lim1 -= 1
+            lim2 -= 1
+        if off1 == lim1:
+            for i in range(off2, lim2):
+                xdf2.rchg[xdf2.rindex[i] + 1] = 1
+        elif off2 == lim2:
+            for i in range(off1, lim1):
+                xdf1.rchg[xdf1.rindex[i] + 1] = 1
+        else:
+            i1, i2, min_lo, min_hi = _split(
+                ha1, off1, lim1, ha2, off2, lim2, kvdf, kvdb, koff, need_min, mxcost
+            )
+            stack.append((i1, lim1, i2, lim2, min_hi))
+            stack.append((off1, i1, off2, i2, min_lo))
+
+
+def _get_indent(record: bytes) -> int:
+    ret = 0
+    for c in record:
+        if c not in SPACES:
+            return ret
+        elif c == 0x20:
+            ret += 1
+        elif c == 0x09:
+            ret += 8 - ret % 8
+        if ret >= MAX_INDENT:
+            return MAX_INDENT
+    # the line contains only whitespace
+    return -1
+
+
+def _split_score(xdf: _XDFile, indents: list[int], split: int) -> tuple[int, int]:
+    """measure_split + score_add_split, returns (effective_indent, penalty)."""
+    if split >= xdf.nrec:
+        end_of_file = True
+        indent = -1
+    else:
+        end_of_file = False
+        indent = indents[split]
+
+    pre_blank, pre_indent = 0, -1
+    for i in range(split - 1, -1, -1):
+        pre_indent = indents[i]
+        if pre_indent != -1:
+            break
+        pre_blank += 1
+        if pre_blank == MAX_BLANKS:
+            pre_indent = 0
+            break
+
+    post_blank, post_indent = 0, -1
+    for i in range(split + 1, xdf.nrec):
+        post_indent = indents[i]
+        if post_indent != -1:
+            break
+        post_blank += 1
+        if post_blank == MAX_BLANKS:
+            post_indent = 0
+            break
+
+    penalty = 0
+    if pre_indent == -1 and pre_blank == 0:
+        penalty += START_OF_FILE_PENALTY
+    if end_of_file:
+        penalty += END_OF_FILE_PENALTY
+
+    post_blank = 1 + post_blank if indent == -1 else 0
+    total_blank = pre_blank + post_blank
+    penalty += TOTAL_BLANK_WEIGHT * total_blank
+    penalty += POST_BLANK_WEIGHT * post_blank
+
+    if indent == -1:
+        indent = post_indent
+    any_blanks = total_blank != 0
+
+    if indent == -1 or pre_indent == -1:
+        pass
+    elif indent > pre_indent:
+        penalty += (
+            RELATIVE_INDENT_WITH_BLANK_PENALTY
+            if any_blanks
+            else RELATIVE_INDENT_PENALTY
+        )
+    elif indent == pre_indent:
+        pass
+    elif post_indent != -1 and post_indent > indent:
+        penalty += (
+            RELATIVE_OUTDENT_WITH_BLANK_PENALTY
+            if any_blanks
+            else RELATIVE_OUTDENT_PENALTY
+        )
+    else:
+        penalty += (
+            RELATIVE_DEDENT_WITH_BLANK_PENALTY
+            if any_blanks
+            else RELATIVE_DEDENT_PENALTY
+        )
+    return indent, penalty
+
+
+class _Group:
+    """A run of changed records [start, end) in one file, see xdiffi.c."""
+
+    def __init__(self, xdf: _XDFile):
+        self.xdf = xdf
+        self.start = self.end = 0
+        while xdf.rchg[self.end + 1]:
+            self.end += 1
+
+    def next(self) -> bool:
+        rchg = self.xdf.rchg
+        if self.end == self.xdf.nrec:
+            return False
+        self.start = self.end + 1
+        self.end = self.start
+        while rchg[self.end + 1]:
+            self.end += 1
+        return True
+
+    def previous(self) -> bool:
+        rchg = self.xdf.rchg
+        if self.start == 0:
+            return False
+        self.end = self.start - 1
+        self.start = self.end
+        while rchg[self.start]:
+            self.start -= 1
+        return True
+
+    def slide_down(self) -> bool:
+        xdf = self.xdf
+        if self.end < xdf.nrec and xdf.ha[self.start] == xdf.ha[self.end]:
+            xdf.rchg[self.start + 1] = 0
+            self.start += 1
+            xdf.rchg[self.end + 1] = 1
+            self.end += 1
+            while xdf.rchg[self.end + 1]:
+                self.end += 1
+            return True
+        return False
+
+    def slide_up(self) -> bool:
+        xdf = self.xdf
+        if self.start > 0 and xdf.ha[self.start - 1] == xdf.ha[self.end - 1]:
+            self.start -= 1
+            xdf.rchg[self.start + 1] = 1
+            self.end -= 1
+            xdf.rchg[self.end + 1] = 0
+            while xdf.rchg[self.start]:
+                self.start -= 1
+            return True
+        return False
+
+
+def _change_compact(xdf: _XDFile, xdfo: _XDFile):
+    """xdl_change_compact with the indent heuristic enabled."""
+    indents = None
+    g, go = _Group(xdf), _Group(xdfo)
+    while True:
+        if g.end != g.start:
+            while True:
+                groupsize = g.end - g.start
+                end_matching_other = -1
+                while g.slide_up():
+                    assert go.previous(), "group sync broken sliding up"
+                earliest_end = g.end
+                if go.end > go.start:
+                    end_matching_other = g.end
+                while g.slide_down():
+                    assert go.next(), "group sync broken sliding down"
+                    if go.end > go.start:
+                        end_matching_other = g.end
+                if groupsize == g.end - g.start:
+                    break
+
+            if g.end == earliest_end:
+                pass
+            elif end_matching_other != -1:
+                while go.end == go.start:
+                    assert g.slide_up(), "match disappeared"
+                    assert go.previous(), "group sync broken sliding to match"
+            else:
+                if indents is None:
+                    indents = [_get_indent(record) for record in xdf.recs]
+                shift = max(
+                    earliest_end,
+                    g.end - groupsize - 1,
+                    g.end - INDENT_HEURISTIC_MAX_SLIDING,
+                )
+                best_shift, best_score = -1, None
+                while shift <= g.end:
+                    indent1, penalty1 = _split_score(xdf, indents, shift)
+                    indent2, penalty2 = _split_score(xdf, indents, shift - groupsize)
+                    score = (indent1 + indent2, penalty1 + penalty2)
+                    if best_shift == -1 or (
+                        INDENT_WEIGHT
+                        * ((score[0] > best_score[0]) - (score[0] < best_score[0]))
+                        + (score[1] - best_score[1])
+                        <= 0
+                    ):
+                        best_score, best_shift = score, shift
+                    shift += 1
+                while g.end > best_shift:
+                    assert g.slide_up(), "best shift unreached"
+                    assert go.previous(), "group sync broken sliding to blank line"
+
+        if not g.next():
+            break
+        assert go.next(), "group sync broken moving to next group"
+
+
+def _build_script(xdf1: _XDFile, xdf2: _XDFile) -> list[tuple[int, int, int, int]]:
+    """Collect changes as (i1, i2, chg1, chg2), in file order."""
+    rchg1, rchg2 = xdf1.rchg, xdf2.rchg
+    changes = []
+    i1, i2 = xdf1.nrec, xdf2.nrec
+    while i1 >= 0 or i2 >= 0:
+        if (i1 >= 0 and rchg1[i1]) or (i2 >= 0 and rchg2[i2]):
+            l1 = i1
+            while i1 > 0 and rchg1[i1]:
+                i1 -= 1
+            l2 = i2
+            while i2 > 0 and rchg2[i2]:
+                i2 -= 1
+            changes.append((i1, i2, l1 - i1, l2 - i2))
+        i1 -= 1
+        i2 -= 1
+    changes.reverse()
+    return changes
+
+
+def _func_line(record: bytes) -> bytes | None:
+    """Default funcname matcher of xdiff (`def_ff`)."""
+    if record and (
+        chr(record[0]).isalpha() and record[0] < 0x80 or record[:1] in b"_$"
+    ):
+        return record[:FUNC_LINE_MAX].rstrip(SPACES)
+    return None
+
+
+def _emit_record(out: list[bytes], prefix: bytes, record: bytes):
+    out.append(prefix + record)
+    if not record.endswith(b"\n"):
+        out.append(b"\n\\ No newline at end of file\n")
+
+
+def _emit_hunks(xdf1: _XDFile, xdf2: _XDFile, changes: list, out: list[bytes]):
+    func, funclineprev = b"", -1
+    ctx = CONTEXT_LINES
+    idx = 0
+    while idx < len(changes):
+        # xdl_get_hunk: merge changes separated by at most 2 * ctx lines
+        last = idx
+        while last + 1 < len(changes):
+            prev_i1, _, prev_chg1, _ = changes[last]
+            if changes[last + 1][0] - (prev_i1 + prev_chg1) > 2 * ctx:
+                break
+            last += 1
+        first_i1, first_i2, _, _ = changes[idx]
+        last_i1, last_i2, last_chg1, last_chg2 = changes[last]
+
+        s1 = max(first_i1 - ctx, 0)
+        s2 = max(first_i2 - ctx, 0)
+        lctx = min(
+            ctx,
+            xdf1.nrec - (last_i1 + last_chg1),
+            xdf2.nrec - (last_i2 + last_chg2),
+        )
+        e1 = last_i1 + last_chg1 + lctx
+        e2 = last_i2 + last_chg2 + lctx
+
+        # search backwards for a function line, stopping where the search
+        # for the previous hunk started
+        line = s1 - 1
+        while line != funclineprev and 0 <= line < xdf1.nrec:
+            match = _func_line(xdf1.recs[line])
+            if match is not None:
+                func = match
+                break
+            line -= 1
+        funclineprev = s1 - 1
+
+        c1, c2 = e1 - s1, e2 - s2
+        header = b"@@ -%d" % (s1 + 1 if c1 else s1)
+        if c1 != 1:
+            header += b",%d" % c1
+        header += b" +%d" % (s2 + 1 if c2 else s2)
+        if c2 != 1:
+            header += b",%d" % c2
+        header += b" @@"
+        if func:
+            header += b" " + func
+        out.append(header + b"\n")
+
+        for s in range(s2, first_i2):
+            _emit_record(out, b" ", xdf2.recs[s])
+        s1, s2 = first_i1, first_i2
+        for i1, i2, chg1, chg2 in changes[idx : last + 1]:
+            while s1 < i1 and s2 < i2:
+                _emit_record(out, b" ", xdf2.recs[s2])
+                s1 += 1
+                s2 += 1
+            for s in range(i1, i1 + chg1):
+                _emit_record(out, b"-", xdf1.recs[s])
+            for s in range(i2, i2 + chg2):
+                _emit_record(out, b"+", xdf2.recs[s])
+            s1, s2 = i1 + chg1, i2 + chg2
+        for s in range(last_i2 + last_chg2, e2):
+            _emit_record(out, b" ", xdf2.recs[s])
+        idx = last + 1
+
+
+def _quote_path(path: bytes) -> bytes:
+    """C-style quoting of paths, as git does with core.quotePath enabled."""
+    escapes = {7: b"a", 8: b"b", 9: b"t", 10: b"n", 11: b"v", 12: b"f", 13: b"r"}
+    if not any(c < 0x20 or c >= 0x7F or c in b'"\\' for c in path):
+        return path
+    quoted = b'"'
+    for c in path:
+        if c in escapes:
+            quoted += b"\\" + escapes[c]
+        elif c in b'"\\':
+            quoted += b"\\" + bytes([c])
+        elif c < 0x20 or c >= 0x7F:
+            quoted += b"\\%03o" % c
+        else:
+            quoted += bytes([c])
+    return quoted + b'"'
+
+
+def _diff_file(path: str, old: bytes, new: bytes, out: list[bytes]):
+    name = path.encode()
+    if b"\\" in name or b'"' in name or any(c < 0x20 or c >= 0x7F for c in name):
+        a_name, b_name = _quote_path(b"a/" + name), _quote_path(b"b/" + name)
+    else:
+        a_name, b_name = b"a/" + name, b"b/" + name
+    out.append(b"diff --git %s %s\n" % (a_name, b_name))
+    out.append(
+        b"index %s..%s 100644\n"
+        % (git_blob_hash(old)[:ABBREV].encode(), git_blob_hash(new)[:ABBREV].encode())
+    )
+    if b"\0" in old[:FIRST_FEW_BYTES] or b"\0" in new[:FIRST_FEW_BYTES]:
+        out.append(b"Binary files %s and %s differ\n" % (a_name, b_name))
+        return
+    out.append(b"--- %s\n" % a_name)
+    out.append(b"+++ %s\n" % b_name)
+    xdf1, xdf2 = _prepare(_records(old), _records(new))
+    _do_diff(xdf1, xdf2)
+    _change_compact(xdf1, xdf2)
+    _change_compact(xdf2, xdf1)
+    _emit_hunks(xdf1, xdf2, _build_script(xdf1, xdf2), out)
+
+
+def git_diff(content: dict[str, tuple[str, str]]) -> str:
+    """
+    Produce the output of `git diff` for a set of modified files.
+
+    Equivalent to committing every file with its old content in a fresh
+    repository, overwriting it with the new content and running `git diff`
+    with default settings, but without any process or filesystem access.
+
+    :param content: A mapping from file path to a tuple of (old, new) content.
+    :return: The diff, files ordered by path as git does.
+    """
+    out: list[bytes] = []
+    for path in sorted(content, key=lambda p: p.encode()):
+        old, new = content[path]
+        if old == new:
+            continue
+        _diff_file(path, old.encode(), new.encode(), out)
+    return b"".join(out).decode("utf-8", errors="replace")
+
+
+class PatchApplyError(Exception):
+    """Raised when a patch cannot be parsed or does not apply."""
+
+
+@dataclass
+class Hunk:
+    old_start: int
+    old_count: int
+    new_start: int
+    new_count: int
+    # (tag, line) pairs, tag is one of " ", "-" and "+"
+    lines: list[tuple[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class FilePatch:
+    # None stands for /dev/null, i.e. file creation or deletion
+    old_path: str | None
+    new_path: str | None
+    hunks: list[Hunk] = field(default_factory=list)
+
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+C_ESCAPES = {"a": "\a", "b": "\b", "t": "\t", "n": "\n", "v": "\v", "f": "\f"}
+C_ESCAPES.update({"r": "\r", '"': '"', "\\": "\\"})
+
+
+def _unquote_path(path: str) -> str:
+    if not (path.startswith('"') and path.endswith('"')):
+        return path
+    raw, i, body = bytearray(), 0, path[1:-1]
+    while i < len(body):
+        c = body[i]
+        if c != "\\":
+            raw += c.encode()
+            i += 1
+        elif body[i + 1 : i + 4].isdigit():
+            raw.append(int(body[i + 1 : i + 4], 8))
+            i += 4
+        else:
+            raw += C_ESCAPES.get(body[i + 1], body[i + 1]).encode()
+            i += 2
+    return raw.decode("utf-8", errors="replace")
+
+
+def _strip_path(path: str) -> str | None:
+    """Path of a ---/+++ line with the first component stripped, like `-p1`."""
+    path = _unquote_path(path.rstrip("\n").split("\t")[0])
+    if path == "/dev/null":
+        return None
+    return path.split("/", 1)[1] if "/" in path else path
+
+
+def parse_patch(patch: str) -> list[FilePatch]:
+    """Parse a (git) unified diff into per-file hunks."""
+    lines = _lines(patch)
+    file_patches: list[FilePatch] = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith(("GIT binary patch", "Binary files ")):
+            raise PatchApplyError("binary patches are not supported")
+        if line.startswith("--- ") and i + 1 < len(lines):
+            if not lines[i + 1].startswith("+++ "):
+                raise PatchApplyError(f"malformed patch header: {line!r}")
+            file_patches.append(
+                FilePatch(_strip_path(line[4:]), _strip_path(lines[i + 1][4:]))
+            )
+            i += 2
+            continue
+        match = HUNK_HEADER.match(line)
+        if match is None:
+            i += 1
+            continue
+        if not file_patches:
+            raise PatchApplyError("hunk without file header")
+        old_start, old_count, new_start, new_count = (
+            int(g) if g is not None else 1 for g in match.groups()
+        )
+        hunk = Hunk(old_start, old_count, new_start, new_count)
+        old_left, new_left = old_count, new_count
+        i += 1
+        while old_left > 0 or new_left > 0:
+            if i >= len(lines):
+                raise PatchApplyError("truncated hunk")
+            line = lines[i]
+            tag, text = line[:1], line[1:]
+            if line in ("\n", "\r\n"):
+                # some tools drop the space of empty context lines
+                tag, text = " ", line
+            if not text.endswith("\n"):
+                text += "\n"
+            if tag == " ":
+                old_left -= 1
+                new_left -= 1
+            elif tag == "-":
+                old_left -= 1
+            elif tag == "+":
+                new_left -= 1
+            elif tag == "\\":
+                if hunk.lines:
+                    prev_tag, prev_text = hunk.lines[-1]
+                    hunk.lines[-1] = (prev_tag, prev_text[:-1])
+                i += 1
+                continue
+            else:
+                raise PatchApplyError(f"malformed hunk line: {line!r}")
+            hunk.lines.append((tag, text))
+            i += 1
+        if old_left < 0 or new_left < 0:
+            raise PatchApplyError("hunk line counts do not match its header")
+        # "\ No newline at end of file" after the last line of the hunk
+        if i < len(lines) and lines[i].startswith("\\") and hunk.lines:
+            prev_tag, prev_text = hunk.lines[-1]
+            hunk.lines[-1] = (prev_tag, prev_text[:-1])
+            i += 1
+        file_patches[-1].hunks.append(hunk)
+    return file_patches
+
+
+def _normalize_ws(line: str) -> str:
+    return " ".join(line.split())
+
+
+def _locate_hunk(
+    lines: list[str],
+    pattern: list[str],
+    first: int,
+    in_offset: int,
+    last_frozen: int,
+    prefix_context: int,
+    suffix_context: int,
+    fuzz: int,
+    ignore_whitespace: bool,
+) -> int:
+    """
+    Port of GNU patch's `locate_hunk`: the 1-based line the hunk applies
+    at, or 0 if it does not apply with the given fuzz. Positions are tried
+    at increasing distance from the expected one.
+    """
+    input_lines, pat_lines = len(lines), len(pattern)
+    first_guess = first + in_offset
+    context = max(prefix_context, suffix_context)
+    prefix_fuzz = fuzz + prefix_context - context
+    suffix_fuzz = fuzz + suffix_context - context
+    max_where = input_lines - (pat_lines - suffix_fuzz) + 1
+    # leading context may overlap the trailing context of the previous hunk
+    min_where = last_frozen + 1 - (prefix_context - prefix_fuzz)
+    max_pos_offset = max_where - first_guess
+    max_neg_offset = first_guess - min_where
+    max_offset = max(max_pos_offset, max_neg_offset)
+
+    def match(where: int, prefix_fuzz: int, suffix_fuzz: int) -> bool:
+        for p in range(prefix_fuzz, pat_lines - suffix_fuzz):
+            i = where - 1 + p
+            if i < 0 or i >= input_lines:
+                return False
+            if lines[i] != pattern[p] and not (
+                ignore_whitespace
+                and _normalize_ws(lines[i]) == _normalize_ws(pattern[p])
+            ):
+                return False
+        return True
+
+    if not pat_lines:
+        return first_guess
+    if first_guess <= max_neg_offset:
+        max_neg_offset = first_guess - 1
+
+    if prefix_fuzz < 0 and first <= 1:
+        # can only match the start of the file
+        if suffix_fuzz < 0 and (
+            pat_lines != input_lines or prefix_context < last_frozen
+        ):
+            return 0
+        offset = 1 - first_guess
+        if (
+            last_frozen <= prefix_context
+            and offset <= max_pos_offset
+            and match(first_guess + offset, 0, max(suffix_fuzz, 0))
+        ):
+            return first_guess + offset
+        return 0
+    prefix_fuzz = max(prefix_fuzz, 0)
+
+    if suffix_fuzz < 0:
+        # can only match the end of the file
+        offset = first_guess - (input_lines - pat_lines + 1)
+        if offset <= max_neg_offset and match(first_guess - offset, prefix_fuzz, 0):
+            return first_guess - offset
+        return 0
+
+    for offset in range(max_offset + 1):
+        if offset <= max_pos_offset and match(
+            first_guess + offset, prefix_fuzz, suffix_fuzz
+        ):
+            return first_guess + offset
+        if 0 < offset <= max_neg_offset and match(
+            first_guess - offset, prefix_fuzz, suffix_fuzz
+        ):
+            return first_guess - offset
+    return 0
+
+
+def _apply_hunks(
+    content: str, hunks: list[Hunk], fuzz: int, ignore_whitespace: bool
+) -> str:
+    lines = _lines(content)
+    out: list[str] = []
+    last_frozen, in_offset = 0, 0
+    for hunk in hunks:
+        tags = [tag for tag, _ in hunk.lines]
+        pattern = [text for tag, text in hunk.lines if tag != "+"]
+        prefix_context = next(
+            (i for i, tag in enumerate(tags) if tag != " "), len(tags)
+        )
+        suffix_context = next(
+            (i for i, tag in enumerate(reversed(tags)) if tag != " "), len(tags)
+        )
+        # pch_first: an empty old range means appending after old_start
+        first = hunk.old_start if pattern else hunk.old_start + 1
+        max_fuzz = min(fuzz, max(prefix_context, suffix_context))
+        where = 0
+        for f in range(max_fuzz + 1):
+            where = _locate_hunk(
+                lines,
+                pattern,
+                first,
+                in_offset,
+                last_frozen,
+                prefix_context,
+                suffix_context,
+                f,
+                ignore_whitespace,
+            )
+            if where:
+                break
+        if not where:
+            raise PatchApplyError(
+                f"hunk @@ -{hunk.old_start},{hunk.old_count} "
+                f"+{hunk.new_start},{hunk.new_count} @@ does not apply"
+            )
+        in_offset = where - first
+        # like GNU patch, only lines up to the last change are frozen, so the
+        # trailing context stays available to the next hunk
+        old = where - 1
+        for tag, text in hunk.lines:
+            if tag == " ":
+                old += 1
+                continue
+            if old < last_frozen:
+                raise PatchApplyError("misordered hunks")
+            out.extend(lines[last_frozen:old])
+            last_frozen = old
+            if tag == "-":
+                last_frozen += 1
+                old += 1
+            else:
+                out.append(text)
+    out.extend(lines[last_frozen:])
+    # a line patched in without a newline only stays so at the end of file
+    for i in range(len(out) - 1):
+        if not out[i].endswith("\n"):
+            out[i] += "\n"
+    return "".join(out)
+
+
+def apply_patch(
+    files: dict[str, str],
+    patch: str,
+    fuzz: int = 0,
+    ignore_whitespace: bool = False,
+) -> dict[str, str]:
+    """
+    Apply a unified diff to in-memory files.
+
+    :param files: A mapping from path to content, must hold every file the
+                  patch modifies.
+    :param patch: The patch, paths are stripped of their first component
+                  (like `patch -p1` and `git apply`).
+    :param fuzz: Maximum number of context lines that may be ignored at
+                 either end of a hunk, as in `patch --fuzz`.
+    :param ignore_whitespace: Compare context lines ignoring changes in
+                              whitespace, as in `git apply --ignore-whitespace`.
+    :return: A new mapping with the patch applied. Deleted files are removed.
+    :raises PatchApplyError: If any hunk fails; `files` is left untouched.
+    """
+    result = dict(files)
+    for file_patch in parse_patch(patch):
+        if file_patch.old_path is None:
+            content = ""
+            if file_patch.new_path in result:
+                raise PatchApplyError(f"{file_patch.new_path} already exists")
+        elif file_patch.old_path in result:
+            content = result[file_patch.old_path]
+        else:
+            raise PatchApplyError(f"{file_patch.old_path} does not exist")
+        content = _apply_hunks(content, file_patch.hunks, fuzz, ignore_whitespace)
+        if file_patch.old_path is not None and (
+            file_patch.new_path != file_patch.old_path
+        ):
+            del result[file_patch.old_path]
+        if file_patch.new_path is not None:
+            result[file_patch.new_path] = content
+    return result
+
+
+def apply_patch_with_fallback(files: dict[str, str], patch: str) -> dict[str, str]:
+    """
+    Apply a patch the way the evaluator does: strictly but ignoring
+    whitespace changes first (`git apply --ignore-whitespace`), then with a
+    fuzz factor of 5 (`patch --fuzz=5`).
+    """
+    try:
+        return apply_patch(files, patch, ignore_whitespace=True)
+    except PatchApplyError:
+        return apply_patch(files, patch, fuzz=5)
@@ -0,0 +1,196 @@
+"""
+Extraction of import statements from source files with tree-sitter.
+
+Parsing is CPU bound and holds the GIL, so `ImportExtractor` runs it in a
+process pool, each worker building its own parsers on first use. Results
+are memoized on disk by a hash of the file content, so unchanged files are
+never parsed twice across runs.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from tree_sitter import Parser, Query
+
+__all__ = ["extract_imports", "ImportExtractor", "ImportIndex"]
+
+# tree-sitter grammar name and import query per language
+import_queries = {
+    "python": ("python", "[(import_statement) (import_from_statement)] @import"),
+    "rust": ("rust", "(use_declaration) @use"),
+    "csharp": ("c_sharp", "(using_directive) @use"),
+    "javascript": ("javascript", "(import_statement) @import"),
+}
+
+
+@functools.cache
+def _parser(language: str) -> tuple["Parser", "Query"]:
+    # grammars are loaded on first use, not when the module is imported
+    from tree_sitter_languages import get_language, get_parser
+
+    grammar, query = import_queries[language]
+    return get_parser(grammar), get_language(grammar).query(query)
+
+
+def extract_imports(language: str, content: str) -> list[str]:
+    """Return the import statements of `content`, in source order."""
+    ts_parser, query = _parser(language)
+    data = content.encode()
+    tree = ts_parser.parse(data)
+    return [
+        data[node.start_byte : node.end_byte].decode()
+        for node, _ in query.captures(tree.root_node)
+    ]
+
+
+def normalize_import(statement: str) -> str:
+    """Collapse whitespace so that formatting differences do not matter."""
+    return " ".join(statement.split())
+
+
+class ImportIndex:
+    """
+    The unique import statements of a repository, in order of first
+    appearance, with the number of files using each.
+
+    Statements are compared after `normalize_import`, so a lookup is a hash
+    set probe and `import os` no longer matches `import os.path`.
+    """
+
+    def __init__(self):
+        self.counts: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __contains__(self, statement: str) -> bool:
+        return normalize_import(statement) in self.counts
+
+    def add(self, statements: list[str]) -> list[str]:
+        """Add the statements of one file, returning those not seen before."""
+        new = []
+        # a file counts once per statement, however it is formatted
+        keys = {}
+        for statement in statements:
+            keys.setdefault(normalize_import(statement), statement)
+        for key, statement in keys.items():
+            if key in self.counts:
+                self.counts[key] += 1
+            else:
+                self.counts[key] = 1
+                new.append(statement)
+        return new
+
+    def summary(self) -> str:
+        """One line per unique statement, annotated with its file count."""
+        return "\n".join(
+            f"{statement}  ({count} file{'s' if count > 1 else ''})"
+            for statement, count in self.counts.items()
+        )
+
+
+def _cache_key(language: str, content: str) -> str:
+    # the query is part of the key so that changing it invalidates old entries
+    grammar, query = import_queries[language]
+    h = hashlib.sha256(f"{grammar}\0{query}\0".encode())
+    h.update(content.encode())
+    return h.hexdigest()
+
+
+def _extract_files(
+    language: str, paths: list[str], cache_dir: str | None
+) -> list[list[str]]:
+    """Worker entry point: extract the imports of `paths`, using the memo."""
+    results = []
+    for path in paths:
+        content = Path(path).read_text()
+        if cache_dir is None:
+            results.append(extract_imports(language, content))
+            continue
+        key = _cache_key(language, content)
+        entry = Path(cache_dir) / key[:2] / f"{key}.json"
+        try:
+            results.append(json.loads(entry.read_text()))
+            continue
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        statements = extract_imports(language, content)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = entry.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps(statements, ensure_ascii=False))
+        os.replace(tmp, entry)
+        results.append(statements)
+    return results
+
+
+class ImportExtractor:
+    """
+    Extracts import statements in a pool of worker processes.
+
+    :param max_workers: Number of worker processes, defaults to the CPU count.
+    :param cache_dir: Directory of the on-disk memo, `None` to disable it.
+    :param chunk_size: Number of files handed to a worker at a time.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        cache_dir: str | Path | None = ".cache/imports",
+        chunk_size: int = 32,
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache_dir = None if cache_dir is None else str(cache_dir)
+        self.chunk_size = chunk_size
+        self._pool = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # workers are spawned rather than forked, the parent runs an event
+        # loop and HTTP client threads that must not be duplicated
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def extract(
+        self, language: str, root: Path, files: list[str]
+    ) -> dict[str, list[str]]:
+        """Map each of `files` (relative to `root`) to its import statements."""
+        language = language.lower()
+        loop = asyncio.get_running_loop()
+        chunks = [
+            files[i : i + self.chunk_size]
+            for i in range(0, len(files), self.chunk_size)
+        ]
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    self.pool,
+                    _extract_files,
+                    language,
+                    [str(root / file) for file in chunk],
+                    self.cache_dir,
+                )
+                for chunk in chunks
+            )
+        )
+        return {
+            file: statements
+            for chunk, chunk_results in zip(chunks, results)
+            for file, statements in zip(chunk, chunk_results)
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
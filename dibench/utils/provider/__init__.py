@@ -1,18 +1,73 @@
 from typing import Literal
 
-from .base import BaseProvider
+from .base import BaseProvider, Reply, reply_usage
+from .cache import CachedProvider, CacheMissError, ResponseCache
+from .errors import is_context_overflow, is_retryable, retry_after, status_code
+from .limit import (
+    DeadlineProvider,
+    RateLimitedProvider,
+    RateLimiter,
+    shared_limiter,
+)
+from .offline import ReplayProvider, SyntheticError, SyntheticProvider
+from .telemetry import (
+    RequestMetrics,
+    TelemetryProvider,
+    model_price,
+    record_prompt_strategy,
+    track_instance,
+)
 
-__all__ = ["get_llm", "BaseProvider"]
+__all__ = [
+    "get_llm",
+    "BaseProvider",
+    "Reply",
+    "reply_usage",
+    "DeadlineProvider",
+    "RateLimitedProvider",
+    "RateLimiter",
+    "shared_limiter",
+    "status_code",
+    "retry_after",
+    "is_retryable",
+    "is_context_overflow",
+    "CachedProvider",
+    "CacheMissError",
+    "ResponseCache",
+    "ReplayProvider",
+    "SyntheticError",
+    "SyntheticProvider",
+    "RequestMetrics",
+    "TelemetryProvider",
+    "model_price",
+    "record_prompt_strategy",
+    "track_instance",
+]
 
 
 def get_llm(
     model: str,
-    model_backend: Literal["openai"] = "openai",
+    model_backend: Literal["openai", "replay", "synthetic"] = "openai",
     use_async: bool = False,
+    **kwargs,
 ):
+    """
+    Create a provider for `model`, `kwargs` are the options of the backend.
+    `openai` takes the connection pool settings of `shared_client`. The
+    offline backends are async only: `replay` needs `recordings`, see
+    `ReplayProvider`, and `synthetic` takes the options of
+    `SyntheticProvider`.
+    """
     if model_backend == "openai":
         from .openai import AsyncOpenAIProvider, OpenAIProvider
 
-        return OpenAIProvider(model) if not use_async else AsyncOpenAIProvider(model)
+        if not use_async:
+            return OpenAIProvider(model, **kwargs)
+        return AsyncOpenAIProvider(model, **kwargs)
+    elif model_backend in ("replay", "synthetic"):
+        assert use_async, f"The {model_backend} backend is async only"
+        if model_backend == "replay":
+            return ReplayProvider(model, **kwargs)
+        return SyntheticProvider(model, **kwargs)
     else:
         raise ValueError(f"Not supported backend: {model_backend}")
@@ -1,5 +1,29 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import AsyncIterator, List
+
+
+class Reply(str):
+    """
+    A reply, or a chunk of a streamed one, carrying the token usage the API
+    reported for its request as `(prompt_tokens, completion_tokens)`.
+    Streams report it on a last, empty chunk; with `n > 1`, it is on the
+    first sample.
+    """
+
+    usage: tuple[int, int] | None = None
+
+    @classmethod
+    def with_usage(cls, text: str, usage: tuple[int, int] | None) -> "Reply":
+        reply = cls(text)
+        reply.usage = usage
+        return reply
+
+
+def reply_usage(reply: str | list[str] | None) -> tuple[int, int] | None:
+    """The usage attached to a reply or chunk, see `Reply`."""
+    if isinstance(reply, list):
+        reply = reply[0] if reply else None
+    return getattr(reply, "usage", None)
 
 
 class BaseProvider(ABC):
@@ -10,13 +34,30 @@ class BaseProvider(ABC):
         max_new_tokens: int = 1024,
         temperature: float = 0.0,
         n: int = 1,
-    ) -> List[str]:
+    ) -> str | List[str]:
+        """
+        Generate a reply to `messages`, as a string. With `n > 1`, the `n`
+        samples are drawn in a single request and all of them are returned
+        as a list.
+        """
         ...
 
     @abstractmethod
     def count_tokens(self, message: str) -> int:
         ...
 
+    async def stream_reply(
+        self,
+        messages: list[str],
+        max_new_tokens: int = 1024,
+        temperature: float = 0.0,
+    ) -> AsyncIterator[str]:
+        """
+        Yield the reply as it is generated. Closing the iterator early stops
+        the generation. Providers without streaming yield the whole reply.
+        """
+        yield await self.generate_reply(messages, max_new_tokens, temperature, 1)
+
 
 # https://github.com/evalplus/repoqa/blob/main/repoqa/provider/request/__init__.py
 def hacky_assistant_stop_seq(tokenizer) -> str:
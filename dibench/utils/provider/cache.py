@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from contextlib import aclosing
+from pathlib import Path
+from typing import Any, AsyncIterator, List
+
+from .base import BaseProvider
+
+
+class CacheMissError(Exception):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of LLM responses.
+
+    Each entry lives in `{cache_dir}/{key[:2]}/{key}.json`, where the key is a
+    sha256 over the request (backend, endpoint, model, messages and sampling
+    parameters), so the same prompt hits the cache regardless of which run or
+    results directory issued it, but deployments sharing a model name do not
+    share entries. Replies cut short by their consumer are kept apart from
+    complete ones, see `CachedProvider.stream_reply`.
+
+    :param cache_dir: Directory holding the cache entries.
+    :param max_size: Evict the oldest entries once the cache exceeds this many bytes.
+    :param max_age: Evict entries older than this many seconds.
+    :param readonly: Replay mode, never write new entries.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        max_size: int | None = None,
+        max_age: float | None = None,
+        readonly: bool = False,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self.max_age = max_age
+        self.readonly = readonly
+        if not self.readonly:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self.evict()
+
+    @staticmethod
+    def key(
+        model: str,
+        messages: list,
+        max_new_tokens: int,
+        temperature: float,
+        n: int,
+        backend: str | None = None,
+        base_url: str | None = None,
+        truncated: bool = False,
+    ) -> str:
+        request = dict(
+            backend=backend,
+            base_url=base_url,
+            model=model,
+            messages=messages,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            n=n,
+            truncated=truncated,
+        )
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _expired(self, path: Path) -> bool:
+        if self.max_age is None:
+            return False
+        return time.time() - path.stat().st_mtime > self.max_age
+
+    def get(self, key: str) -> Any | None:
+        path = self._path(key)
+        try:
+            if self._expired(path):
+                return None
+            return json.loads(path.read_text())["response"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def put(self, key: str, response: Any):
+        if self.readonly:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so that concurrent readers never see partial entries
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex[:8]}.tmp")
+        tmp_path.write_text(json.dumps({"key": key, "response": response}))
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """Drop expired entries, then the oldest ones until under `max_size`."""
+        if self.max_size is None and self.max_age is None:
+            return
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        now = time.time()
+        if self.max_age is not None:
+            for mtime, _, path in entries:
+                if now - mtime > self.max_age:
+                    path.unlink(missing_ok=True)
+            entries = [e for e in entries if now - e[0] <= self.max_age]
+        if self.max_size is not None:
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_size:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+
+class CachedProvider(BaseProvider):
+    """
+    Serve replies from a `ResponseCache`, falling back to the wrapped async
+    provider on a miss. In replay mode a miss raises `CacheMissError`
+    instead of issuing a request.
+
+    :param backend: Backend of the wrapped provider, e.g. `openai`.
+    :param base_url: Endpoint the wrapped provider sends requests to.
+    """
+
+    def __init__(
+        self,
+        provider: BaseProvider,
+        cache: ResponseCache,
+        backend: str | None = None,
+        base_url: str | None = None,
+    ):
+        self.provider = provider
+        self.model = provider.model
+        self.cache = cache
+        self.backend = backend
+        self.base_url = base_url
+
+    def _key(
+        self,
+        messages: list,
+        max_new_tokens: int,
+        temperature: float,
+        n: int,
+        truncated: bool = False,
+    ):
+        return self.cache.key(
+            self.model,
+            messages,
+            max_new_tokens,
+            temperature,
+            n,
+            self.backend,
+            self.base_url,
+            truncated,
+        )
+
+    async def generate_reply(
+        self,
+        messages: list[str],
+        max_new_tokens: int = 1024,
+        temperature: float = 0.0,
+        n: int = 1,
+    ) -> str | List[str]:
+        key = self._key(messages, max_new_tokens, temperature, n)
+        response = self.cache.get(key)
+        if response is not None:
+            return response
+        if self.cache.readonly:
+            raise CacheMissError(f"No cached response for request {key}")
+        response = await self.provider.generate_reply(
+            messages, max_new_tokens, temperature, n
+        )
+        self.cache.put(key, response)
+        return response
+
+    async def stream_reply(
+        self,
+        messages: list[str],
+        max_new_tokens: int = 1024,
+        temperature: float = 0.0,
+    ) -> AsyncIterator[str]:
+        """
+        Stream from the wrapped provider, or yield the cached reply at once.
+        Complete streams share entries with `generate_reply`. A stream
+        closed early by its consumer is cached as received, as the consumer
+        stopped once it had all it needed, but under its own key, so that
+        only streams are served the truncated reply.
+        """
+        key = self._key(messages, max_new_tokens, temperature, 1)
+        truncated_key = self._key(messages, max_new_tokens, temperature, 1, True)
+        for cached_key in (key, truncated_key):
+            response = self.cache.get(cached_key)
+            if response is not None:
+                yield response
+                return
+        if self.cache.readonly:
+            raise CacheMissError(f"No cached response for request {key}")
+        chunks = []
+        try:
+            async with aclosing(
+                self.provider.stream_reply(messages, max_new_tokens, temperature)
+            ) as stream:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+        except GeneratorExit:
+            self.cache.put(truncated_key, "".join(chunks))
+            raise
+        self.cache.put(key, "".join(chunks))
+
+    def count_tokens(self, message: str) -> int:
+        return self.provider.count_tokens(message)
@@ -0,0 +1,90 @@
+"""
+Inspection of the errors raised by providers, whichever client raised them.
+"""
+
+import asyncio
+import email.utils
+import time
+
+__all__ = ["status_code", "retry_after", "is_retryable", "is_context_overflow"]
+
+# transient failures without a status code, by class name so that any
+# client (openai, httpx) is recognized without importing it
+TRANSIENT_ERRORS = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "APIError",
+    "TransportError",
+    "TimeoutException",
+}
+# status codes worth retrying: timeout, conflict, rate limit
+RETRYABLE_STATUS = {408, 409, 429}
+CONTEXT_OVERFLOW_MESSAGES = (
+    "context_length_exceeded",
+    "maximum context length",
+    "context window",
+    "prompt is too long",
+    "input is too long",
+    "too many tokens",
+)
+
+
+def status_code(error: BaseException) -> int | None:
+    """The HTTP status code of a failed request, if the error carries one."""
+    code = getattr(error, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def retry_after(error: BaseException) -> float | None:
+    """
+    Seconds the server asked to wait before retrying, from the error itself
+    or the `Retry-After` (or `retry-after-ms`) header of its response.
+    """
+    seconds = getattr(error, "retry_after", None)
+    if seconds is not None:
+        return float(seconds)
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers["retry-after-ms"]) / 1000
+    except (KeyError, ValueError):
+        pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        # an HTTP date instead of a number of seconds
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, date.timestamp() - time.time())
+
+
+def is_context_overflow(error: BaseException) -> bool:
+    """Whether the request failed because the prompt exceeds the context window."""
+    code = status_code(error)
+    if code is not None and code not in (400, 413, 422):
+        return False
+    if getattr(error, "code", None) == "context_length_exceeded":
+        return True
+    message = str(error).lower()
+    return any(pattern in message for pattern in CONTEXT_OVERFLOW_MESSAGES)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Whether a failed request may succeed when sent again: timeouts,
+    connection errors, rate limits and server errors. Client errors (bad
+    request, authentication, context overflow, ...) and anything else are
+    fatal.
+    """
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS or code >= 500
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
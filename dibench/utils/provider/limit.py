@@ -0,0 +1,289 @@
+import asyncio
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncIterator, List
+
+from .base import BaseProvider
+from .errors import retry_after, status_code
+
+
+class DeadlineProvider(BaseProvider):
+    """
+    Wrap an async provider so that a request failing to complete within
+    `timeout` seconds is cancelled and raises `TimeoutError`, so a hung
+    connection cannot stall its instance. For streams, the deadline covers
+    the whole stream, not each chunk.
+    """
+
+    def __init__(self, provider: BaseProvider, timeout: float):
+        assert timeout > 0, "timeout must be positive"
+        self.provider = provider
+        self.model = provider.model
+        self.timeout = timeout
+
+    async def generate_reply(
+        self,
+        messages: list[str],
+        max_new_tokens: int = 1024,
+        temperature: float = 0.0,
+        n: int = 1,
+    ) -> str | List[str]:
+        try:
+            return await asyncio.wait_for(
+                self.provider.generate_reply(messages, max_new_tokens, temperature, n),
+                self.timeout,
+            )
+        except asyncio.TimeoutError:
+            # `asyncio.TimeoutError` is not the builtin one before 3.11
+            raise TimeoutError(f"No reply within {self.timeout}s") from None
+
+    async def stream_reply(
+        self,
+        messages: list[str],
+        max_new_tokens: int = 1024,
+        temperature: float = 0.0,
+    ) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        async with aclosing(
+            self.provider.stream_reply(messages, max_new_tokens, temperature)
+        ) as stream:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(
+                        anext(stream), max(0.0, deadline - loop.time())
+                    )
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    raise TimeoutError(
+                        f"Reply not completed within {self.timeout}s"
+                    ) from None
+                yield chunk
+
+    def count_tokens(self, message: str) -> int:
+        return self.provider.count_tokens(message)
+
+
+class RateLimiter:
+    """
+    Admission control for one deployment, shared by every request to it.
+
+    Requests are admitted while:
+    - fewer than `limit` are in flight, where `limit` adapts to throttling
+      (AIMD): it grows by one per `limit` successful requests up to
+      `max_concurrency`, and halves on a rate limit error, at most once
+      per throttling episode;
+    - the requests and tokens sent over the last minute stay within `rpm`
+      and `tpm` (a single request larger than `tpm` is admitted alone);
+    - the server's last `Retry-After` delay has passed, so throttled
+      requests resume together at the reduced concurrency instead of each
+      backing off on its own.
+
+    :param max_concurrency: Upper bound of in-flight requests.
+    :param rpm: Requests per minute, `None` for no budget.
+    :param tpm: Tokens (prompt and completion) per minute, `None` for no budget.
+    :param min_concurrency: Lower bound of the adaptive concurrency.
+    :param backoff: Delay imposed on all requests after a rate limit error
+                    without a `Retry-After` hint, in seconds.
+    """
+
+    WINDOW = 60.0
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        rpm: int | None = None,
+        tpm: int | None = None,
+        min_concurrency: int = 1,
+        backoff: float = 1.0,
+    ):
+        assert 0 < min_concurrency <= max_concurrency, "invalid concurrency bounds"
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.backoff = backoff
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.throttled = 0
+        # admitted requests of the last minute as
+        # [admission time, tokens, still in the window]
+        self.window: deque[list] = deque()
+        self.window_tokens = 0
+        self._last_decrease = float("-inf")
+        self._loop = None
+        self._condition = None
+
+    @property
+    def _cond(self) -> asyncio.Condition:
+        # asyncio primitives are bound to the event loop first using them,
+        # the limiter outlives it when the process runs several loops (e.g.
+        # successive `asyncio.run` calls)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._condition = loop, asyncio.Condition()
+        return self._condition
+
+    def _expire(self, now: float):
+        while self.window and self.window[0][0] <= now - self.WINDOW:
+            ticket = self.window.popleft()
+            self.window_tokens -= ticket[1]
+            ticket[2] = False
+
+    def _delay(self, now: float, tokens: int) -> float | None:
+        """Seconds until the request may be admitted, 0 if it may go now."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= int(self.limit):
+            # woken up when a request completes
+            return None
+        if self.rpm is not None and len(self.window) >= self.rpm:
+            return self.window[0][0] + self.WINDOW - now
+        tpm = self.tpm
+        if tpm is not None and self.window and self.window_tokens + tokens > tpm:
+            # wait for enough of the oldest requests to leave the window
+            excess = self.window_tokens + tokens - tpm
+            for start, used, _ in self.window:
+                excess -= used
+                if excess <= 0:
+                    break
+            return start + self.WINDOW - now
+        return 0
+
+    async def acquire(self, tokens: int = 0) -> list:
+        """Wait until a request of `tokens` may be sent, returns its ticket."""
+        loop = asyncio.get_running_loop()
+        async with self._cond:
+            while True:
+                now = loop.time()
+                self._expire(now)
+                delay = self._delay(now, tokens)
+                if delay == 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._cond.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            self.in_flight += 1
+            ticket = [now, tokens, True]
+            self.window.append(ticket)
+            self.window_tokens += tokens
+            return ticket
+
+    async def release(
+        self,
+        ticket: list,
+        tokens: int | None = None,
+        error: BaseException | None = None,
+    ):
+        """
+        Record the outcome of a request: the tokens it actually used and the
+        error it failed with, if any.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._cond:
+            now = loop.time()
+            self.in_flight -= 1
+            if tokens is not None and ticket[2]:
+                self.window_tokens += tokens - ticket[1]
+                ticket[1] = tokens
+            if error is not None and status_code(error) == 429:
+                self.throttled += 1
+                # requests sent before the last decrease saw the old limit
+                if ticket[0] >= self._last_decrease:
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    self._last_decrease = now
+                delay = retry_after(error)
+                delay = self.backoff if delay is None else delay
+                self.blocked_until = max(self.blocked_until, now + delay)
+            elif error is None:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+# deployment -> its limiter, see `shared_limiter`
+_limiters: dict[str, RateLimiter] = {}
+
+
+def shared_limiter(deployment: str, **kwargs) -> RateLimiter:
+    """
+    The limiter of a deployment (e.g. `openai:gpt-4o`), created with
+    `kwargs` on first use and shared by every provider sending to it.
+    """
+    if deployment not in _limiters:
+        _limiters[deployment] = RateLimiter(**kwargs)
+    return _limiters[deployment]
+
+
+class RateLimitedProvider(BaseProvider):
+    """
+    Wrap an async provider so that its requests go through a `RateLimiter`.
+    Prompt tokens, plus `max_new_tokens` until the completion is known, are
+    counted with the provider's `count_tokens` when the limiter has a
+    tokens-per-minute budget.
+    """
+
+    def __init__(self, provider: BaseProvider, limiter: RateLimiter):
+        self.provider = provider
+        self.model = provider.model
+        self.limiter = limiter
+
+    def _count(self, texts: list[str]) -> int:
+        if self.limiter.tpm is None:
+            return 0
+        return sum(self.provider.count_tokens(text) for text in texts if text)
+
+    async def generate_reply(
+        self,
+        messages: list[str],
+        max_new_tokens: int = 1024,
+        temperature: float = 0.0,
+        n: int = 1,
+    ) -> str | List[str]:
+        prompt_tokens = self._count([m["content"] for m in messages])
+        ticket = await self.limiter.acquire(prompt_tokens + max_new_tokens * n)
+        tokens, error = None, None
+        try:
+            reply = await self.provider.generate_reply(
+                messages, max_new_tokens, temperature, n
+            )
+            tokens = prompt_tokens + self._count(
+                [reply] if isinstance(reply, str) else reply
+            )
+            return reply
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            await self.limiter.release(ticket, tokens, error)
+
+    async def stream_reply(
+        self,
+        messages: list[str],
+        max_new_tokens: int = 1024,
+        temperature: float = 0.0,
+    ) -> AsyncIterator[str]:
+        prompt_tokens = self._count([m["content"] for m in messages])
+        ticket = await self.limiter.acquire(prompt_tokens + max_new_tokens)
+        chunks, error = [], None
+        try:
+            async with aclosing(
+                self.provider.stream_reply(messages, max_new_tokens, temperature)
+            ) as stream:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+        except GeneratorExit:
+            # closed early by the consumer, not a failure
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            tokens = prompt_tokens + self._count(["".join(chunks)])
+            await self.limiter.release(ticket, tokens, error)
+
+    def count_tokens(self, message: str) -> int:
+        return self.provider.count_tokens(message)
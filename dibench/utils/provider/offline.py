@@ -0,0 +1,257 @@
+"""
+Offline providers, to run the inference pipeline without network access.
+
+`ReplayProvider` serves completions recorded by a previous run, keyed by a
+hash of the prompt. `SyntheticProvider` answers every prompt with valid
+build file listings after a simulated latency, failing a configurable
+share of the requests, so throughput, retries and concurrency can be
+benchmarked and profiled locally.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+from pathlib import Path
+from typing import AsyncIterator, List
+
+from .base import BaseProvider
+from .cache import CacheMissError
+
+__all__ = ["prompt_key", "ReplayProvider", "SyntheticError", "SyntheticProvider"]
+
+# rough token estimate, there is no tokenizer offline
+CHARS_PER_TOKEN = 4
+
+
+def prompt_key(messages: list) -> str:
+    """Hash of a prompt, independent of the model and sampling parameters."""
+    payload = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def load_recordings(path: str | Path) -> dict[str, str]:
+    """
+    Load recorded completions, keyed by `prompt_key`.
+
+    `path` is either a JSON-lines file of `{"messages": [...], "response":
+    "..."}` records, or a workspace directory of a previous `depinfer` run,
+    whose `trajs.json` files hold the conversations of each instance.
+    """
+    path = Path(path)
+    recordings = {}
+    if path.is_file():
+        with path.open() as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    recordings[prompt_key(record["messages"])] = record["response"]
+        return recordings
+    for trajs in sorted(path.rglob("trajs.json")):
+        messages = json.loads(trajs.read_text())
+        # conversations are concatenated, each ends with the assistant reply
+        prompt = []
+        for message in messages:
+            if message["role"] == "assistant":
+                recordings[prompt_key(prompt)] = message["content"]
+                prompt = []
+            else:
+                prompt.append(message)
+    return recordings
+
+
+class ReplayProvider(BaseProvider):
+    """
+    Serve completions recorded by a previous run, see `load_recordings`.
+    Unlike a read-only `ResponseCache`, the lookup ignores the model and
+    sampling parameters. An unrecorded prompt raises `CacheMissError`.
+
+    :param model: Model name reported by the provider.
+    :param recordings: Recordings file or workspace directory.
+    :param latency: Seconds to wait before serving each completion.
+    """
+
+    def __init__(self, model: str, recordings: str | Path, latency: float = 0.0):
+        self.model = model
+        self.latency = latency
+        self.recordings = load_recordings(recordings)
+
+    async def generate_reply(
+        self,
+        messages: list[str],
+        max_new_tokens: int = 1024,
+        temperature: float = 0.0,
+        n: int = 1,
+    ) -> str | List[str]:
+        key = prompt_key(messages)
+        if key not in self.recordings:
+            raise CacheMissError(f"No recorded completion for prompt {key}")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        # a single completion is recorded per prompt
+        return self.recordings[key] if n == 1 else [self.recordings[key]] * n
+
+    def count_tokens(self, message: str) -> int:
+        return len(message) // CHARS_PER_TOKEN
+
+
+class SyntheticError(Exception):
+    """
+    A failure injected by `SyntheticProvider`, carrying the HTTP status code
+    and error code the API would have answered with.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status_code: int,
+        code: str | None = None,
+        retry_after: float | None = None,
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.retry_after = retry_after
+
+
+# error kind -> (status code, error code)
+SYNTHETIC_ERRORS = {
+    "rate_limit": (429, "rate_limit_exceeded"),
+    "server": (500, "server_error"),
+    "overloaded": (503, "overloaded"),
+    "context_length": (400, "context_length_exceeded"),
+    "timeout": (408, "timeout"),
+}
+
+# a build file listing in a prompt: the path, then the fenced content
+_listing = re.compile(r"^([^\s`][^\n]*)\n```\n(.*?)\n```$", re.DOTALL | re.MULTILINE)
+_build_section = re.compile(
+    r"--- Begin of Build Files? ---\n(.*?)--- End of Build Files? ---", re.DOTALL
+)
+
+
+class SyntheticProvider(BaseProvider):
+    """
+    Answer every prompt with the build file listings it contains, unchanged
+    (or an empty dependency list for prompts asking for JSON), after a
+    simulated latency.
+
+    Randomness is drawn from the seed, the prompt and the number of times
+    the prompt was requested, so a run is reproducible regardless of how
+    requests interleave, and a retried request can succeed.
+
+    :param model: Model name reported by the provider.
+    :param latency: Median seconds before the first token.
+    :param latency_sigma: Spread of the log-normal time to first token.
+    :param tokens_per_second: Generation speed, `None` to reply at once.
+    :param error_rates: Probability of each kind of failure in
+                        `SYNTHETIC_ERRORS` per request, e.g.
+                        `{"rate_limit": 0.05, "server": 0.01}`.
+    :param retry_after: Retry-After hint of rate limit errors, in seconds.
+    :param seed: Seed of the simulation.
+    """
+
+    def __init__(
+        self,
+        model: str = "synthetic",
+        latency: float = 0.0,
+        latency_sigma: float = 0.0,
+        tokens_per_second: float | None = None,
+        error_rates: dict[str, float] | None = None,
+        retry_after: float = 1.0,
+        seed: int = 0,
+    ):
+        error_rates = error_rates or {}
+        unknown = set(error_rates) - set(SYNTHETIC_ERRORS)
+        assert not unknown, f"Unknown error kinds: {unknown}"
+        assert sum(error_rates.values()) <= 1, "error rates must sum to at most 1"
+        self.model = model
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rates = error_rates
+        self.retry_after = retry_after
+        self.seed = seed
+        self.attempts: dict[str, int] = {}
+
+    def _rng(self, messages: list) -> random.Random:
+        key = prompt_key(messages)
+        attempt = self.attempts.get(key, 0)
+        self.attempts[key] = attempt + 1
+        return random.Random(f"{self.seed}:{key}:{attempt}")
+
+    def _fail(self, rng: random.Random):
+        draw = rng.random()
+        for kind, rate in self.error_rates.items():
+            if draw < rate:
+                status_code, code = SYNTHETIC_ERRORS[kind]
+                raise SyntheticError(
+                    f"Synthetic {kind} error",
+                    status_code,
+                    code,
+                    retry_after=self.retry_after if kind == "rate_limit" else None,
+                )
+            draw -= rate
+
+    def reply(self, messages: list, max_new_tokens: int | None = None) -> str:
+        """
+        The completion for a prompt, without latency or failures, cut at
+        `max_new_tokens` like a real generation.
+        """
+        prompt = messages[-1]["content"] if messages else ""
+        sections = _build_section.findall(prompt)
+        listings = _listing.findall(sections[-1]) if sections else []
+        if "```json" in prompt:
+            dependencies = json.dumps({path: {} for path, _ in listings})
+            response = f"```json\n{dependencies}\n```\n"
+        else:
+            # the prompt adds a newline before the closing fence, drop it
+            # so that echoing a listing leaves the file unchanged
+            response = "".join(
+                f"{path}\n```\n{content.removesuffix(chr(10))}\n```\n"
+                for path, content in listings
+            )
+        if max_new_tokens is not None:
+            response = response[: max_new_tokens * CHARS_PER_TOKEN]
+        return response
+
+    def _generation_time(self, text: str) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return len(text) / CHARS_PER_TOKEN / self.tokens_per_second
+
+    async def _first_token(self, messages: list):
+        rng = self._rng(messages)
+        delay = self.latency * rng.lognormvariate(0, self.latency_sigma)
+        if delay:
+            await asyncio.sleep(delay)
+        self._fail(rng)
+
+    async def generate_reply(
+        self,
+        messages: list[str],
+        max_new_tokens: int = 1024,
+        temperature: float = 0.0,
+        n: int = 1,
+    ) -> str | List[str]:
+        await self._first_token(messages)
+        response = self.reply(messages, max_new_tokens)
+        if self.tokens_per_second:
+            await asyncio.sleep(self._generation_time(response))
+        return response if n == 1 else [response] * n
+
+    async def stream_reply(
+        self,
+        messages: list[str],
+        max_new_tokens: int = 1024,
+        temperature: float = 0.0,
+    ) -> AsyncIterator[str]:
+        await self._first_token(messages)
+        for line in self.reply(messages, max_new_tokens).splitlines(keepends=True):
+            if self.tokens_per_second:
+                await asyncio.sleep(self._generation_time(line))
+            yield line
+
+    def count_tokens(self, message: str) -> int:
+        return len(message) // CHARS_PER_TOKEN
@@ -1,40 +1,118 @@
+import functools
 import os
-from typing import List
+from typing import AsyncIterator, List
 
-import tiktoken
-from openai import AsyncAzureOpenAI, AsyncOpenAI, AzureOpenAI, OpenAI
+import httpx
+from openai import (
+    AsyncAzureOpenAI,
+    AsyncOpenAI,
+    AzureOpenAI,
+    DefaultAsyncHttpxClient,
+    DefaultHttpxClient,
+    OpenAI,
+)
 
-from .base import BaseProvider
+from .base import BaseProvider, Reply
+
+
+@functools.cache
+def shared_client(
+    use_async: bool,
+    max_connections: int | None = 100,
+    max_keepalive_connections: int | None = 20,
+    keepalive_expiry: float | None = 60.0,
+    timeout: float = 600.0,
+) -> OpenAI | AzureOpenAI | AsyncOpenAI | AsyncAzureOpenAI:
+    """
+    The client shared by every provider created with the same connection
+    pool settings, so that they reuse warm keep-alive connections instead
+    of each opening their own pool.
+
+    :param max_connections: Maximum number of open connections.
+    :param max_keepalive_connections: Idle connections kept open for reuse.
+    :param keepalive_expiry: Seconds before an idle connection is closed.
+    :param timeout: Request timeout in seconds.
+    """
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    if use_async:
+        http_client = DefaultAsyncHttpxClient(limits=limits, timeout=timeout)
+    else:
+        http_client = DefaultHttpxClient(limits=limits, timeout=timeout)
+    if os.getenv("OPENAI_API_KEY") is not None:
+        client = AsyncOpenAI if use_async else OpenAI
+    elif os.getenv("AZURE_OPENAI_AD_TOKEN") is not None:
+        client = AsyncAzureOpenAI if use_async else AzureOpenAI
+    else:
+        raise ValueError("OPENAI_API_KEY or AZURE_OPENAI_API_KEY must be set")
+    return client(http_client=http_client)
+
+
+def _usage(response) -> tuple[int, int] | None:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    return usage.prompt_tokens, usage.completion_tokens
+
+
+def choices(response, n: int) -> str | list[str]:
+    """
+    The reply, or all `n` sampled replies, of a chat completion, carrying
+    the usage of the request, see `Reply`.
+    """
+    # choices may come back out of order
+    contents = [
+        choice.message.content
+        for choice in sorted(response.choices, key=lambda choice: choice.index)
+    ]
+    contents[0] = Reply.with_usage(contents[0], _usage(response))
+    return contents[0] if n == 1 else contents
+
+
+@functools.cache
+def load_tokenizer(model: str):
+    """
+    Load (and memoize) the tokenizer of `model`. Tokenizers may have to be
+    downloaded and `transformers` is slow to import, so providers only load
+    them when tokens are first counted.
+    """
+    if model.startswith("gpt"):
+        import tiktoken
+
+        return tiktoken.encoding_for_model(model)
+    from transformers import AutoTokenizer
+
+    if model.count("/") > 2:
+        # local model path
+        model_name = model.split("/")[-3].replace("--", "/")
+        if model_name.startswith("models/"):
+            model_name = model_name[7:]
+        return AutoTokenizer.from_pretrained(model_name, trust_remote_code=True)
+    return AutoTokenizer.from_pretrained(model, trust_remote_code=True)
 
 
 class OpenAIProvider(BaseProvider):
-    def __init__(self, model: str):
+    """
+    :param model: Model or deployment name.
+    :param client_kwargs: Connection pool settings, see `shared_client`.
+    """
+
+    def __init__(self, model: str, **client_kwargs):
         self.model = model
-        if os.getenv("OPENAI_API_KEY") is not None:
-            self.client = OpenAI()
-        elif os.getenv("AZURE_OPENAI_AD_TOKEN") is not None:
-            self.client = AzureOpenAI()
-        else:
-            raise ValueError("OPENAI_API_KEY or AZURE_OPENAI_API_KEY must be set")
+        self.client = shared_client(False, **client_kwargs)
         self.stop_seq = []
-        if self.model.startswith("gpt"):
-            self.tokenizer = tiktoken.encoding_for_model(model)
-        elif self.model.count("/") > 2:
-            # local model path
-            from transformers import AutoTokenizer
-
-            model_name = self.model.split("/")[-3].replace("--", "/")
-            if model_name.startswith("models/"):
-                model_name = model_name[7:]
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                model_name, trust_remote_code=True
-            )
-        else:
-            from transformers import AutoTokenizer
-
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                model, trust_remote_code=True
-            )
+
+    @property
+    def base_url(self) -> str:
+        """The endpoint requests are sent to."""
+        return str(self.client.base_url)
+
+    @property
+    def tokenizer(self):
+        return load_tokenizer(self.model)
 
     def generate_reply(
         self,
@@ -42,50 +120,27 @@ class OpenAIProvider(BaseProvider):
         max_new_tokens: int = 1024,
         temperature: float = 0.0,
         n: int = 1,
-    ) -> List[str]:
+    ) -> str | List[str]:
         assert temperature != 0 or n == 1, "n must be 1 when temperature is 0"
         response = self.client.chat.completions.create(
             model=self.model,
             messages=messages,
             max_tokens=max_new_tokens,
             temperature=temperature,
-            n=1,
+            n=n,
         )
-
-        return response.choices[0].message.content
+        return choices(response, n)
 
     def count_tokens(self, message: str) -> int:
         return len(self.tokenizer.encode(message))
 
 
 class AsyncOpenAIProvider(OpenAIProvider):
-    def __init__(self, model: str):
+    def __init__(self, model: str, **client_kwargs):
         self.model = model
-        if os.getenv("OPENAI_API_KEY") is not None:
-            self.client = AsyncOpenAI()
-        elif os.getenv("AZURE_OPENAI_AD_TOKEN") is not None:
-            self.client = AsyncAzureOpenAI()
-        else:
-            raise ValueError("OPENAI_API_KEY or AZURE_OPENAI_API_KEY must be set")
+        # async clients are bound to the event loop of their first request
+        self.client = shared_client(True, **client_kwargs)
         self.stop_seq = []
-        if self.model.startswith("gpt"):
-            self.tokenizer = tiktoken.encoding_for_model(model)
-        elif self.model.count("/") > 2:
-            # local model path
-            from transformers import AutoTokenizer
-
-            model_name = self.model.split("/")[-3].replace("--", "/")
-            if model_name.startswith("models/"):
-                model_name = model_name[7:]
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                model_name, trust_remote_code=True
-            )
-        else:
-            from transformers import AutoTokenizer
-
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                model, trust_remote_code=True
-            )
 
     async def generate_reply(
         self,
@@ -93,13 +148,39 @@ class AsyncOpenAIProvider(OpenAIProvider):
         max_new_tokens: int = 1024,
         temperature: float = 0.0,
         n: int = 1,
-    ) -> List[str]:
+    ) -> str | List[str]:
         assert temperature != 0 or n == 1, "n must be 1 when temperature is 0"
         response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_new_tokens,
+            temperature=temperature,
+            n=n,
+        )
+        return choices(response, n)
+
+    async def stream_reply(
+        self,
+        messages: list[str],
+        max_new_tokens: int = 1024,
+        temperature: float = 0.0,
+    ) -> AsyncIterator[str]:
+        stream = await self.client.chat.completions.create(
             model=self.model,
             messages=messages,
             max_tokens=max_new_tokens,
             temperature=temperature,
             n=1,
+            stream=True,
+            # a last chunk without choices reports the usage of the request
+            stream_options={"include_usage": True},
         )
-        return response.choices[0].message.content
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                if _usage(chunk) is not None:
+                    yield Reply.with_usage("", _usage(chunk))
+        finally:
+            # closing the connection is what stops the generation server-side
+            await stream.close()
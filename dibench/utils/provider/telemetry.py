@@ -0,0 +1,235 @@
+"""
+Per-instance telemetry of LLM requests: tokens, latency, errors, retries and
+cost.
+
+`track_instance` opens a `RequestMetrics` for the current task (and the
+tasks it spawns); every request sent through a `TelemetryProvider` while it
+is open is recorded there.
+"""
+
+import asyncio
+import time
+from contextlib import aclosing, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator, List
+
+from .base import BaseProvider, reply_usage
+from .errors import is_retryable
+
+__all__ = [
+    "RequestMetrics",
+    "TelemetryProvider",
+    "track_instance",
+    "record_prompt_strategy",
+    "model_price",
+]
+
+# model name prefix -> USD per million (prompt, completion) tokens, list
+# prices at the time of writing, override with `price` where they changed
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4": (30.0, 60.0),
+    "gpt-3.5-turbo": (0.5, 1.5),
+    "o1-mini": (3.0, 12.0),
+    "o1": (15.0, 60.0),
+    "deepseek-chat": (0.27, 1.1),
+}
+
+
+def model_price(model: str) -> tuple[float, float] | None:
+    """Price of `model` in `PRICES`, matched by the longest prefix."""
+    matches = [prefix for prefix in PRICES if model.startswith(prefix)]
+    return PRICES[max(matches, key=len)] if matches else None
+
+
+@dataclass
+class RequestMetrics:
+    """Requests sent on behalf of one instance."""
+
+    requests: int = 0
+    # failed attempts, and those of them that may be retried, see
+    # `is_retryable`; the others (bad request, context overflow, ...) are not
+    errors: int = 0
+    retries: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # seconds, per successful request
+    ttft: list[float] = field(default_factory=list)
+    latency: list[float] = field(default_factory=list)
+    # prompt strategy -> queries answered with it, and the strategies given
+    # up for a smaller one, see `record_prompt_strategy`
+    strategies: dict[str, int] = field(default_factory=dict)
+    downgrades: int = 0
+
+    def record(
+        self,
+        prompt_tokens: int,
+        completion_tokens: int,
+        ttft: float | None,
+        latency: float,
+        error: BaseException | None = None,
+    ):
+        self.requests += 1
+        self.prompt_tokens += prompt_tokens
+        if error is not None:
+            self.errors += 1
+            self.retries += is_retryable(error)
+            return
+        self.completion_tokens += completion_tokens
+        self.ttft.append(latency if ttft is None else ttft)
+        self.latency.append(latency)
+
+    def cost(self, price: tuple[float, float] | None) -> float | None:
+        """Estimated cost in USD, `None` without a price."""
+        if price is None:
+            return None
+        return (self.prompt_tokens * price[0] + self.completion_tokens * price[1]) / 1e6
+
+    def dump(self, price: tuple[float, float] | None = None) -> dict:
+        """Totals, and the mean time to first token and latency of requests."""
+
+        def mean(values: list[float]) -> float | None:
+            return sum(values) / len(values) if values else None
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "ttft": mean(self.ttft),
+            "request_latency": mean(self.latency),
+            "cost": self.cost(price),
+            "strategies": self.strategies,
+            "downgrades": self.downgrades,
+        }
+
+
+_current: ContextVar[RequestMetrics | None] = ContextVar(
+    "request_metrics", default=None
+)
+
+
+@contextmanager
+def track_instance() -> Iterator[RequestMetrics]:
+    """Record the requests of the current task, and the tasks it spawns."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def record_prompt_strategy(strategy: str, downgrades: int = 0):
+    """
+    Record that a query of the current instance was answered with the
+    prompt `strategy`, after giving up `downgrades` larger ones.
+    """
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.strategies[strategy] = metrics.strategies.get(strategy, 0) + 1
+        metrics.downgrades += downgrades
+
+
+class TelemetryProvider(BaseProvider):
+    """
+    Wrap an async provider to record each request in the `RequestMetrics`
+    of the instance it was sent for, see `track_instance`. Tokens are taken
+    from the usage the API reported (see `Reply`), or else counted with the
+    provider's `count_tokens`, only while tracking and only if it can.
+    """
+
+    def __init__(self, provider: BaseProvider):
+        self.provider = provider
+        self.model = provider.model
+
+    def _count(self, texts: list[str]) -> int:
+        return sum(self.provider.count_tokens(text) for text in texts if text)
+
+    async def _tokens(
+        self, messages: list[dict], replies: list[str], error: BaseException | None
+    ) -> tuple[int, int]:
+        """
+        Counted tokens of a request, in a thread as loading a tokenizer may
+        take a while, and 0 if it can't be loaded or the request was
+        cancelled: telemetry must not fail a request.
+        """
+        if isinstance(error, asyncio.CancelledError):
+            return 0, 0
+        prompts = [m["content"] for m in messages]
+        try:
+            return await asyncio.to_thread(
+                lambda: (self._count(prompts), self._count(replies))
+            )
+        except Exception:
+            return 0, 0
+
+    async def generate_reply(
+        self,
+        messages: list[str],
+        max_new_tokens: int = 1024,
+        temperature: float = 0.0,
+        n: int = 1,
+    ) -> str | List[str]:
+        metrics = _current.get()
+        if metrics is None:
+            return await self.provider.generate_reply(
+                messages, max_new_tokens, temperature, n
+            )
+        start = time.perf_counter()
+        reply, error = None, None
+        try:
+            reply = await self.provider.generate_reply(
+                messages, max_new_tokens, temperature, n
+            )
+            return reply
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            usage = reply_usage(reply)
+            if usage is None:
+                replies = [reply] if isinstance(reply, str) else reply or []
+                usage = await self._tokens(messages, replies, error)
+            metrics.record(*usage, None, latency, error)
+
+    async def stream_reply(
+        self,
+        messages: list[str],
+        max_new_tokens: int = 1024,
+        temperature: float = 0.0,
+    ) -> AsyncIterator[str]:
+        metrics = _current.get()
+        start = time.perf_counter()
+        ttft, chunks, usage, error = None, [], None, None
+        try:
+            async with aclosing(
+                self.provider.stream_reply(messages, max_new_tokens, temperature)
+            ) as stream:
+                async for chunk in stream:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    chunks.append(chunk)
+                    usage = reply_usage(chunk) or usage
+                    yield chunk
+        except GeneratorExit:
+            # closed early by the consumer, not a failure
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if metrics is not None:
+                latency = time.perf_counter() - start
+                if usage is None:
+                    # closed early or failed before the usage chunk
+                    usage = await self._tokens(messages, ["".join(chunks)], error)
+                metrics.record(*usage, ttft, latency, error)
+
+    def count_tokens(self, message: str) -> int:
+        return self.provider.count_tokens(message)
@@ -6,8 +6,11 @@ import os
 import subprocess
 import uuid
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from github import Github
+if TYPE_CHECKING:
+    # PyGithub is slow to import and only needed to fetch metadata
+    from github import Github
 
 __all__ = [
     "fetch_metadata",
@@ -35,7 +38,7 @@ def clone_repo(repo_name: str, dst: Path, timeout: int = 60) -> None:
         raise Exception(f"Failed to clone {git_url}") from e
 
 
-def fetch_metadata(repo_name: str, g: Github) -> dict:
+def fetch_metadata(repo_name: str, g: "Github") -> dict:
     """
     Get latest commit sha from default branch.
     """
@@ -59,7 +62,12 @@ def fetch_metadata(repo_name: str, g: Github) -> dict:
 
 
 def fake_git_diff(repo_playground: str, content: dict[str, tuple]):
-    """create a fake git repo to obtain git diff format"""
+    """
+    create a fake git repo to obtain git diff format
+
+    Prefer `dibench.utils.diff.git_diff`, which produces the same output
+    without spawning git. This is kept as the reference implementation.
+    """
 
     # Generate a temperary folder and add uuid to avoid collision
     repo_playground = os.path.join(repo_playground, str(uuid.uuid4()))
@@ -105,7 +113,12 @@ def fake_git_diff(repo_playground: str, content: dict[str, tuple]):
 
 
 def fake_git_apply(repo_playground: str, content: dict[str, str], patch: str) -> str:
-    """create a fake git repo to apply diff and get patched content"""
+    """
+    create a fake git repo to apply diff and get patched content
+
+    Prefer `dibench.utils.diff.apply_patch_with_fallback`, which applies the
+    patch in memory. This is kept as the reference implementation.
+    """
 
     # Generate a temperary folder and add uuid to avoid collision
     repo_playground = os.path.join(repo_playground, str(uuid.uuid4()))
@@ -174,6 +187,9 @@ def show_project_structure(
     root: Path, space: int = 0, exclude_dirs: list[str] = [".git", ".github"]
 ) -> str:
     """Show project structure with indentation.
+
+    Unbounded; prompts use `dibench.utils.walk.ProjectTree.render`, which
+    prunes ignored directories and summarizes large ones.
     :param root: Path to the root directory.
     :param file_suffix: List of file suffixes to include.
     :param space: Number of spaces for indentation.
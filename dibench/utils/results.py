@@ -0,0 +1,138 @@
+"""
+Incremental, crash-safe store of per-instance results.
+"""
+
+import asyncio
+import json
+import os
+from pathlib import Path
+
+__all__ = ["ResultSink"]
+
+
+class ResultSink:
+    """
+    Append-only JSON-lines file of per-instance results, written by a single
+    writer task as instances finish, so a crash loses at most the results
+    still in flight.
+
+    Next to `{path}`, the manifest `{path}.index` maps every instance id to
+    the byte offset of its line and records how many bytes of `{path}` it
+    covers. Resuming reads the manifest (plus any lines appended after it
+    was last saved) instead of looking at each instance's workspace.
+
+    :param path: The results file.
+    :param index_every: Save the manifest after this many new results; it is
+                        always saved on `close`.
+    """
+
+    def __init__(self, path: str | Path, index_every: int = 256):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".index")
+        self.index_every = index_every
+        self.offsets: dict[str, int] = {}
+        self.size = 0
+        self._unindexed = 0
+        self._queue: asyncio.Queue | None = None
+        self._writer: asyncio.Task | None = None
+        self._recover()
+
+    def _recover(self):
+        try:
+            index = json.loads(self.index_path.read_text())
+            self.offsets, self.size = index["offsets"], index["size"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            self.offsets, self.size = {}, 0
+        if self.path.exists():
+            with self.path.open("rb") as f:
+                legacy = f.read(1) == b"["
+            if legacy:
+                # a summary written as a single JSON array by older versions
+                self.path.rename(self.path.with_name(self.path.name + ".legacy"))
+        if not self.path.exists():
+            self.offsets, self.size = {}, 0
+            return
+        with self.path.open("rb+") as f:
+            if f.seek(0, os.SEEK_END) < self.size:
+                # the results file was replaced, rebuild the index from scratch
+                self.offsets, self.size = {}, 0
+            f.seek(self.size)
+            offset = self.size
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                self.offsets[result["instance_id"]] = offset
+                offset += len(line)
+                self._unindexed += 1
+            # drop a line torn by a crash mid-write
+            f.truncate(offset)
+            self.size = offset
+
+    def __contains__(self, instance_id: str) -> bool:
+        return instance_id in self.offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def get(self, instance_id: str) -> dict | None:
+        """Read back the stored result of an instance."""
+        if instance_id not in self.offsets:
+            return None
+        with self.path.open("rb") as f:
+            f.seek(self.offsets[instance_id])
+            return json.loads(f.readline())
+
+    def _append(self, results: list[dict]):
+        lines = [
+            (json.dumps(result, ensure_ascii=False) + "\n").encode()
+            for result in results
+        ]
+        with self.path.open("ab") as f:
+            f.write(b"".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        for result, line in zip(results, lines):
+            self.offsets[result["instance_id"]] = self.size
+            self.size += len(line)
+        self._unindexed += len(results)
+        if self._unindexed >= self.index_every:
+            self._save_index()
+
+    def _save_index(self):
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        tmp.write_text(json.dumps({"size": self.size, "offsets": self.offsets}))
+        os.replace(tmp, self.index_path)
+        self._unindexed = 0
+
+    async def _write(self):
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            results = [result for result in batch if result is not None]
+            if results:
+                await asyncio.to_thread(self._append, results)
+            if len(results) < len(batch):
+                return
+
+    def start(self):
+        """Start the writer task, must be called from the event loop."""
+        self._queue = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write())
+
+    async def put(self, result: dict):
+        """Queue a result for writing, it must hold an `instance_id`."""
+        await self._queue.put(result)
+
+    async def close(self):
+        """Write all queued results and save the manifest."""
+        if self._writer is not None:
+            await self._queue.put(None)
+            # shielded so that a cancellation (e.g. Ctrl-C) still flushes
+            await asyncio.shield(self._writer)
+            self._writer = None
+        self._save_index()
@@ -0,0 +1,406 @@
+"""
+Single-pass, pruned walk over a project tree.
+
+The walk uses `os.scandir`, skips hidden entries, directories in an ignore
+list (dependency folders), build output folders next to the build file
+producing them and anything matched by the project's `.gitignore` files, so
+vendored code is never visited.
+`ProjectTree` keeps the result of one walk for both source file collection
+and the size-bounded project structure shown in prompts.
+"""
+
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Iterator
+
+__all__ = [
+    "BUILD_OUTPUT_DIRS",
+    "DEFAULT_IGNORE_DIRS",
+    "GitIgnore",
+    "ProjectTree",
+    "walk",
+    "source_files",
+]
+
+# dependency and tooling directories across the supported languages
+DEFAULT_IGNORE_DIRS = frozenset(
+    [
+        "node_modules",
+        "bower_components",
+        "jspm_packages",
+        "third_party",
+        "__pycache__",
+        "venv",
+        "site-packages",
+    ]
+)
+# build output and vendoring directories -> build files (names, or suffixes
+# starting with ".") next to which they are skipped. The names are common
+# for source directories too, e.g. Rust binaries in `src/bin/`.
+BUILD_OUTPUT_DIRS = {
+    "target": ("Cargo.toml", "pom.xml"),
+    "bin": (".csproj", ".fsproj", ".vbproj", ".sln"),
+    "obj": (".csproj", ".fsproj", ".vbproj", ".sln"),
+    "dist": ("package.json", "setup.py", "pyproject.toml"),
+    "vendor": ("Cargo.toml", "go.mod", "composer.json"),
+}
+
+# bytes inspected to detect binary and minified files
+SNIFF_SIZE = 8192
+MINIFIED_SUFFIXES = (".min.js", ".min.css", ".min.mjs", ".bundle.js")
+# rough token estimate used to bound the rendered project structure
+CHARS_PER_TOKEN = 4
+
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob into a regular expression body."""
+    i, n, out = 0, len(pattern), []
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == n:
+            out.append("/.*")
+            i += 3
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1 : end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append("[" + body.replace("\\", "\\\\") + "]")
+            i = end + 1
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+class GitIgnore:
+    """
+    The rules of one `.gitignore` file, matching paths relative to the
+    directory holding it. `match` returns True (ignored), False (re-included
+    by a negated rule) or None (no rule applies).
+    """
+
+    def __init__(self, lines: list[str]):
+        self.rules: list[tuple[re.Pattern, bool, bool]] = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            body = _translate(line.lstrip("/"))
+            if not anchored:
+                body = "(?:.*/)?" + body
+            self.rules.append((re.compile(body), negate, dir_only))
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "GitIgnore":
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return cls(f.readlines())
+
+    def match(self, path: str, is_dir: bool) -> bool | None:
+        result = None
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.fullmatch(path):
+                result = not negate
+        return result
+
+
+def _build_outputs(
+    entries: list[os.DirEntry], build_output_dirs: dict[str, tuple[str, ...]]
+) -> set[str]:
+    """The names of `build_output_dirs` whose build file is in `entries`."""
+    names = [entry.name for entry in entries]
+    return {
+        output
+        for output, build_files in build_output_dirs.items()
+        if any(
+            name.endswith(build_file) if build_file[0] == "." else name == build_file
+            for name in names
+            for build_file in build_files
+        )
+    }
+
+
+def walk(
+    root: str | Path,
+    ignore_dirs: frozenset[str] | set[str] = DEFAULT_IGNORE_DIRS,
+    use_gitignore: bool = True,
+    build_output_dirs: dict[str, tuple[str, ...]] = BUILD_OUTPUT_DIRS,
+) -> Iterator[tuple[str, list[os.DirEntry], list[os.DirEntry]]]:
+    """
+    Walk `root` top-down like `os.walk`, yielding `(rel_dir, dirs, files)`
+    with entries sorted by name. `rel_dir` is a posix path relative to
+    `root` ("" for the root itself). Removing entries from `dirs` prunes
+    them from the walk.
+
+    :param ignore_dirs: Directory names skipped at any depth.
+    :param build_output_dirs: Directory names skipped only next to one of
+                              their build files, see `BUILD_OUTPUT_DIRS`.
+    """
+    root = os.fspath(root)
+    # (relative dir, gitignore rules in scope as (base dir, rules))
+    stack = [("", [])]
+    while stack:
+        rel_dir, rules = stack.pop()
+        path = os.path.join(root, rel_dir) if rel_dir else root
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        if use_gitignore and any(e.name == ".gitignore" for e in entries):
+            try:
+                rules = rules + [(rel_dir, GitIgnore.from_file(f"{path}/.gitignore"))]
+            except OSError:
+                pass
+        outputs = _build_outputs(entries, build_output_dirs)
+        dirs, files = [], []
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                # symlinked directories are not followed, they may form loops
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir and (entry.name in ignore_dirs or entry.name in outputs):
+                continue
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if _ignored(rules, rel, is_dir):
+                continue
+            (dirs if is_dir else files).append(entry)
+        yield rel_dir, dirs, files
+        for entry in reversed(dirs):
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            stack.append((rel, rules))
+
+
+def _ignored(rules: list[tuple[str, GitIgnore]], rel: str, is_dir: bool) -> bool:
+    # deeper .gitignore files take precedence over their parents
+    for base, gitignore in reversed(rules):
+        result = gitignore.match(rel[len(base) + 1 :] if base else rel, is_dir)
+        if result is not None:
+            return result
+    return False
+
+
+def _sniff(entry: os.DirEntry, skip_binary: bool, skip_minified: bool) -> bool:
+    """Whether a file looks like hand-written text."""
+    if skip_minified and entry.name.endswith(MINIFIED_SUFFIXES):
+        return False
+    try:
+        with open(entry.path, "rb") as f:
+            head = f.read(SNIFF_SIZE)
+    except OSError:
+        return False
+    if skip_binary and b"\0" in head:
+        return False
+    if skip_minified and len(head) >= SNIFF_SIZE // 2:
+        # bundled or minified code packs whole programs into a few lines
+        if len(head) / (head.count(b"\n") + 1) > 300:
+            return False
+    return True
+
+
+class ProjectTree:
+    """
+    The result of one pruned `walk`, shared by the source file collector and
+    the project structure renderer so that a project is walked only once.
+
+    :param root: Project root.
+    :param ignore_dirs: Directory names that are never descended into.
+    :param use_gitignore: Skip paths matched by `.gitignore` files.
+    :param build_output_dirs: See `walk`.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        ignore_dirs: frozenset[str] | set[str] = DEFAULT_IGNORE_DIRS,
+        use_gitignore: bool = True,
+        build_output_dirs: dict[str, tuple[str, ...]] = BUILD_OUTPUT_DIRS,
+    ):
+        self.root = Path(root)
+        # relative dir -> names of its subdirectories / its file entries,
+        # in top-down walk order
+        self.dirs: dict[str, list[str]] = {}
+        self.files: dict[str, list[os.DirEntry]] = {}
+        for rel_dir, dirs, files in walk(
+            root, ignore_dirs, use_gitignore, build_output_dirs
+        ):
+            self.dirs[rel_dir] = [entry.name for entry in dirs]
+            self.files[rel_dir] = files
+        self._summaries = None
+
+    @property
+    def depth(self) -> int:
+        return max((rel.count("/") + 1 for rel in self.dirs if rel), default=0)
+
+    def source_files(
+        self,
+        suffixes: list[str] | None = None,
+        max_file_size: int | None = 1024 * 1024,
+        skip_binary: bool = True,
+        skip_minified: bool = True,
+    ) -> list[str]:
+        """
+        Collect the source files of the project.
+
+        :param suffixes: File suffixes to keep, all files if `None`.
+        :param max_file_size: Skip files larger than this many bytes.
+        :param skip_binary: Skip files containing NUL bytes.
+        :param skip_minified: Skip minified or bundled files.
+        :return: Posix paths relative to the root, in walk order.
+        """
+        suffixes = tuple(suffixes) if suffixes is not None else None
+        collected = []
+        for rel_dir, files in self.files.items():
+            for entry in files:
+                if suffixes is not None and not entry.name.endswith(suffixes):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    size = entry.stat().st_size
+                except OSError:
+                    continue
+                if max_file_size is not None and size > max_file_size:
+                    continue
+                if not _sniff(entry, skip_binary, skip_minified):
+                    continue
+                collected.append(f"{rel_dir}/{entry.name}" if rel_dir else entry.name)
+        return collected
+
+    def summary(self, rel_dir: str) -> str:
+        """One line standing in for a directory, e.g. `assets/ (523 files: .png, .svg)`."""
+        if self._summaries is None:
+            # children come after their parent in walk order, so a reversed
+            # pass sees every subdirectory before the directory itself
+            self._summaries = {}
+            for rel in reversed(self.dirs):
+                count = len(self.files[rel])
+                suffixes = Counter(
+                    os.path.splitext(entry.name)[1]
+                    for entry in self.files[rel]
+                    if os.path.splitext(entry.name)[1]
+                )
+                for name in self.dirs[rel]:
+                    child_count, child_suffixes = self._summaries[
+                        f"{rel}/{name}" if rel else name
+                    ]
+                    count += child_count
+                    suffixes.update(child_suffixes)
+                self._summaries[rel] = (count, suffixes)
+        count, suffixes = self._summaries[rel_dir]
+        name = rel_dir.rsplit("/", 1)[-1] or self.root.name
+        if count == 0:
+            return f"{name}/ (empty)"
+        detail = f"{count} file{'s' if count > 1 else ''}"
+        if suffixes:
+            common = [suffix for suffix, _ in suffixes.most_common(3)]
+            if len(suffixes) > 3:
+                common.append("...")
+            detail += ": " + ", ".join(common)
+        return f"{name}/ ({detail})"
+
+    def _render(self, max_depth: int, max_entries: int) -> str:
+        lines = [f"{self.root.name}/"]
+
+        def visit(rel_dir: str, depth: int):
+            entries = sorted(
+                [(name, True) for name in self.dirs[rel_dir]]
+                + [(entry.name, False) for entry in self.files[rel_dir]]
+            )
+            indent = "  " * (depth + 1)
+            if len(entries) > max_entries:
+                hidden = len(entries) - max_entries
+                entries = entries[:max_entries]
+            else:
+                hidden = 0
+            for name, is_dir in entries:
+                if not is_dir:
+                    lines.append(indent + name)
+                    continue
+                rel = f"{rel_dir}/{name}" if rel_dir else name
+                if depth + 1 >= max_depth or (
+                    len(self.dirs[rel]) + len(self.files[rel]) > max_entries
+                ):
+                    lines.append(indent + self.summary(rel))
+                else:
+                    lines.append(f"{indent}{name}/")
+                    visit(rel, depth + 1)
+            if hidden:
+                lines.append(f"{indent}... ({hidden} more entries)")
+
+        visit("", 0)
+        return "\n".join(lines) + "\n"
+
+    def render(
+        self,
+        max_depth: int | None = None,
+        max_entries: int = 64,
+        max_tokens: int = 4096,
+    ) -> str:
+        """
+        Render the project structure as an indented tree, bounded in size.
+
+        Only `max_depth` levels are listed, like `tree -L`; directories below
+        that or with more than `max_entries` entries are collapsed into a
+        summary line. If the tree still exceeds
+        `max_tokens` (estimated at `CHARS_PER_TOKEN` characters per token),
+        the depth is reduced until it fits, and the result is truncated as a
+        last resort.
+        """
+        # the deepest directories are at level `self.depth + 1`
+        depth = self.depth + 1
+        if max_depth is not None:
+            depth = max(1, min(max_depth, depth))
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        while True:
+            structure = self._render(depth, max_entries)
+            if len(structure) <= max_chars or depth == 1:
+                break
+            depth -= 1
+        if len(structure) > max_chars:
+            structure = structure[: structure.rfind("\n", 0, max_chars) + 1]
+            structure += "...\n"
+        return structure
+
+
+def source_files(
+    root: str | Path,
+    suffixes: list[str] | None = None,
+    ignore_dirs: frozenset[str] | set[str] = DEFAULT_IGNORE_DIRS,
+    use_gitignore: bool = True,
+    **kwargs,
+) -> list[str]:
+    """
+    Collect the source files under `root` in a single pruned walk, see
+    `ProjectTree.source_files` for the filters (`kwargs`).
+    """
+    return ProjectTree(root, ignore_dirs, use_gitignore).source_files(
+        suffixes, **kwargs
+    )
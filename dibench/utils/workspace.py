@@ -0,0 +1,127 @@
+"""
+Cheap copies of project trees for evaluation testbeds.
+
+A testbed only differs from its project in the few build files a patch
+touches, so instead of copying every file, `clone_tree` shares file data
+with the source where the filesystem allows it:
+
+- `reflink`: copy-on-write clones (btrfs, XFS, ...), as cheap as hardlinks
+  and safe to modify in place;
+- `hardlink`: a hardlink farm, where a file must be detached (see
+  `detach`) before it is modified, otherwise the change leaks into the
+  source tree;
+- `copy`: a regular copy.
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable, Literal
+
+__all__ = ["CloneMode", "clone_tree", "detach"]
+
+CloneMode = Literal["auto", "reflink", "hardlink", "copy"]
+
+# `FICLONE` from <linux/fs.h>
+FICLONE = 0x40049409
+
+
+def _reflink(src: str, dst: str):
+    import fcntl
+
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    shutil.copystat(src, dst)
+
+
+_copy_functions = {"reflink": _reflink, "hardlink": os.link, "copy": shutil.copy2}
+# (source device, destination device, mode) -> whether it works
+_supported: dict[tuple[int, int, str], bool] = {}
+
+
+def _any_file(root: Path) -> Path | None:
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = Path(dirpath) / filename
+            if path.is_file() and not path.is_symlink():
+                return path
+    return None
+
+
+def _supports(src: Path, dst_parent: Path, mode: str) -> bool:
+    """Whether files of `src` can be cloned into `dst_parent` with `mode`."""
+    sample = _any_file(src)
+    if sample is None:
+        return True
+    key = (sample.stat().st_dev, dst_parent.stat().st_dev, mode)
+    if key not in _supported:
+        with tempfile.TemporaryDirectory(dir=dst_parent) as tmp:
+            try:
+                _copy_functions[mode](str(sample), os.path.join(tmp, "probe"))
+                _supported[key] = True
+            except (OSError, ImportError):
+                _supported[key] = False
+    return _supported[key]
+
+
+def clone_tree(
+    src: str | Path,
+    dst: str | Path,
+    mode: CloneMode = "auto",
+    hardlinks: bool = True,
+) -> str:
+    """
+    Clone the tree `src` to the new directory `dst`, symlinks are kept as
+    symlinks.
+
+    :param mode: How file data is shared, `auto` picks the cheapest mode
+                 the filesystems support.
+    :param hardlinks: Whether hardlinks may be used, `hardlink` otherwise
+                      picks a mode like `auto`. Disable it when the clone is
+                      handed to tools that modify files in place (e.g. test
+                      runs), which cannot be detached first.
+    :return: The mode used.
+    """
+    src, dst = Path(src), Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if mode == "auto" or (mode == "hardlink" and not hardlinks):
+        candidates = ["reflink", "hardlink"] if hardlinks else ["reflink"]
+        mode = next((m for m in candidates if _supports(src, dst.parent, m)), "copy")
+    shutil.copytree(src, dst, symlinks=True, copy_function=_copy_functions[mode])
+    return mode
+
+
+def _detach_file(path: Path):
+    stat = path.lstat()
+    if not path.is_file() or path.is_symlink() or stat.st_nlink < 2:
+        return
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    os.close(fd)
+    try:
+        shutil.copy2(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def detach(root: str | Path, paths: Iterable[str] | None = None):
+    """
+    Give the hardlinked files of a clone their own copy, so that writing to
+    them leaves the source tree untouched. Files with a single link
+    (copied, reflinked or new) are left as they are.
+
+    :param paths: Files to detach, relative to `root`; all files when None.
+    """
+    root = Path(root)
+    if paths is None:
+        paths = (
+            os.path.relpath(os.path.join(dirpath, filename), root)
+            for dirpath, _, filenames in os.walk(root)
+            for filename in filenames
+        )
+    for path in paths:
+        path = root / path
+        if path.exists():
+            _detach_file(path)
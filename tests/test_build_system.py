@@ -1,11 +1,18 @@
+import json
 from pathlib import Path
 
+import pytest
+import toml
+
+from dibench.utils.buildfile.csharp import CSharpBuildFile
+from dibench.utils.buildfile.javascript import JavaScriptBuildFile
 from dibench.utils.buildfile.python import (
     Pip,
     Poetry,
     SetupTools,
     PEP621Compliant,
 )
+from dibench.utils.buildfile.rust import RustBuildFile
 
 root = Path(__file__).parent / "data"
 
@@ -32,4 +39,89 @@ def test_setup_cfg_parse():
 def test_setup_py_parse():
     build_system = SetupTools(root, ["setup.py"])
     parsed = build_system.parse_dependencies()["setup.py"]
-    assert len(parsed) == 18, len(parsed)
\ No newline at end of file
+    assert len(parsed) == 18, len(parsed)
+def test_js_loads_dumps_dependencies(tmp_path):
+    (tmp_path / "package.json").write_text('{"name": "demo", "version": "1.0.0"}')
+    build_system = JavaScriptBuildFile(tmp_path, ["package.json"])
+    loaded = build_system.loads_dependencies(
+        {"package.json": {"react": "^18.2.0", "bad": 1}}
+    )
+    content = build_system.dumps_dependencies(loaded)["package.json"]
+    assert json.loads(content)["dependencies"] == {"react": "^18.2.0"}
+
+def test_pep621_loads_dumps_dependencies():
+    build_system = PEP621Compliant(root, ["pyproject.toml"])
+    declared = build_system.parse_dependencies()["pyproject.toml"]
+    loaded = build_system.loads_dependencies(
+        {"pyproject.toml": [str(declared[0]), "not a requirement!", "rich>=13"]}
+    )
+    assert len(loaded["pyproject.toml"]) == 2
+    content = build_system.dumps_dependencies(loaded)["pyproject.toml"]
+    # the complete list replaces the declared dependencies
+    dumped = toml.loads(content)["project"]["dependencies"]
+    assert dumped == [str(declared[0]), "rich>=13"]
+
+def test_poetry_dumps_replace_dependencies():
+    build_system = Poetry(root, ["pyproject.toml"])
+    loaded = build_system.loads_dependencies({"pyproject.toml": ["rich>=13", "numpy"]})
+    content = build_system.dumps_dependencies(loaded)["pyproject.toml"]
+    dumped = toml.loads(content)["tool"]["poetry"]["dependencies"]
+    assert dumped == {"python": "^3.10", "rich": ">=13", "numpy": "*"}
+
+@pytest.mark.parametrize(
+    "build_system, file, mixed, expected",
+    [
+        (Pip, "requirements.txt", ["numpy", 1, None, "not valid!"], ["numpy"]),
+        (JavaScriptBuildFile, "package.json", {"react": "^18", "x": 1}, ["react"]),
+        (RustBuildFile, "Cargo.toml", {"serde": "1.0", "x": 1}, ["serde"]),
+        (
+            CSharpBuildFile,
+            "app.csproj",
+            {
+                "PackageReference": {"Newtonsoft.Json": "13.0.1", "x": 1},
+                "ProjectReference": ["../lib/lib.csproj", {}],
+            },
+            ["Newtonsoft.Json", "../lib/lib.csproj"],
+        ),
+    ],
+)
+def test_loads_malformed_dependencies(tmp_path, build_system, file, mixed, expected):
+    build_system = build_system(tmp_path, [file])
+    # model output of the wrong shape is skipped, not an error
+    for malformed in [["react"], "numpy", 1, None, {"x": "1"}]:
+        loaded = build_system.loads_dependencies({file: malformed})
+        assert list(loaded) == [file]
+    loaded = build_system.loads_dependencies({file: mixed})
+    assert [dep.name for dep in loaded[file]] == expected
+    if build_system.language == "xml":
+        malformed = {"PackageReference": ["x"], "ProjectReference": "x"}
+        assert build_system.loads_dependencies({file: malformed}) == {file: []}
+
+@pytest.mark.parametrize(
+    "file", sorted(path.name for path in root.glob("requirements*"))
+)
+def test_parse_in_memory_like_pip(file):
+    # in-memory contents are parsed without pip, which must agree with it
+    on_disk = Pip(root, [file]).parse_dependencies()
+    in_memory = Pip(
+        root, [file], {file: (root / file).read_text()}
+    ).parse_dependencies()
+    assert on_disk[file]
+    assert list(map(str, in_memory[file])) == list(map(str, on_disk[file]))
+
+def test_parse_in_memory_contents(tmp_path):
+    # includes are resolved from the contents, then from the root
+    (tmp_path / "base.txt").write_text("rich>=13\n")
+    contents = {
+        "requirements.txt": "-r dev.txt\nnumpy  # pinned below\n",
+        "dev.txt": "-r base.txt\npytest \\\n  >=8\n",
+    }
+    parsed = Pip(tmp_path, ["requirements.txt"], contents).parse_dependencies()
+    assert sorted(map(str, parsed["requirements.txt"])) == [
+        "numpy",
+        "pytest>=8",
+        "rich>=13",
+    ]
+    # deleted by the patch, like a missing file
+    with pytest.raises(FileNotFoundError):
+        Pip(root, ["requirements.txt"], {"requirements.txt": None}).parse_dependencies()
@@ -0,0 +1,216 @@
+import asyncio
+import json
+
+import pytest
+from tenacity import wait_none
+
+from dibench import RepoInstance
+from dibench.utils.provider import SyntheticError, SyntheticProvider, track_instance
+from dibench.depinfer import (
+    file_iter_infer,
+    pack_src_files,
+    query_downgrading,
+    query_llm,
+    query_llm_stream,
+    run_pipeline,
+    sanitize,
+    sanitize_dependencies,
+)
+
+
+def test_run_pipeline_bounded():
+    in_flight = 0
+    peak = 0
+    done = []
+
+    async def worker(instance):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001 * (instance % 3))
+        in_flight -= 1
+        done.append(instance)
+
+    pulled = []
+
+    def instances():
+        for instance in range(50):
+            # never more than the pending instances and a full queue ahead
+            assert len(pulled) - len(done) <= 2 * 4 + 1
+            pulled.append(instance)
+            yield instance
+
+    assert asyncio.run(run_pipeline(instances(), worker, max_pending=4)) is None
+    assert sorted(done) == list(range(50))
+    assert peak <= 4
+
+
+def test_pack_src_files(tmp_path):
+    class WordCounter:
+        def count_tokens(self, message):
+            return len(message.split())
+
+    files = ["b/x.py", "a/y.py", "b/z.py", "a/big.py", "c.py"]
+    for file in files:
+        (tmp_path / file).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file).write_text("w " * (50 if "big" in file else 5))
+    batches = pack_src_files(files, tmp_path, WordCounter(), token_budget=20)
+    assert [f for batch in batches for f in batch] == [
+        "c.py",
+        "a/big.py",
+        "a/y.py",
+        "b/x.py",
+        "b/z.py",
+    ]
+    assert batches == [["c.py"], ["a/big.py"], ["a/y.py", "b/x.py"], ["b/z.py"]]
+
+
+class StreamingProvider:
+    model = "stream"
+
+    def __init__(self, reply: str):
+        self.reply = reply
+        self.yielded = 0
+        self.closed = False
+
+    async def stream_reply(self, messages, max_new_tokens=1024, temperature=0.0):
+        try:
+            for line in self.reply.splitlines(keepends=True):
+                self.yielded += 1
+                yield line
+        finally:
+            self.closed = True
+
+    def count_tokens(self, message):
+        return len(message)
+
+
+def test_query_llm_stream_stops_early():
+    reply = "requirements.txt\n```\nnumpy\n```\nsetup.py\n```\nsetup()\n```\n"
+    reply += "Let me know if you need anything else.\n" * 20
+    instance = RepoInstance(
+        "x", {}, "Python", "", "", "", ["requirements.txt", "setup.py"], {}
+    )
+    llm = StreamingProvider(reply)
+    response = asyncio.run(
+        query_llm_stream(llm, [], instance.build_files, max_new_tokens=4096)
+    )
+    assert llm.yielded == 8 and llm.closed
+    assert sanitize(response, instance) == sanitize(reply, instance)
+    assert sanitize(response, instance) == {
+        "requirements.txt": "numpy\n",
+        "setup.py": "setup()\n",
+    }
+
+
+def test_sanitize_dependencies():
+    instance = RepoInstance("x", {}, "Rust", "", "", "", ["Cargo.toml"], {})
+    reply = (
+        'Example:\n```json\n{"other/Cargo.toml": {}}\n```\n'
+        "Answer:\n```json\n"
+        '{"Cargo.toml": {"serde": "1.0"}, "src/main.rs": {}}\n```\n'
+    )
+    assert sanitize_dependencies(reply, instance) == {"Cargo.toml": {"serde": "1.0"}}
+    assert sanitize_dependencies('{"Cargo.toml": {}}', instance) == {"Cargo.toml": {}}
+    assert sanitize_dependencies("no dependencies", instance) == {}
+
+
+class FailingProvider:
+    model = "failing"
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def generate_reply(self, messages, max_new_tokens=1024, temperature=0.0, n=1):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def test_query_llm_retries_transient_errors_only():
+    query = query_llm.retry_with(wait=wait_none())
+    llm = FailingProvider(SyntheticError("", 500), SyntheticError("", 429))
+    assert asyncio.run(query(llm, [])) == "ok"
+    assert llm.calls == 3
+    # a bad request fails at once
+    llm = FailingProvider(SyntheticError("invalid", 400), SyntheticError("", 500))
+    with pytest.raises(SyntheticError, match="invalid"):
+        asyncio.run(query(llm, []))
+    assert llm.calls == 1
+
+
+def test_query_downgrading():
+    overflow = SyntheticError("", 400, "context_length_exceeded")
+    llm = FailingProvider(overflow, overflow)
+    prompts = []
+
+    def build_prompt(import_only, import_summary=False):
+        prompts.append((import_only, import_summary))
+        return [{"role": "user", "content": str(len(prompts))}]
+
+    with track_instance() as metrics:
+        messages, response = asyncio.run(
+            query_downgrading(
+                ["source", "imports", "summary"],
+                build_prompt,
+                lambda messages: query_llm(llm, messages),
+            )
+        )
+    assert prompts == [(False, False), (True, False), (True, True)]
+    assert messages[-1]["content"] == "3" and response == "ok"
+    # the strategy actually used is recorded
+    assert metrics.strategies == {"summary": 1} and metrics.downgrades == 2
+    # the smallest prompt overflowing is surfaced
+    llm = FailingProvider(overflow, overflow)
+    with pytest.raises(SyntheticError):
+        asyncio.run(
+            query_downgrading(
+                ["imports", "summary"], build_prompt, lambda m: query_llm(llm, m)
+            )
+        )
+    assert llm.calls == 2
+
+
+class SlowFileProvider(SyntheticProvider):
+    """Reply at once, except for prompts including the source of `slow.py`."""
+
+    async def stream_reply(self, messages, max_new_tokens=1024, temperature=0.0):
+        if "import pandas" in messages[-1]["content"]:
+            await asyncio.sleep(3600)
+        async for chunk in super().stream_reply(messages, max_new_tokens, temperature):
+            yield chunk
+
+
+def test_file_iter_saves_partial_proposals(tmp_path):
+    class Progress:
+        def update(self, task_id, advance):
+            pass
+
+    project_root = tmp_path / "project"
+    project_root.mkdir()
+    (project_root / "requirements.txt").write_text("")
+    (project_root / "fast.py").write_text("import numpy\n")
+    (project_root / "slow.py").write_text("import pandas\n")
+    instance = RepoInstance("x", {}, "Python", "", "", "", ["requirements.txt"], {})
+    workspace = tmp_path / "workspace"
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(
+            asyncio.wait_for(
+                file_iter_infer(
+                    llm=SlowFileProvider(),
+                    instance=instance,
+                    project_root=project_root,
+                    workspace=workspace,
+                    progress=Progress(),
+                    task_id=0,
+                ),
+                0.5,
+            )
+        )
+    assert not (workspace / "patch.diff").exists()
+    messages = json.loads((workspace / "partial.json").read_text())
+    assert "import numpy" in messages[-2]["content"]
+    assert messages[-1]["role"] == "assistant"
+    assert "import pandas" not in (workspace / "partial.md").read_text()
@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+from dibench.utils.diff import (
+    PatchApplyError,
+    apply_patch,
+    apply_patch_with_fallback,
+    git_diff,
+)
+from dibench.utils.repo import fake_git_diff
+
+root = Path(__file__).parent / "data"
+
+
+def build_file_edits() -> dict[str, tuple[str, str]]:
+    edits = {}
+    for name in ["pyproject.toml", "requirements.txt", "setup.cfg", "setup.py"]:
+        old = (root / name).read_text()
+        lines = old.splitlines(keepends=True)
+        new = "".join(
+            lines[: len(lines) // 2] + ["numpy>=1.24\n"] + lines[len(lines) // 2 + 2 :]
+        )
+        edits[f"sub/{name}"] = (old, new)
+    edits["Pipfile"] = ((root / "Pipfile").read_text(), "")
+    edits["unchanged.txt"] = ("same\n", "same\n")
+    edits["no-eol.txt"] = ("a\nb", "a\nc")
+    return edits
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+def test_git_diff_matches_git():
+    edits = build_file_edits()
+    with tempfile.TemporaryDirectory() as playground:
+        assert git_diff(edits) == fake_git_diff(playground, edits)
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+def test_git_diff_speedup():
+    edits = build_file_edits()
+    with tempfile.TemporaryDirectory() as playground:
+        start = time.perf_counter()
+        for _ in range(3):
+            fake_git_diff(playground, edits)
+        git_time = (time.perf_counter() - start) / 3
+    start = time.perf_counter()
+    for _ in range(30):
+        git_diff(edits)
+    python_time = (time.perf_counter() - start) / 30
+    assert git_time / python_time >= 50, (git_time, python_time)
+
+
+def test_apply_patch_round_trip():
+    edits = build_file_edits()
+    old = {path: old for path, (old, new) in edits.items() if old}
+    new = {path: new for path, (old, new) in edits.items() if old}
+    assert apply_patch(old, git_diff(edits)) == new
+
+
+def test_apply_patch_offset_and_fuzz():
+    old = "".join(f"line{i}\n" for i in range(20))
+    new = old.replace("line10\n", "line10\nadded\n")
+    patch = git_diff({"a.txt": (old, new)})
+    # unrelated lines added above the hunk only shift it
+    drifted = "x\ny\n" + old
+    assert apply_patch({"a.txt": drifted}, patch) == {"a.txt": "x\ny\n" + new}
+    # a changed context line needs fuzz, as with `patch --fuzz`
+    conflict = old.replace("line8\n", "LINE8\n")
+    with pytest.raises(PatchApplyError):
+        apply_patch({"a.txt": conflict}, patch)
+    assert apply_patch_with_fallback({"a.txt": conflict}, patch) == {
+        "a.txt": conflict.replace("line10\n", "line10\nadded\n")
+    }
@@ -1,8 +1,17 @@
+import json
 import logging
 import tempfile
 from pathlib import Path
 import pytest
+import requests
 
+from dibench import RepoInstance
+from dibench.eval import main
+from dibench.evaluate.evaluator import BuildEvaluator, _is_fake_lib
+from dibench.evaluate.oracle import OracleCache
+from dibench.evaluate.utils import EvalArgs
+from dibench.utils.buildfile import JavaScriptBuildFile, RegistryError
+from dibench.utils.buildfile.javascript import JavaScriptDependency
 from dibench.utils.ci import run_test_ci
 
 @pytest.mark.skip(reason="runner image not publicly available")
@@ -22,3 +31,126 @@ def test_run_test_ci():
         )
         assert result
         assert "TEST CI SUCCEEDED" in out
+
+
+def test_eval_main_parallel(tmp_path):
+    oracle = "--- a/requirements.txt\n+++ b/requirements.txt\n@@ -0,0 +1 @@\n+numpy\n"
+    with open(tmp_path / "dataset.jsonl", "w") as f:
+        for i in range(4):
+            instance_id = f"repo_{i}"
+            project_root = tmp_path / "repos" / "python" / instance_id
+            project_root.mkdir(parents=True)
+            (project_root / "requirements.txt").write_text("")
+            if i < 3:
+                # the last instance has no prediction
+                prediction = tmp_path / "results" / "python" / instance_id
+                prediction.mkdir(parents=True)
+                (prediction / "patch.diff").write_text("")
+            instance = dict(
+                instance_id=instance_id,
+                metadata={},
+                language="Python",
+                act_command="",
+                ci_file="",
+                patch=oracle,
+                build_files=["requirements.txt"],
+                env_specs={},
+            )
+            f.write(json.dumps(instance) + "\n")
+    for run in range(2):
+        # the second run loads the oracles from the cache
+        main(
+            str(tmp_path / "results"),
+            exec_eval=False,
+            dataset_name_or_path=str(tmp_path / "dataset.jsonl"),
+            repo_instances_dir=str(tmp_path / "repos"),
+            resume=False,
+            workers=2,
+            oracle_cache_dir=str(tmp_path / "oracle-cache"),
+        )
+        results = sorted((tmp_path / "results").rglob("eval-result.json"))
+        assert [r.parent.name for r in results] == ["repo_0", "repo_1", "repo_2"]
+        result = json.loads(results[0].read_text())
+        assert result["text"]["exact"] == {"TP": 0, "FP": 0, "FN": 1}
+        assert result["detail"]["oracle"] == {"requirements.txt": ["numpy"]}
+    assert len(list((tmp_path / "oracle-cache").rglob("*.pkl"))) == 3
+    # text only, both patches are applied in memory
+    workspace = results[0].parent / "eval-workspace"
+    assert not (workspace / "oracle").exists() and not (workspace / "model").exists()
+    for project_root in (tmp_path / "repos" / "python").iterdir():
+        assert (project_root / "requirements.txt").read_text() == ""
+
+
+def test_oracle_cache(tmp_path):
+    cache = OracleCache(tmp_path)
+    instance = RepoInstance("x", {}, "Python", "", "", "patch", ["a.txt"], {})
+    assert cache.get(instance) is None
+    cache.put(instance, {"a.txt": "numpy\n"}, {"a.txt": []})
+    assert cache.get(instance) == {
+        "build_files": {"a.txt": "numpy\n"},
+        "dependencies": {"a.txt": []},
+    }
+    # a new oracle patch invalidates the entry
+    instance.patch = "other patch"
+    assert cache.get(instance) is None
+
+
+def test_exec_testbed_isolated_from_project(tmp_path):
+    project_root = tmp_path / "repo"
+    (project_root / "src").mkdir(parents=True)
+    (project_root / "requirements.txt").write_text("")
+    (project_root / "src" / "main.py").write_text("import numpy\n")
+    patch = "--- a/requirements.txt\n+++ b/requirements.txt\n@@ -0,0 +1 @@\n+numpy\n"
+    instance = RepoInstance(
+        "repo", {}, "Python", "", "", patch, ["requirements.txt"], {}
+    )
+    evaluator = BuildEvaluator(
+        EvalArgs(
+            instance=instance,
+            project_root=project_root,
+            prediction=patch,
+            workspace=tmp_path / "workspace",
+            text_eval=True,
+            exec_eval=True,
+            cache_level="all",
+            timeout=0,
+            resume=False,
+            clone_mode="hardlink",
+        )
+    )
+    evaluator._setup_model(patch)
+    deps = evaluator.model_dependencies["requirements.txt"]
+    assert [dep.name for dep in deps] == ["numpy"]
+    # test runs write to files the patch left alone
+    with open(evaluator.model_root / "src" / "main.py", "w") as f:
+        f.write("import pandas\n")
+    assert (project_root / "src" / "main.py").read_text() == "import numpy\n"
+    assert (project_root / "requirements.txt").read_text() == ""
+
+
+def test_fake_lib_failures_not_cached(monkeypatch):
+    statuses = [503, 404, 200]
+
+    class Response:
+        def __init__(self, status_code):
+            self.status_code = status_code
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+    monkeypatch.setattr(
+        requests, "get", lambda url, **kwargs: Response(statuses.pop(0))
+    )
+    _is_fake_lib.cache_clear()
+    dependency = JavaScriptDependency(("left-pad-2", "^1.0.0"))
+    # a transient failure is neither an answer nor cached
+    with pytest.raises(RegistryError):
+        _is_fake_lib(JavaScriptBuildFile, dependency)
+    assert _is_fake_lib(JavaScriptBuildFile, dependency)
+    # the definite answer is
+    assert _is_fake_lib(JavaScriptBuildFile, dependency)
+    assert statuses == [200]
+    _is_fake_lib.cache_clear()
@@ -0,0 +1,56 @@
+import asyncio
+import tempfile
+from pathlib import Path
+
+from dibench.utils.imports import ImportExtractor, ImportIndex, extract_imports
+
+
+def test_extract_imports():
+    content = "import os\nfrom a.b import c\n\ndef f():\n    import json\n"
+    assert extract_imports("python", content) == [
+        "import os",
+        "from a.b import c",
+        "import json",
+    ]
+    assert extract_imports("rust", "use std::io;\nfn main() {}\n") == ["use std::io;"]
+
+
+def test_import_index():
+    index = ImportIndex()
+    assert index.add(["import os.path", "import os.path", "import  numpy"]) == [
+        "import os.path",
+        "import  numpy",
+    ]
+    # `import os` is a substring of `import os.path` but a different statement
+    assert index.add(["import os", "import numpy"]) == ["import os"]
+    assert "import numpy" in index and len(index) == 3
+    assert index.summary() == (
+        "import os.path  (1 file)\nimport numpy  (2 files)\nimport os  (1 file)"
+    )
+    # whitespace variants within one file are one statement
+    assert index.add(
+        ["import  sys", "import sys", "import\tnumpy", "import numpy"]
+    ) == ["import  sys"]
+    assert index.counts["import numpy"] == 3 and index.counts["import sys"] == 1
+
+
+def test_import_extractor_memo():
+    with tempfile.TemporaryDirectory() as tmp:
+        root, cache_dir = Path(tmp) / "repo", Path(tmp) / "cache"
+        root.mkdir()
+        for i in range(5):
+            (root / f"m{i}.py").write_text(f"import m{i}\nx = 1\n")
+        files = [f"m{i}.py" for i in range(5)]
+        extractor = ImportExtractor(max_workers=2, cache_dir=cache_dir, chunk_size=2)
+        try:
+            imports = asyncio.run(extractor.extract("Python", root, files))
+            assert imports == {f: [f"import {f[:-3]}"] for f in files}
+            entries = list(cache_dir.glob("*/*.json"))
+            assert len(entries) == 5
+            # memoized results are served without parsing
+            for entry in entries:
+                entry.write_text('["import cached"]')
+            imports = asyncio.run(extractor.extract("Python", root, files))
+            assert imports == {f: ["import cached"] for f in files}
+        finally:
+            extractor.shutdown()
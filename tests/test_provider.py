@@ -0,0 +1,406 @@
+import asyncio
+import json
+from contextlib import aclosing
+
+import pytest
+
+from dibench.utils.provider import (
+    CachedProvider,
+    CacheMissError,
+    DeadlineProvider,
+    RateLimitedProvider,
+    RateLimiter,
+    ReplayProvider,
+    Reply,
+    ResponseCache,
+    SyntheticError,
+    SyntheticProvider,
+    TelemetryProvider,
+    is_context_overflow,
+    is_retryable,
+    model_price,
+    reply_usage,
+    retry_after,
+    track_instance,
+)
+
+
+class EchoProvider:
+    model = "echo"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_reply(self, messages, max_new_tokens=1024, temperature=0.0, n=1):
+        self.calls += 1
+        return messages[-1]["content"]
+
+    def count_tokens(self, message):
+        return len(message.split())
+
+
+def test_cached_provider_and_replay(tmp_path):
+    messages = [{"role": "user", "content": "hello"}]
+    provider = EchoProvider()
+    llm = CachedProvider(provider, ResponseCache(tmp_path))
+    assert asyncio.run(llm.generate_reply(messages)) == "hello"
+    assert asyncio.run(llm.generate_reply(messages)) == "hello"
+    assert provider.calls == 1
+
+    replay = CachedProvider(EchoProvider(), ResponseCache(tmp_path, readonly=True))
+    assert asyncio.run(replay.generate_reply(messages)) == "hello"
+    with pytest.raises(CacheMissError):
+        asyncio.run(replay.generate_reply(messages, max_new_tokens=8))
+
+
+def test_cache_eviction(tmp_path):
+    cache = ResponseCache(tmp_path)
+    for i in range(10):
+        cache.put(ResponseCache.key("m", [str(i)], 1, 0.0, 1), "x" * 100)
+    ResponseCache(tmp_path, max_size=500)
+    assert 0 < len(list(tmp_path.glob("*/*.json"))) < 10
+
+
+class ChunkProvider(EchoProvider):
+    async def stream_reply(self, messages, max_new_tokens=1024, temperature=0.0):
+        self.calls += 1
+        for word in messages[-1]["content"].split(" "):
+            yield word + " "
+
+
+def test_cached_provider_stream(tmp_path):
+    async def consume(llm, messages, limit=None):
+        chunks = []
+        stream = llm.stream_reply(messages)
+        async for chunk in stream:
+            chunks.append(chunk)
+            if len(chunks) == limit:
+                break
+        await stream.aclose()
+        return "".join(chunks)
+
+    messages = [{"role": "user", "content": "a b c d"}]
+    provider = ChunkProvider()
+    llm = CachedProvider(provider, ResponseCache(tmp_path))
+    # a stream closed early is cached as received, for streams only
+    assert asyncio.run(consume(llm, messages, limit=2)) == "a b "
+    assert asyncio.run(consume(llm, messages)) == "a b "
+    assert provider.calls == 1
+    assert asyncio.run(llm.generate_reply(messages)) == "a b c d"
+    assert provider.calls == 2
+    # complete replies are shared, and preferred by streams
+    assert asyncio.run(consume(llm, messages)) == "a b c d"
+    assert provider.calls == 2
+
+
+def test_synthetic_provider():
+    prompt = (
+        "--- Begin of Build Files ---\n"
+        "requirements.txt\n```\nrequests\n\n```\n"
+        "setup.py\n```\nsetup()\n\n```\n"
+        "--- End of Build Files ---"
+    )
+    messages = [{"role": "user", "content": prompt}]
+    llm = SyntheticProvider()
+    reply = "requirements.txt\n```\nrequests\n```\nsetup.py\n```\nsetup()\n```\n"
+    assert asyncio.run(llm.generate_reply(messages)) == reply
+    samples = asyncio.run(llm.generate_reply(messages, temperature=1.0, n=2))
+    assert samples == [reply, reply]
+
+    async def outcomes(llm):
+        results = []
+        for _ in range(20):
+            try:
+                results.append(await llm.generate_reply(messages))
+            except SyntheticError as e:
+                results.append(e.status_code)
+        return results
+
+    flaky = {"rate_limit": 0.3, "server": 0.2}
+    first = asyncio.run(outcomes(SyntheticProvider(error_rates=flaky, seed=1)))
+    # reproducible, and retries of a failed request eventually succeed
+    assert first == asyncio.run(outcomes(SyntheticProvider(error_rates=flaky, seed=1)))
+    assert {429, 500, reply} == set(first)
+
+
+def test_replay_provider(tmp_path):
+    prompts = [[{"role": "user", "content": f"prompt {i}"}] for i in range(2)]
+    trajs = tmp_path / "python" / "x" / "trajs.json"
+    trajs.parent.mkdir(parents=True)
+    trajs.write_text(
+        json.dumps(
+            [
+                message
+                for i, prompt in enumerate(prompts)
+                for message in prompt + [{"role": "assistant", "content": f"reply {i}"}]
+            ]
+        )
+    )
+    llm = ReplayProvider("recorded", tmp_path)
+    assert asyncio.run(llm.generate_reply(prompts[1], max_new_tokens=8)) == "reply 1"
+    with pytest.raises(CacheMissError):
+        asyncio.run(llm.generate_reply([{"role": "user", "content": "new"}]))
+
+
+class QuotaProvider(EchoProvider):
+    """Throttles requests beyond `quota` in flight, like a saturated deployment."""
+
+    def __init__(self, quota):
+        super().__init__()
+        self.quota = quota
+        self.in_flight = 0
+        self.throttled = 0
+
+    async def generate_reply(self, messages, max_new_tokens=1024, temperature=0.0, n=1):
+        if self.in_flight >= self.quota:
+            self.throttled += 1
+            raise SyntheticError("throttled", 429, retry_after=0.01)
+        self.in_flight += 1
+        await asyncio.sleep(0.005)
+        self.in_flight -= 1
+        return await super().generate_reply(messages)
+
+
+def test_rate_limiter_aimd():
+    provider = QuotaProvider(quota=4)
+    limiter = RateLimiter(max_concurrency=32)
+    llm = RateLimitedProvider(provider, limiter)
+
+    async def query(i):
+        while True:
+            try:
+                return await llm.generate_reply([{"role": "user", "content": str(i)}])
+            except SyntheticError:
+                continue
+
+    async def run():
+        return await asyncio.gather(*(query(i) for i in range(200)))
+
+    assert asyncio.run(run()) == [str(i) for i in range(200)]
+    # a few halvings bring the concurrency down to the quota, after which
+    # requests are throttled only when it probes above it again
+    assert limiter.limit < 8
+    assert provider.throttled < 60
+
+
+def test_rate_limiter_across_event_loops():
+    limiter = RateLimiter(max_concurrency=1)
+    llm = RateLimitedProvider(QuotaProvider(quota=1), limiter)
+
+    async def run():
+        messages = [[{"role": "user", "content": str(i)}] for i in range(3)]
+        return await asyncio.gather(*(llm.generate_reply(m) for m in messages))
+
+    # e.g. successive commands in one process, each with its own loop
+    assert asyncio.run(run()) == asyncio.run(run()) == ["0", "1", "2"]
+
+
+def test_rate_limiter_budgets():
+    limiter = RateLimiter(max_concurrency=8, rpm=4, tpm=100)
+    limiter.WINDOW = 0.1
+
+    async def timed(tokens):
+        loop = asyncio.get_running_loop()
+        # start from an empty window
+        await asyncio.sleep(limiter.WINDOW)
+        start = loop.time()
+        for n in tokens:
+            ticket = await limiter.acquire(n)
+            await limiter.release(ticket, n)
+        return loop.time() - start
+
+    async def run():
+        return [
+            await timed([1] * 4),
+            # the fifth request waits for the first to leave the window
+            await timed([1] * 5),
+            # two requests of 60 tokens do not fit in the same window
+            await timed([60, 60]),
+            # a request above the budget is admitted alone
+            await timed([150]),
+        ]
+
+    within, rpm_bound, tpm_bound, oversized = asyncio.run(run())
+    assert within < 0.05 and oversized < 0.05
+    assert rpm_bound >= 0.09 and tpm_bound >= 0.09
+
+
+def test_error_classification():
+    class APIConnectionError(Exception):
+        pass
+
+    class BadRequestError(Exception):
+        status_code = 400
+
+        def __init__(self, message, headers=None):
+            super().__init__(message)
+            self.response = type("Response", (), {"headers": headers or {}})
+
+    assert is_retryable(APIConnectionError()) and is_retryable(TimeoutError())
+    assert is_retryable(SyntheticError("", 503)) and not is_retryable(KeyError())
+    overflow = BadRequestError("This model's maximum context length is 8192 tokens")
+    assert is_context_overflow(overflow) and not is_retryable(overflow)
+    assert not is_context_overflow(SyntheticError("Too many tokens per minute", 429))
+    assert retry_after(BadRequestError("", {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after(BadRequestError("", {"retry-after": "3"})) == 3.0
+
+
+class HangingProvider(EchoProvider):
+    def __init__(self):
+        super().__init__()
+        self.closed = False
+
+    async def generate_reply(self, messages, max_new_tokens=1024, temperature=0.0, n=1):
+        await asyncio.sleep(3600)
+
+    async def stream_reply(self, messages, max_new_tokens=1024, temperature=0.0):
+        try:
+            yield "first"
+            await asyncio.sleep(3600)
+        finally:
+            self.closed = True
+
+
+def test_deadline_provider():
+    async def stream(llm):
+        chunks = []
+        async for chunk in llm.stream_reply([]):
+            chunks.append(chunk)
+        return chunks
+
+    hanging = HangingProvider()
+    llm = DeadlineProvider(hanging, 0.05)
+    with pytest.raises(TimeoutError):
+        asyncio.run(llm.generate_reply([{"role": "user", "content": "hi"}]))
+    with pytest.raises(TimeoutError):
+        asyncio.run(stream(llm))
+    assert hanging.closed
+    # requests completing in time are untouched
+    llm = DeadlineProvider(EchoProvider(), 1)
+    reply = asyncio.run(llm.generate_reply([{"role": "user", "content": "hi"}]))
+    assert reply == "hi"
+
+
+def test_telemetry_provider():
+    synthetic = SyntheticProvider(
+        error_rates={"server": 0.3, "context_length": 0.3}, seed=1
+    )
+    llm = TelemetryProvider(synthetic)
+    messages = [{"role": "user", "content": "one two three four five six seven"}]
+
+    async def send(count):
+        for _ in range(count):
+            try:
+                await llm.generate_reply(messages)
+            except SyntheticError:
+                pass
+        try:
+            async for _ in llm.stream_reply(messages):
+                pass
+        except SyntheticError:
+            pass
+
+    asyncio.run(send(8))  # not tracked
+    with track_instance() as metrics:
+        asyncio.run(send(8))
+    assert metrics.requests == 9
+    # context overflows are never retried
+    assert 0 < metrics.retries < metrics.errors < 9
+    assert len(metrics.latency) == len(metrics.ttft) == 9 - metrics.errors
+    prompt_tokens = synthetic.count_tokens(messages[0]["content"])
+    assert metrics.prompt_tokens == 9 * prompt_tokens
+    dump = metrics.dump(model_price("gpt-4o-2024-08-06"))
+    assert dump["cost"] == metrics.prompt_tokens * 2.5 / 1e6
+    assert model_price("gpt-4o-mini") == (0.15, 0.6)
+    assert metrics.dump()["cost"] is None
+
+
+def test_telemetry_provider_usage():
+    class UsageProvider:
+        """Reports usage only when asked to, and has no tokenizer."""
+
+        model = "deepseek-chat"
+
+        def __init__(self, usage):
+            self.usage = usage
+
+        async def generate_reply(
+            self, messages, max_new_tokens=1024, temperature=0.0, n=1
+        ):
+            return Reply.with_usage("four", self.usage)
+
+        async def stream_reply(self, messages, max_new_tokens=1024, temperature=0.0):
+            for chunk in ["fo", "ur"]:
+                yield chunk
+            if self.usage is not None:
+                yield Reply.with_usage("", self.usage)
+
+        def count_tokens(self, message):
+            raise OSError("Can't load tokenizer for 'deepseek-chat'")
+
+    messages = [{"role": "user", "content": "hello"}]
+
+    async def send(llm):
+        reply = await llm.generate_reply(messages)
+        chunks = [chunk async for chunk in llm.stream_reply(messages)]
+        # closed early, before the usage chunk
+        async with aclosing(llm.stream_reply(messages)) as stream:
+            async for _ in stream:
+                break
+        return reply, "".join(chunks)
+
+    with track_instance() as metrics:
+        reply = asyncio.run(send(TelemetryProvider(UsageProvider((3, 4)))))
+    assert reply == ("four", "four")
+    assert metrics.requests == 3 and metrics.retries == 0
+    assert (metrics.prompt_tokens, metrics.completion_tokens) == (6, 8)
+    # without usage, a tokenizer that can't be loaded doesn't fail requests
+    with track_instance() as metrics:
+        reply = asyncio.run(send(TelemetryProvider(UsageProvider(None))))
+    assert reply == ("four", "four")
+    assert metrics.requests == 3 and metrics.retries == 0
+    assert (metrics.prompt_tokens, metrics.completion_tokens) == (0, 0)
+
+
+def test_cache_key_includes_deployment(tmp_path):
+    messages = [{"role": "user", "content": "hello"}]
+    cache = ResponseCache(tmp_path)
+    provider = EchoProvider()
+    for base_url in ["https://a.example/v1", "https://b.example/v1"]:
+        llm = CachedProvider(provider, cache, backend="openai", base_url=base_url)
+        asyncio.run(llm.generate_reply(messages))
+    assert provider.calls == 2
+    llm = CachedProvider(provider, cache, backend="synthetic")
+    asyncio.run(llm.generate_reply(messages))
+    assert provider.calls == 3
+
+
+def test_openai_provider_samples():
+    pytest.importorskip("httpx")
+    pytest.importorskip("openai")
+    from types import SimpleNamespace
+
+    from dibench.utils.provider.openai import AsyncOpenAIProvider
+
+    def response(*contents):
+        # choices may come back out of order
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(index=i, message=SimpleNamespace(content=content))
+                for i, content in reversed(list(enumerate(contents)))
+            ],
+            usage=SimpleNamespace(prompt_tokens=5, completion_tokens=7),
+        )
+
+    class Completions:
+        async def create(self, n, **kwargs):
+            return response(*[f"sample {i}" for i in range(n)])
+
+    llm = AsyncOpenAIProvider.__new__(AsyncOpenAIProvider)
+    llm.model = "gpt-4o"
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=Completions()))
+    messages = [{"role": "user", "content": "hello"}]
+    assert asyncio.run(llm.generate_reply(messages)) == "sample 0"
+    samples = asyncio.run(llm.generate_reply(messages, temperature=1.0, n=3))
+    assert samples == ["sample 0", "sample 1", "sample 2"]
+    assert reply_usage(samples) == (5, 7)
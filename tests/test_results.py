@@ -0,0 +1,54 @@
+import asyncio
+
+from dibench.utils.results import ResultSink
+
+
+async def write(sink: ResultSink, ids: list[str]):
+    sink.start()
+    try:
+        for instance_id in ids:
+            await sink.put({"instance_id": instance_id, "patch": f"diff {instance_id}"})
+    finally:
+        await sink.close()
+
+
+def test_result_sink_resume(tmp_path):
+    path = tmp_path / "results.jsonl"
+    sink = ResultSink(path, index_every=2)
+    asyncio.run(write(sink, ["a", "b", "c"]))
+    assert len(sink) == 3
+
+    resumed = ResultSink(path)
+    assert "b" in resumed and "d" not in resumed
+    assert resumed.get("c") == {"instance_id": "c", "patch": "diff c"}
+
+    # a crash after appending (manifest not saved) and mid-write
+    with path.open("a") as f:
+        f.write('{"instance_id": "d", "patch": ""}\n{"instance_id": "e", "pa')
+    recovered = ResultSink(path)
+    assert sorted(recovered.offsets) == ["a", "b", "c", "d"]
+    asyncio.run(write(recovered, ["e"]))
+    assert [line.count("\n") for line in path.read_text().splitlines(True)] == [1] * 5
+    assert ResultSink(path).get("e")["patch"] == "diff e"
+
+
+def test_result_sink_cancelled(tmp_path):
+    path = tmp_path / "results.jsonl"
+    sink = ResultSink(path)
+
+    async def run():
+        sink.start()
+        try:
+            await sink.put({"instance_id": "a", "patch": ""})
+            await asyncio.sleep(10)
+        finally:
+            await sink.close()
+
+    async def main():
+        task = asyncio.create_task(run())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+    assert "a" in ResultSink(path)
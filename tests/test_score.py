@@ -0,0 +1,125 @@
+import json
+
+from dibench.score import load_predictions, main, summarize
+
+
+def _patch(*requirements):
+    added = "".join(f"+{requirement}\n" for requirement in requirements)
+    return (
+        "--- a/requirements.txt\n+++ b/requirements.txt\n"
+        f"@@ -0,0 +1,{len(requirements)} @@\n{added}"
+    )
+
+
+def test_load_predictions(tmp_path):
+    results = tmp_path / "results"
+    (results / "python" / "repo_0").mkdir(parents=True)
+    (results / "python" / "repo_0" / "patch.diff").write_text("eval layout")
+    with open(results / "file-iter-gpt-4o.jsonl", "w") as f:
+        f.write(json.dumps({"instance_id": "repo_0", "patch": "old"}) + "\n")
+        f.write(json.dumps({"instance_id": "repo_0", "patch": "new"}) + "\n")
+        f.write(json.dumps({"instance_id": "repo_0", "patch": None}) + "\n")
+        f.write(json.dumps({"instance_id": "repo_2", "patch": None}) + "\n")
+        f.write('{"instance_id": "repo_1", "pa')
+    # telemetry of the same run, not predictions
+    (results / "file-iter-gpt-4o.metrics.jsonl").write_text(
+        json.dumps({"instance_id": "repo_0", "status": "ok"}) + "\n"
+    )
+    other = tmp_path / "all-in-one-gpt-4o.jsonl"
+    other.write_text(json.dumps({"instance_id": "repo_1", "patch": "other"}) + "\n")
+    assert load_predictions([results, other]) == {
+        "repo_0": {"file-iter-gpt-4o": "new", "results": "eval layout"},
+        "repo_1": {"all-in-one-gpt-4o": "other"},
+        "repo_2": {"file-iter-gpt-4o": None},
+    }
+
+
+def _dataset(tmp_path, oracle, count=3):
+    with open(tmp_path / "dataset.jsonl", "w") as f:
+        for i in range(count):
+            instance_id = f"repo_{i}"
+            project_root = tmp_path / "repos" / "python" / instance_id
+            project_root.mkdir(parents=True)
+            (project_root / "requirements.txt").write_text("")
+            instance = dict(
+                instance_id=instance_id,
+                metadata={},
+                language="Python",
+                act_command="",
+                ci_file="",
+                patch=oracle,
+                build_files=["requirements.txt"],
+                env_specs={},
+            )
+            f.write(json.dumps(instance) + "\n")
+
+
+def _score(tmp_path, results) -> list[dict]:
+    main(
+        str(results),
+        dataset_name_or_path=str(tmp_path / "dataset.jsonl"),
+        repo_instances_dir=str(tmp_path / "repos"),
+        workspace=str(tmp_path / "workspace"),
+        workers=2,
+        oracle_cache_dir=None,
+        fake_libs=False,
+        output=str(tmp_path / "scores.jsonl"),
+    )
+    return [json.loads(line) for line in open(tmp_path / "scores.jsonl")]
+
+
+def test_score_models_in_one_pass(tmp_path, capsys):
+    oracle = _patch("numpy", "requests==2.0")
+    _dataset(tmp_path, oracle)
+    results = tmp_path / "results"
+    results.mkdir()
+    for model, patch in [("exact", oracle), ("loose", _patch("numpy", "requests"))]:
+        with open(results / f"all-in-one-{model}.jsonl", "w") as f:
+            for i in range(2):
+                record = {"instance_id": f"repo_{i}", "patch": patch}
+                f.write(json.dumps(record) + "\n")
+    rows = _score(tmp_path, results)
+    assert [(row["model"], row["instance_id"]) for row in rows] == [
+        ("all-in-one-exact", "repo_0"),
+        ("all-in-one-exact", "repo_1"),
+        ("all-in-one-loose", "repo_0"),
+        ("all-in-one-loose", "repo_1"),
+    ]
+    assert rows[2]["exact_tp"] == 1 and rows[2]["exact_fn"] == 1
+    assert rows[2]["name_only_tp"] == 2 and rows[2]["fake_libs"] is None
+    summary = {(row["model"], row["language"]): row for row in summarize(rows)}
+    assert summary["all-in-one-exact", "all"]["exact F1"] == 1.0
+    assert summary["all-in-one-loose", "python"]["exact P"] == 0.5
+    assert summary["all-in-one-loose", "python"]["name_only R"] == 1.0
+    assert "all-in-one-loose" in capsys.readouterr().out
+    # scored in memory, no testbeds
+    assert not any((tmp_path / "workspace").rglob("model"))
+
+
+def test_score_missing_predictions(tmp_path):
+    oracle = _patch("numpy", "requests==2.0")
+    _dataset(tmp_path, oracle)
+    results = tmp_path / "results"
+    results.mkdir()
+    with open(results / "all-in-one-exact.jsonl", "w") as f:
+        for i in range(2):
+            f.write(json.dumps({"instance_id": f"repo_{i}", "patch": oracle}) + "\n")
+    # skips repo_1, and failed on repo_2
+    with open(results / "all-in-one-lazy.jsonl", "w") as f:
+        f.write(json.dumps({"instance_id": "repo_0", "patch": oracle}) + "\n")
+        f.write(json.dumps({"instance_id": "repo_2", "patch": None}) + "\n")
+    rows = _score(tmp_path, results)
+    scored = {(row["model"], row["instance_id"]): row for row in rows}
+    assert len(scored) == 6
+    for model, instance_id in [
+        ("all-in-one-exact", "repo_2"),
+        ("all-in-one-lazy", "repo_1"),
+        ("all-in-one-lazy", "repo_2"),
+    ]:
+        row = scored[model, instance_id]
+        assert row["missing"]
+        assert (row["exact_tp"], row["exact_fp"], row["exact_fn"]) == (0, 0, 2)
+    summary = {(row["model"], row["language"]): row for row in summarize(rows)}
+    assert summary["all-in-one-exact", "all"]["missing"] == 1
+    assert summary["all-in-one-lazy", "all"]["missing"] == 2
+    assert summary["all-in-one-lazy", "all"]["exact R"] == 2 / 6
@@ -0,0 +1,42 @@
+import subprocess
+import sys
+
+
+def test_depinfer_import_is_lazy():
+    heavy = [
+        "github",
+        "IPython",
+        "httpx",
+        "openai",
+        "rich.progress",
+        "tiktoken",
+        "transformers",
+        "tree_sitter",
+    ]
+    code = (
+        "import sys, dibench.depinfer; "
+        f"print([m for m in {heavy!r} if m in sys.modules])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_depinfer_help_skips_ipython():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "dibench.depinfer", "--help"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Fire prints the help to stderr when it is not a terminal
+    assert "model_backend" in result.stdout + result.stderr
+    # one line per imported module, see `depinfer.__main__`
+    imported = [
+        line.rsplit("|", 1)[-1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    ]
+    # `IPython.core` is listed, looked up in `sys.modules` only
+    assert imported and "IPython" not in imported
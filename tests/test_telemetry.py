@@ -0,0 +1,53 @@
+import json
+
+from dibench.telemetry import load_metrics, percentile, summarize
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([3.0], 90) == 3.0
+    assert percentile([4.0, 1.0, 3.0, 2.0], 50) == 2.5
+    assert percentile(list(range(101)), 99) == 99
+
+
+def test_summarize(tmp_path):
+    def record(instance_id, language, status="ok", **kwargs):
+        return {
+            "instance_id": instance_id,
+            "language": language,
+            "method": "file-iter",
+            "model": "gpt-4o",
+            "status": status,
+            "latency": 2.0,
+            "requests": 2,
+            "errors": 1,
+            "retries": 1,
+            "prompt_tokens": 100,
+            "completion_tokens": 20,
+            "ttft": 0.5,
+            "request_latency": 1.0,
+            "cost": 0.01,
+        } | kwargs
+
+    records = [
+        record("a", "python", status="timeout", ttft=None, cost=None),
+        record("b", "python", latency=4.0),
+        record("c", "rust", downgrades=1),
+        # retried by a rerun, supersedes the timeout
+        record("a", "python", latency=6.0),
+    ]
+    path = tmp_path / "file-iter-gpt-4o.metrics.jsonl"
+    path.write_text("".join(json.dumps(r) + "\n" for r in records) + '{"torn')
+    rows = summarize(load_metrics([tmp_path]))
+    assert [(row["language"], row["instances"]) for row in rows] == [
+        ("python", 2),
+        ("rust", 1),
+    ]
+    python = rows[0]
+    assert python["ok"] == 2 and python["timeouts"] == 0
+    assert python["latency p50"] == 5.0
+    assert python["requests"] == 4
+    assert python["errors"] == 2 and python["retries"] == 2
+    assert python["tokens p50"] == 120
+    assert python["cost"] == 0.02
+    assert python["downgraded"] == 0 and rows[1]["downgraded"] == 1
@@ -0,0 +1,112 @@
+import tempfile
+from pathlib import Path
+
+from dibench.utils.walk import ProjectTree, source_files
+
+
+def make_tree(root: Path, files: dict[str, str | bytes]):
+    for path, content in files.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(content, bytes):
+            (root / path).write_bytes(content)
+        else:
+            (root / path).write_text(content)
+
+
+def test_source_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_tree(
+            root,
+            {
+                "src/index.js": "import a from 'a';\n",
+                "src/util.ts": "export const x = 1;\n",
+                "src/app.min.js": "var a=1;\n",
+                "src/bundle.js": "var a=1;" * 1000,
+                "src/logo.js": b"\x89PNG\0\0",
+                "src/big.js": "// x\n" * 300_000,
+                "src/gen/out.js": "x\n",
+                "src/gen/keep.js": "x\n",
+                "src/gen/.gitignore": "*.js\n!keep.js\n",
+                "node_modules/a/index.js": "x\n",
+                "lib/Lib.csproj": "<Project />\n",
+                "lib/obj/x.js": "x\n",
+                ".hidden/x.js": "x\n",
+                "build/x.js": "x\n",
+                "build/y.js": "x\n",
+                ".gitignore": "/build/x.js\n# comment\n*.log\n",
+                "debug.log": "x\n",
+                "README.md": "x\n",
+            },
+        )
+        assert source_files(root, [".ts", ".js"]) == [
+            "build/y.js",
+            "src/index.js",
+            "src/util.ts",
+            "src/gen/keep.js",
+        ]
+        assert source_files(root, [".js"], max_file_size=None, skip_minified=False) == [
+            "build/y.js",
+            "src/app.min.js",
+            "src/big.js",
+            "src/bundle.js",
+            "src/index.js",
+            "src/gen/keep.js",
+        ]
+        assert "debug.log" not in source_files(root)
+        assert "debug.log" in source_files(root, use_gitignore=False)
+
+
+def test_build_output_dirs_next_to_build_files_only():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_tree(
+            root,
+            {
+                "Cargo.toml": "[package]\n",
+                "src/main.rs": "fn main() {}\n",
+                "src/bin/tool.rs": "fn main() {}\n",
+                "target/debug/build/out.rs": "x\n",
+                "cmd/app/bin/main.rs": "fn main() {}\n",
+                "dist/x.rs": "x\n",
+            },
+        )
+        assert source_files(root, [".rs"]) == [
+            "cmd/app/bin/main.rs",
+            "dist/x.rs",
+            "src/main.rs",
+            "src/bin/tool.rs",
+        ]
+
+
+def test_project_structure():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "proj"
+        files = {"src/main.py": "", "src/pkg/util.py": "", "setup.py": ""}
+        files.update({f"assets/img{i}.png": "" for i in range(20)})
+        files.update({f"assets/icons/i{i}.svg": "" for i in range(3)})
+        files["node_modules/a/index.js"] = ""
+        make_tree(root, files)
+        tree = ProjectTree(root)
+        assert tree.render(max_entries=10) == (
+            "proj/\n"
+            "  assets/ (23 files: .png, .svg)\n"
+            "  setup.py\n"
+            "  src/\n"
+            "    main.py\n"
+            "    pkg/\n"
+            "      util.py\n"
+        )
+        assert tree.render(max_depth=1) == (
+            "proj/\n"
+            "  assets/ (23 files: .png, .svg)\n"
+            "  setup.py\n"
+            "  src/ (2 files: .py)\n"
+        )
+        # the depth is reduced until the structure fits the token budget
+        assert tree.render(max_tokens=20) == tree.render(max_depth=1)
+        assert tree.source_files([".py"]) == [
+            "setup.py",
+            "src/main.py",
+            "src/pkg/util.py",
+        ]
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from dibench.utils.workspace import clone_tree, detach
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / "project"
+    (root / "src").mkdir(parents=True)
+    (root / "requirements.txt").write_text("requests\n")
+    (root / "src" / "main.py").write_text("import requests\n")
+    os.symlink("src/main.py", root / "main.py")
+    return root
+
+
+@pytest.mark.parametrize("mode", ["hardlink", "copy", "auto"])
+def test_clone_tree(project, tmp_path, mode):
+    clone = tmp_path / "clone"
+    used = clone_tree(project, clone, mode)
+    assert used in ("reflink", "hardlink", "copy")
+    assert (clone / "src" / "main.py").read_text() == "import requests\n"
+    assert os.readlink(clone / "main.py") == "src/main.py"
+    if used == "hardlink":
+        assert (clone / "requirements.txt").stat().st_nlink == 2
+    detach(clone, ["requirements.txt", "missing.txt"])
+    assert (clone / "requirements.txt").stat().st_nlink == 1
+    (clone / "requirements.txt").write_text("numpy\n")
+    assert (project / "requirements.txt").read_text() == "requests\n"
+    detach(clone)
+    assert (project / "src" / "main.py").stat().st_nlink == 1
+
+
+@pytest.mark.parametrize("mode", ["hardlink", "auto"])
+def test_clone_tree_without_hardlinks(project, tmp_path, mode):
+    assert clone_tree(project, tmp_path / "clone", mode, hardlinks=False) != "hardlink"